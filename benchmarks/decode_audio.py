@@ -0,0 +1,135 @@
+"""
+Compares the old MoviePy "repair" step with the streaming ffmpeg decode of Converter.
+
+Each path runs in a fresh process so the peak RSS of one doesn't hide the other.
+The ffmpeg children are reported separately (RUSAGE_CHILDREN).
+
+Usage (from the repository root):
+    python -m benchmarks.decode_audio [audio_file] [--duration 300] [--runs 3]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+import wave
+import numpy as np
+from syncit.constants import Constants
+from syncit.converter import decode_pcm, FFMPEG_BINARY
+
+SAMPLE_AUDIO = os.path.join(Constants.SAMPLES_FOLDER, 'audio.m4a')
+
+
+class Upload():
+    """
+    Minimal FileStorage stand-in for the benchmark (only read() is used).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+def make_upload(source: str, duration: int, tmpdir: str):
+    """
+    Loops the source audio into an m4a upload of the requested duration.
+
+    Returns:
+        str: Path to the generated upload.
+    """
+
+    path = os.path.join(tmpdir, f'upload.{Constants.RECIEVED_AUDIO_FILE_EXTENSION}')
+    subprocess.run([FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-y', '-stream_loop', '-1',
+                    '-i', source, '-t', str(duration), '-c', 'copy', path], check=True)
+    return path
+
+
+def decode_with_moviepy(upload: str):
+    """
+    The previous implementation: copy the upload to disk, re-encode it to a full rate WAV
+    with MoviePy and read the WAV back into a mono buffer (at the original sample rate).
+    """
+
+    from moviepy.editor import AudioFileClip
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        audio = os.path.join(tmpdir, f'{uuid.uuid4().hex[:10]}.{Constants.RECIEVED_AUDIO_FILE_EXTENSION}')
+        with open(audio, 'wb') as f:
+            f.write(Upload(upload).read())
+
+        path = os.path.join(tmpdir, f'{uuid.uuid4().hex[:10]}.{Constants.DESIRED_AUDIO_FILE_EXTENSION}')
+        AudioFileClip(audio).write_audiofile(path, verbose=False, logger=None)
+        os.remove(audio)
+
+        with wave.open(path, 'rb') as wav:
+            channels = wav.getnchannels()
+            frames = wav.readframes(wav.getnframes())
+        samples = np.frombuffer(frames, dtype=np.int16).reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return samples.nbytes
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def decode_with_ffmpeg(upload: str):
+    """
+    The current implementation in Converter.decode_audio (only the decode, without the voice activity analysis).
+    """
+
+    pcm = decode_pcm(Upload(upload).read(), Constants.DECODED_AUDIO_SAMPLE_RATE)
+    return pcm.nbytes
+
+
+def run_path(target, upload: str, queue):
+    """
+    Runs one decode path and reports wall time, decoded bytes and peak RSS (in MB).
+    """
+
+    started = time.perf_counter()
+    decoded_bytes = target(upload)
+    wall_time = time.perf_counter() - started
+    own_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    queue.put((wall_time, decoded_bytes, own_rss, children_rss))
+
+
+def measure(target, upload: str):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=run_path, args=(target, upload, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('audio_file', nargs='?', default=SAMPLE_AUDIO)
+    parser.add_argument('--duration', type=int, default=Constants.DELAY_CHECKER_SECTIONS_TIME)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        upload = make_upload(args.audio_file, args.duration, tmpdir)
+        print(f'Upload: {args.duration}s, {os.path.getsize(upload) / 1024 / 1024:.1f} MB')
+        print(f'{"path":<10}{"wall (s)":>10}{"decoded (MB)":>14}{"peak RSS (MB)":>15}{"ffmpeg RSS (MB)":>17}')
+        for name, target in (('moviepy', decode_with_moviepy), ('ffmpeg', decode_with_ffmpeg)):
+            for _ in range(args.runs):
+                wall_time, decoded_bytes, own_rss, children_rss = measure(target, upload)
+                print(f'{name:<10}{wall_time:>10.2f}{decoded_bytes / 1024 / 1024:>14.1f}{own_rss:>15.1f}{children_rss:>17.1f}')
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if(__name__ == '__main__'):
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares the old whole-file encoding and language detection of SubtitleParser with the
+incremental encoding detection and the sampled language detection.
+
+Reports the CPU time of each path for every subtitles file in the corpus (the parsing
+the new language detection needs is not counted), and what each path detected.
+
+Usage (from the repository root):
+    python -m benchmarks.detect_subtitles [corpus_folder] [--runs 3]
+"""
+
+import argparse
+import glob
+import os
+import time
+import chardet
+from langdetect import DetectorFactory, detect_langs
+from syncit.constants import Constants
+from syncit.helpers import decode_subtitles, detect_language
+from syncit.subtitle_parser import SubtitleParser
+
+
+def detect_whole_file(binary: bytes):
+    """
+    The previous implementation: chardet and langdetect over the whole file.
+    """
+
+    encoding = chardet.detect(binary)['encoding']
+    try:
+        language = detect_langs(binary.decode(encoding))[0]
+    except UnicodeDecodeError:
+        return (f'{encoding} (fails)', None, 0.0)
+    return (encoding, language.lang, language.prob)
+
+
+def detect_incremental(binary: bytes, texts: list):
+    """
+    The current implementation in SubtitleParser.parse_subtitles.
+    """
+
+    (_, encoding, encoding_confidence) = decode_subtitles(binary)
+    (language, language_confidence) = detect_language(texts)
+    return (encoding, language, language_confidence)
+
+
+def get_texts(binary: bytes):
+    """
+    Parses the cleaned texts of the cues (not timed, the parser builds them anyway).
+    """
+
+    sp = SubtitleParser.__new__(SubtitleParser)
+    (sp.subtitles, _, _) = decode_subtitles(binary)
+    sp.read_subtitles()
+    return sp.texts
+
+
+def measure(target, *args, runs: int):
+    """
+    Runs a detection path and reports the best CPU time (in ms) and the result.
+    """
+
+    times = []
+    for _ in range(runs):
+        DetectorFactory.seed = 0
+        started = time.process_time()
+        result = target(*args)
+        times.append((time.process_time() - started) * 1000)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus_folder', nargs='?', default=Constants.SAMPLES_FOLDER)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.corpus_folder, '**', '*.srt'), recursive=True))
+    print(f'{"file":<32}{"size (KB)":>10}{"old (ms)":>10}{"new (ms)":>10}  {"old result":<28}{"new result":<28}')
+    totals = [0, 0]
+    for path in paths:
+        with open(path, 'rb') as f:
+            binary = f.read()
+        texts = get_texts(binary)
+
+        old_time, (old_encoding, old_language, old_probability) = measure(detect_whole_file, binary, runs=args.runs)
+        new_time, (new_encoding, new_language, new_probability) = measure(detect_incremental, binary, texts, runs=args.runs)
+        totals[0] += old_time
+        totals[1] += new_time
+
+        old_result = f'{old_encoding} {old_language} {old_probability:.2f}'
+        new_result = f'{new_encoding} {new_language} {new_probability:.2f}'
+        print(f'{os.path.basename(path)[:31]:<32}{len(binary) / 1024:>10.1f}{old_time:>10.1f}{new_time:>10.1f}  {old_result:<28}{new_result:<28}')
+
+    print(f'{"total":<32}{"":>10}{totals[0]:>10.1f}{totals[1]:>10.1f}')
+
+
+if(__name__ == '__main__'):
+    main()
@@ -3,10 +3,17 @@ load_dotenv()
 import os
 import logging
 from logger_setup import setup_logging
-from flask import Flask, request, Response
+from flask import Flask, request, Response, stream_with_context
 from flask_cors import CORS, cross_origin
+import io
 import json
+import time
+import threading
 from syncit.delay_checker import DelayChecker
+from syncit.subtitle_parser import SubtitleParser
+from syncit.sessions import get_session_store, HostLocalStoreError
+from syncit.jobs import get_job_store, get_job_manager, DONE, FAILED
+from syncit.resilience import SpeechToTextError
 from syncit.constants import Constants
 
 setup_logging()
@@ -15,6 +22,22 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app) # Adds CORS header
 
+# Each event stream holds a uwsgi thread, the streams of this process are limited (see get_job_events)
+job_event_streams = threading.BoundedSemaphore(Constants.JOB_EVENTS_MAX_STREAMS)
+
+
+@app.before_request
+def start_job_manager():
+    """
+    Starts claiming the queued jobs in this process (after uwsgi forked it, threads don't survive the fork).
+    Where the jobs can't run (several hosts), only the /jobs routes fail.
+    """
+
+    try:
+        get_job_manager()
+    except HostLocalStoreError:
+        pass
+
 @app.route('/check_delay', methods=['POST'])
 def check_delay():
     """
@@ -34,6 +57,9 @@ def check_delay():
 
         If delay not found:
             Empty dict.
+
+        If the speech to text is failing (503):
+            'error': The error.
     """
     
     logger.info('Checking delay.')
@@ -50,7 +76,12 @@ def check_delay():
 
     # try:
     dc = DelayChecker(audio_file, start, end, subtitles_file, audio_language, subtitles_language)
-    delay = dc.check_delay()
+    try:
+        delay = dc.check_delay()
+    except SpeechToTextError as err:
+        # Unknown, not "no delay found" (the client can retry later)
+        logger.error(f'Speech to text failed. Error: {err}')
+        return Response(json.dumps({'error': 'Speech to text unavailable.'}), 503)
 
     if(delay is None):
         return Response(json.dumps({}), 200)
@@ -63,6 +94,219 @@ def check_delay():
     #     return Response(json.dumps({'error': 'Internal Server Error.'}), 500)
 
 
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    """
+    Route to create a sync session, the subtitles are uploaded once for all the chunks.
+
+    Request Params:
+        subtitles_file: FileStorage object with the complete subtitles.
+        video_language: The lanaguage code of the video (and audio).
+        subtitles_language: The language code of the subtitles.
+
+    Response:
+        'session_id': The session id (for /sessions/<session_id>/check_delay).
+        'encoding': The encoding of the subtitles.
+        'subtitles_language': The language of the subtitles (detected if requested).
+        400 if the subtitles can't be parsed. 501 if the app runs on several hosts (see sessions.check_single_host).
+    """
+
+    logger.info('Creating session.')
+    try:
+        audio_language = request.form['video_language']
+        subtitles_language = request.form['subtitles_language']
+        subtitles = request.files['subtitles'].read()
+    except:
+        return Response(json.dumps({'error': 'Bad Request'}), 400)
+
+    # Parsed (and cached by this process) now, the chunks of the session reuse it
+    try:
+        sp = SubtitleParser(io.BytesIO(subtitles), subtitles_language, audio_language)
+    except Exception as err:
+        logger.info(f'Unable to parse the subtitles of a session. Error: {err}')
+        return Response(json.dumps({'error': 'Unable to parse the subtitles.'}), 400)
+    session = get_session_store().create(subtitles, subtitles_language, audio_language)
+    logger.debug(f'Created session {session.id}. Languages: Subtitles - {sp.subtitles_language}. Audio: {audio_language}.')
+    return Response(json.dumps({'session_id': session.id, 'encoding': sp.encoding,
+                                'subtitles_language': sp.subtitles_language}), 200)
+
+
+@app.route('/sessions/<session_id>/check_delay', methods=['POST'])
+def check_session_delay(session_id: str):
+    """
+    Route to check the delay of one audio chunk of a session.
+
+    Request Params:
+        audio_file: FileStorage object with the video file.
+        start: The start time of the video.
+        end: The end time of the video.
+
+    Response:
+        Same as /check_delay (404 if the session doesn't exist or expired).
+    """
+
+    logger.info(f'Checking delay of session {session_id}.')
+    try:
+        start = int(request.form['start'])
+        end = int(request.form['end'])
+        audio_file = request.files['audio']
+    except:
+        return Response(json.dumps({'error': 'Bad Request'}), 400)
+
+    store = get_session_store()
+    session = store.get(session_id)
+    if(session is None):
+        return Response(json.dumps({'error': 'Session not found.'}), 404)
+
+    dc = DelayChecker(audio_file, start, end, io.BytesIO(session.subtitles), session.audio_language,
+                      session.subtitles_language, session=session)
+    try:
+        delay = dc.check_delay()
+    except SpeechToTextError as err:
+        logger.error(f'Speech to text failed. Error: {err}')
+        return Response(json.dumps({'error': 'Speech to text unavailable.'}), 503)
+    store.record(session.id, delay, dc.falty_delays)
+
+    if(delay is None):
+        return Response(json.dumps({}), 200)
+
+    else:
+        encoding = dc.sp.encoding
+        return Response(json.dumps({'delay': delay, 'encoding': encoding}), 200)
+
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id: str):
+    """
+    Route to delete a session (sessions also expire when idle).
+
+    Response:
+        Empty dict (404 if the session doesn't exist).
+    """
+
+    if(get_session_store().delete(session_id) is False):
+        return Response(json.dumps({'error': 'Session not found.'}), 404)
+    return Response(json.dumps({}), 200)
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    Route to queue a delay check, returns at once (see /jobs/<job_id> and /jobs/<job_id>/events).
+
+    Request Params:
+        audio_file: FileStorage object with the video file.
+        start: The start time of the video.
+        end: The end time of the video.
+        session_id: The sync session of the chunk (see /sessions). Without it, same as /check_delay:
+            subtitles_file: FileStorage object with the complete subtitles.
+            video_language: The lanaguage code of the video (and audio).
+            subtitles_language: The language code of the subtitles.
+
+    Response:
+        'job_id': The job id.
+    """
+
+    try:
+        params = {'start': int(request.form['start']), 'end': int(request.form['end']),
+                  'session_id': request.form.get('session_id'), 'audio_language': None, 'subtitles_language': None}
+        subtitles = None
+        if(params['session_id'] is None):
+            params['audio_language'] = request.form['video_language']
+            params['subtitles_language'] = request.form['subtitles_language']
+            subtitles = request.files['subtitles'].read()
+        audio = request.files['audio'].read()
+    except:
+        return Response(json.dumps({'error': 'Bad Request'}), 400)
+
+    if(params['session_id'] is not None):
+        session = get_session_store().get(params['session_id'])
+        if(session is None):
+            return Response(json.dumps({'error': 'Session not found.'}), 404)
+        params['audio_language'] = session.audio_language
+        params['subtitles_language'] = session.subtitles_language
+
+    job_id = get_job_store().create(params, audio, subtitles)
+    logger.info(f'Queued job {job_id}.')
+    manager = get_job_manager()
+    if(manager is not None):
+        manager.notify()
+    return Response(json.dumps({'job_id': job_id}), 202)
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """
+    Route to get the state of a job.
+
+    Response:
+        'id': The job id.
+        'status': queued, running, done or failed.
+        'progress': stage, done and total of the running stage.
+        'result': The response of /check_delay when done, 'error' when failed ('retryable' if the speech to text
+            was failing, the check can be queued again later).
+    """
+
+    job = get_job_store().get(job_id)
+    if(job is None):
+        return Response(json.dumps({'error': 'Job not found.'}), 404)
+    return Response(json.dumps(job), 200)
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def get_job_events(job_id: str):
+    """
+    Route to follow a job with server sent events, an event with the state of the job (as /jobs/<job_id>)
+    every time it changes, until the job is done or failed.
+    Each stream holds a thread, so a process serves Constants.JOB_EVENTS_MAX_STREAMS streams at once (429 beyond,
+    the client polls /jobs/<job_id> instead), and a stream ends after Constants.JOB_EVENTS_MAX_DURATION seconds
+    (the EventSource reconnects).
+    """
+
+    store = get_job_store()
+    if(store.get(job_id) is None):
+        return Response(json.dumps({'error': 'Job not found.'}), 404)
+    if(job_event_streams.acquire(blocking=False) is False):
+        return Response(json.dumps({'error': 'Too many event streams, poll /jobs/<job_id>.'}), 429,
+                        headers={'Retry-After': str(Constants.JOB_EVENTS_RETRY)})
+
+    def generate_events():
+        started = time.monotonic()
+        last_event = None
+        last_sent = time.monotonic()
+        yield f'retry: {Constants.JOB_EVENTS_RETRY * 1000}\n\n'
+        while(time.monotonic() - started < Constants.JOB_EVENTS_MAX_DURATION):
+            job = store.get(job_id)
+            if(job is None):
+                return
+            event = json.dumps(job)
+            if(event != last_event):
+                yield f'data: {event}\n\n'
+                (last_event, last_sent) = (event, time.monotonic())
+            elif(time.monotonic() - last_sent > Constants.JOB_EVENTS_KEEPALIVE_INTERVAL):
+                yield ': keep alive\n\n'
+                last_sent = time.monotonic()
+            if(job['status'] in (DONE, FAILED)):
+                return
+            time.sleep(Constants.JOB_EVENTS_POLL_INTERVAL)
+
+    response = Response(stream_with_context(generate_events()), 200, mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Called when the stream ends or the client disconnects
+    response.call_on_close(job_event_streams.release)
+    return response
+
+
+@app.errorhandler(HostLocalStoreError)
+def host_local_store_error(e):
+    """
+    The sessions and jobs need a single host deployment (see sessions.check_single_host).
+    """
+
+    logger.error(str(e))
+    return Response(json.dumps({'error': str(e)}), 501)
+
+
 @app.errorhandler(404)
 def page_not_found(e):
     return Response('404 not found', 404)
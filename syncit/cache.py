@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache():
+    """
+    Thread safe cache with least recently used and time based eviction.
+
+    Attributes:
+        max_size (int): Maximum items in the cache.
+        ttl (float): Seconds an item stays valid after it was set.
+        items (OrderedDict): key -> (expiry time, value), least recently used first.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups not found (or expired).
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        Constructor of LRUCache.
+
+        Params:
+            max_size (int): Maximum items in the cache.
+            ttl (float): Seconds an item stays valid after it was set.
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Gets an item.
+
+        Params:
+            key (hashable): The key.
+
+        Returns:
+            The value, or None if it isn't in the cache.
+        """
+
+        with self.lock:
+            item = self.items.get(key)
+            if(item is None or item[0] < time.monotonic()):
+                if(item is not None):
+                    del self.items[key]
+                self.misses += 1
+                return None
+
+            self.items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        """
+        Sets an item, evicts the least recently used items beyond the size limit.
+
+        Params:
+            key (hashable): The key.
+            value: The value.
+        """
+
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.ttl, value)
+            self.items.move_to_end(key)
+            while(len(self.items) > self.max_size):
+                self.items.popitem(last=False)
+
+    def stats(self):
+        """
+        Gets the counters of the cache.
+
+        Returns:
+            dict: size, hits and misses.
+        """
+
+        with self.lock:
+            return {'size': len(self.items), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,200 @@
+import threading
+import time
+import logging
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class InFlightRequest():
+    """
+    A speech to text request shared by the callers that joined it.
+
+    Attributes:
+        start (float): Start time of the window.
+        end (float): End time of the window.
+        hot_words (list): The hot words of all the callers.
+        stops (list of functions): The stop flags of the callers (the request stops only if all of them stop).
+        sent (bool): Whether the request was sent (hot words can't be added after).
+        done (threading.Event): Set when the response (or error) is in.
+        transcript (str): The transcript.
+        error (Exception): The error of the request (None if it succeeded).
+        stopped (bool): Whether all the callers stopped (the transcript is empty). Set once, no caller joins after.
+    """
+
+    def __init__(self, start: float, end: float, hot_words: list, stop):
+        """
+        Constructor of InFlightRequest.
+
+        Params:
+            start (float): Start time of the window.
+            end (float): End time of the window.
+            hot_words (list): The hot words of the first caller.
+            stop (function): The stop flag of the first caller.
+        """
+
+        self.start = start
+        self.end = end
+        self.hot_words = list(dict.fromkeys(hot_words))
+        self.stops = [stop]
+        self.sent = False
+        self.done = threading.Event()
+        self.transcript = None
+        self.error = None
+        self.stopped = False
+
+
+class RequestCoalescer():
+    """
+    Single flight for the speech to text requests of one audio file. A caller joins a request in flight
+    instead of sending its own when:
+        - The windows are the same (up to tolerance at each end). The transcript answers the caller as is,
+          and its hot words are added if the request wasn't sent yet.
+        - The window of the request contains the caller's window. A transcript without the caller's hot words
+          means they are not in the caller's window either. Otherwise the caller sends its own request,
+          a transcript has no times to tell where in the larger window they were said.
+
+    Attributes:
+        tolerance (float): Seconds the ends of two windows can differ by and still be the same window.
+        linger (float): Seconds a new request waits for callers to join it (with their hot words) before it's sent.
+        requests (list of InFlightRequest): The requests in flight.
+        sent_requests (int): Requests sent.
+        joined_requests (int): Calls answered by a request of another caller.
+    """
+
+    def __init__(self, tolerance: float, linger: float):
+        """
+        Constructor of RequestCoalescer.
+
+        Params:
+            tolerance (float): Seconds the ends of two windows can differ by and still be the same window.
+            linger (float): Seconds a new request waits for callers to join it before it's sent.
+        """
+
+        self.tolerance = tolerance
+        self.linger = linger
+        self.requests = []
+        self.sent_requests = 0
+        self.joined_requests = 0
+        self.lock = threading.Lock()
+
+    def request(self, start: float, end: float, hot_words: list, stop, recognize, contained: bool = True):
+        """
+        Gets the transcript of a window, sharing the requests in flight.
+
+        Params:
+            start (float): Start time.
+            end (float): End time.
+            hot_words (list): Hot words to look for.
+            stop (function): A flag, should the request stop before it's sent.
+            recognize (function): Sends the request, called with start, end, hot words and stop.
+            contained (bool): Whether to join a request of a larger window.
+
+        Returns:
+            str: The transcript (of a larger window if none of the hot words is in it).
+        """
+
+        with self.lock:
+            (request, same_window) = self.find(start, end, hot_words, contained)
+            leader = request is None
+            if(leader):
+                request = InFlightRequest(start, end, hot_words, stop)
+                same_window = True
+                self.requests.append(request)
+            else:
+                if(request.sent is False):
+                    request.hot_words += [hot_word for hot_word in hot_words if hot_word not in request.hot_words]
+                request.stops.append(stop)
+                self.joined_requests += 1
+
+        if(leader):
+            self.send(request, recognize)
+        else:
+            request.done.wait()
+
+        if(request.error is not None):
+            raise request.error
+
+        # Stopped for the other callers, this one still needs the transcript
+        if(request.stopped and stop() is False):
+            return self.request(start, end, hot_words, stop, recognize, contained=False)
+
+        if(same_window is False and len(set(hot_words) & set(request.transcript.split())) > 0):
+            logger.debug(f'Hot words found in the containing window {request.start}-{request.end}, requesting {start}-{end}.')
+            return self.request(start, end, hot_words, stop, recognize, contained=False)
+
+        return request.transcript
+
+    def find(self, start: float, end: float, hot_words: list, contained: bool):
+        """
+        Finds a request in flight the caller can join (see RequestCoalescer).
+
+        Returns:
+            tuple: The request (None if there is none) and whether its window is the caller's window.
+        """
+
+        containing_request = None
+        for request in self.requests:
+            if(request.stopped):
+                continue
+            # A sent request answers only its hot words
+            if(request.sent and set(hot_words).issubset(request.hot_words) is False):
+                continue
+            if(abs(request.start - start) <= self.tolerance and abs(request.end - end) <= self.tolerance):
+                return (request, True)
+            if(contained and containing_request is None and
+               request.start - self.tolerance <= start and end <= request.end + self.tolerance):
+                containing_request = request
+        return (containing_request, False)
+
+    def send(self, request: InFlightRequest, recognize):
+        """
+        Sends a request (after the linger time), and wakes the callers that joined it.
+
+        Params:
+            request (InFlightRequest): The request.
+            recognize (function): Sends the request.
+        """
+
+        try:
+            if(self.linger > 0):
+                time.sleep(self.linger)
+            with self.lock:
+                request.sent = True
+                hot_words = list(request.hot_words)
+                self.sent_requests += 1
+            request.transcript = recognize(request.start, request.end, hot_words, lambda: self.should_stop(request))
+        except Exception as err:
+            request.error = err
+        finally:
+            with self.lock:
+                self.requests.remove(request)
+            request.done.set()
+
+    def should_stop(self, request: InFlightRequest):
+        """
+        Whether all the callers of a request stopped (checked by the request before it's sent).
+
+        Params:
+            request (InFlightRequest): The request.
+
+        Returns:
+            bool: True if no caller needs the response anymore.
+        """
+
+        with self.lock:
+            if(request.stopped is False):
+                request.stopped = all(stop() for stop in request.stops)
+            return request.stopped
+
+    def stats(self):
+        """
+        Gets the counters of the coalescer.
+
+        Returns:
+            dict: sent and joined requests.
+        """
+
+        with self.lock:
+            return {'sent': self.sent_requests, 'joined': self.joined_requests}
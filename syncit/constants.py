@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 class Constants():
@@ -32,6 +33,10 @@ class Constants():
     RECIEVED_AUDIO_FILE_EXTENSION = 'm4a'
     DESIRED_AUDIO_FILE_EXTENSION = 'wav'
 
+    # The uploaded audio is decoded to mono 16 bit PCM in this sample rate (what the speech to text expects)
+    DECODED_AUDIO_SAMPLE_RATE = 16000
+    DECODED_AUDIO_SAMPLE_WIDTH = 2
+
     SAMPLES_FOLDER = os.path.join('syncit', 'tests', 'samples')
 
     # Section time for the filter hot words method
@@ -45,14 +50,145 @@ class Constants():
     DIVIDED_SECTIONS_TIME = 4
 
     RETRIES_AFTER_API_ERROR = 4
+    # Seconds before a retry: random up to base * 2 ^ (retry - 1), at most max
+    STT_BACKOFF_BASE = 0.25
+    STT_BACKOFF_MAX = 4
+    # Adaptive limit of the speech to text requests in flight (the most is STT_MAX_IN_FLIGHT): starts at initial,
+    # grows by increase for every limit successful requests and is multiplied by decrease when the server is congested
+    STT_LIMIT_INITIAL = 16
+    STT_LIMIT_MIN = 2
+    STT_LIMIT_INCREASE = 1
+    STT_LIMIT_DECREASE = 0.5
+    # The speech to text requests fail fast after this many failures in a row, for this many seconds
+    STT_CIRCUIT_FAILURE_THRESHOLD = 10
+    STT_CIRCUIT_RESET_TIMEOUT = 30
+
+    # lambda: the remote speech to text server. pocketsphinx: offline keyword spotting in a process pool.
+    # Can be overridden with the SPEECH_TO_TEXT_BACKEND environment variable.
+    SPEECH_TO_TEXT_BACKEND = 'lambda'
+    # How the lambda backend sends the audio (see syncit/wire_formats.py), can be overridden with the
+    # SPEECH_TO_TEXT_WIRE_FORMAT and SPEECH_TO_TEXT_WIRE_CODEC environment variables.
+    # base64 is what every server understands, multipart or octet-stream with flac is the smallest.
+    SPEECH_TO_TEXT_WIRE_FORMAT = 'base64'
+    SPEECH_TO_TEXT_WIRE_CODEC = 'raw'
+    POCKETSPHINX_PROCESSES = None  # Defaults to the amount of CPUs
+    POCKETSPHINX_KEYWORD_SENSITIVITY = 1.0
+
+    # Speech to text requests in flight for the whole (uwsgi worker) process, and for one delay check
+    STT_MAX_IN_FLIGHT = 48
+    STT_MAX_IN_FLIGHT_PER_REQUEST = 24
+
+    # Hedged speech to text requests (lambda backend, can be enabled with SPEECH_TO_TEXT_HEDGING=true): a request
+    # that didn't return by this percentile of the recent latencies (and at least the min delay, in seconds) is
+    # sent again. Hedges wait for enough latencies to be tracked, and are limited by a token bucket: each request
+    # adds max ratio tokens (up to max tokens, the longest burst of hedges) and each hedge spends one.
+    STT_HEDGING = False
+    STT_HEDGE_PERCENTILE = 95
+    STT_HEDGE_MIN_DELAY = 0.2
+    STT_HEDGE_MAX_RATIO = 0.1
+    STT_HEDGE_MAX_TOKENS = 3
+    STT_HEDGE_LATENCY_SAMPLES = 500
+    STT_HEDGE_MIN_SAMPLES = 20
+
+    # Transcripts kept in memory by each process, and for how long (in seconds)
+    TRANSCRIPTS_CACHE_SIZE = 20000
+    TRANSCRIPTS_CACHE_TTL = 60 * 60
+
+    # Parsed subtitles files kept in memory by each process, and for how long (in seconds)
+    PARSED_SUBTITLES_CACHE_SIZE = 32
+    PARSED_SUBTITLES_CACHE_TTL = 60 * 60
+
+    # Encoding detection: bytes fed to the detector at a time, and the most it reads (it usually stops much earlier)
+    ENCODING_DETECTION_CHUNK_SIZE = 4096
+    ENCODING_DETECTION_MAX_BYTES = 256 * 1024
+    # Cues sampled for the language detection
+    LANGUAGE_DETECTION_SAMPLE_TEXTS = 200
+
+    # Translation requests: texts and characters in one batch (the official API allows 128 texts, ~5k characters
+    # recommended), and batches in flight for the whole process
+    TRANSLATION_BATCH_MAX_TEXTS = 100
+    TRANSLATION_BATCH_MAX_CHARACTERS = 4500
+    TRANSLATION_MAX_CONCURRENT_BATCHES = 4
+
+    # Translations kept on disk, shared by the processes (see TranslationStore).
+    # The path can be overridden with the TRANSLATION_STORE_PATH environment variable (empty to disable).
+    TRANSLATION_STORE_PATH = os.path.join(tempfile.gettempdir(), 'syncit_translations.sqlite3')
+    TRANSLATION_STORE_MAX_SIZE = 500000
+    TRANSLATION_STORE_TIMEOUT = 5  # Seconds to wait for a lock of another process
+    TRANSLATION_STORE_WRITE_BATCH_SIZE = 1000
+
+    # Sync sessions (the subtitles uploaded once for all the chunks), kept on disk and shared by the processes
+    # of one host (see sessions.check_single_host). The path can be overridden with the SESSION_STORE_PATH
+    # environment variable.
+    SESSION_STORE_PATH = os.path.join(tempfile.gettempdir(), 'syncit_sessions.sqlite3')
+    SESSION_STORE_MAX_SIZE = 256 * 1024 * 1024  # Bytes of subtitles in all the sessions
+    SESSION_STORE_TIMEOUT = 5  # Seconds to wait for a lock of another process
+    SESSION_IDLE_TIMEOUT = 30 * 60  # Seconds a session is kept without a chunk
+    # Delays this close to a delay verified falty in previous chunks are not verified again, once it was rejected
+    # by SESSION_FALTY_DELAY_MIN_REJECTIONS chunks (one noisy chunk can reject the real delay), for
+    # SESSION_FALTY_DELAY_TTL seconds since the last rejection. A session keeps the SESSION_MAX_FALTY_DELAYS
+    # most recently rejected delays.
+    SESSION_FALTY_DELAY_TOLERANCE = 0.1
+    SESSION_FALTY_DELAY_MIN_REJECTIONS = 2
+    SESSION_FALTY_DELAY_TTL = 10 * 60
+    SESSION_MAX_FALTY_DELAYS = 50
+
+    # Delay check jobs, kept on disk and shared by the processes of one host (see sessions.check_single_host).
+    # The path can be overridden with JOB_STORE_PATH.
+    JOB_STORE_PATH = os.path.join(tempfile.gettempdir(), 'syncit_jobs.sqlite3')
+    JOB_STORE_TIMEOUT = 5  # Seconds to wait for a lock of another process
+    # Checks each process runs at once (JOB_WORKERS environment variable, 0 leaves the jobs to `python -m syncit.jobs`)
+    JOB_WORKERS = 4
+    JOB_POLL_INTERVAL = 1  # Seconds between looking for jobs queued by other processes
+    JOB_STALE_TIMEOUT = 10 * 60  # A running job without progress for this long is failed (its process died)
+    JOB_TTL = 60 * 60  # Seconds a job is kept after its last update
+    # Server sent events: seconds between looking for progress, and between keep alive comments
+    JOB_EVENTS_POLL_INTERVAL = 0.5
+    JOB_EVENTS_KEEPALIVE_INTERVAL = 15
+    # Event streams each process serves at once (each holds a uwsgi thread), more clients poll /jobs/<job_id>.
+    # A stream ends after JOB_EVENTS_MAX_DURATION seconds (the EventSource reconnects after JOB_EVENTS_RETRY).
+    JOB_EVENTS_MAX_STREAMS = 1
+    JOB_EVENTS_MAX_DURATION = 60
+    JOB_EVENTS_RETRY = 2
     
     MAX_OCCURENCES_IN_ONE_SECTION = 2
     MAX_OCCURENCES_FOR_ONE_WORD = 2
     TRIM_SECTION_STEP = 0.2
+    # sweep: check every step at once. bisect: search the step in rounds (fewer requests, more latency).
+    # word_timestamps: one request per section, the backend has to return word timestamps.
+    TRIM_SECTION_MODE = 'bisect'
+    # Words recognized with lower confidence are ignored in the word_timestamps mode
+    WORD_TIMESTAMPS_MIN_CONFIDENCE = 0.1
+    # Steps checked in parallel in each bisect round (1 is a binary search)
+    TRIM_SECTION_BISECT_PROBES = 2
+    # Sections trimmed at once, the delays of a section are verified (up to VERIFY_DELAYS_IN_FLIGHT at once)
+    # while the next sections are trimmed. 1 trims the sections one at a time.
+    TRIM_SECTIONS_IN_FLIGHT = 4
+    VERIFY_DELAYS_IN_FLIGHT = 4
     REQUEST_TIMEOUT = 8
+    # Speech to text requests in flight are shared by windows whose ends differ by up to this (seconds),
+    # and a new request waits this long (seconds) for other callers to add their hot words before it's sent
+    COALESCE_TOLERANCE = 0.05
+    COALESCE_LINGER = 0.01
 
     VERIFY_TRIMMED_WORD_RADIUS = 0.4
 
+    # Voice activity envelope: frame length (seconds), the percentile of the frames energy taken as the
+    # noise floor, and how many dB above it a frame starts (margin) and is fully (margin + range) speech.
+    VOICE_ACTIVITY_FRAME_TIME = 0.05
+    VOICE_ACTIVITY_NOISE_PERCENTILE = 10
+    VOICE_ACTIVITY_MARGIN_DB = 6
+    VOICE_ACTIVITY_RANGE_DB = 12
+    # A frame with voice activity above the threshold is speech. Timespans with less speech time
+    # (in seconds) are not sent to the speech to text, they get 0 occurences.
+    VOICE_ACTIVITY_SPEECH_THRESHOLD = 0.25
+    VOICE_ACTIVITY_MIN_SPEECH_TIME = 0.15
+
+    # Delays estimated from the voice activity and verified before the speech recognition search
+    DELAY_ESTIMATION_CANDIDATES = 3
+    DELAY_ESTIMATION_MIN_CONFIDENCE = 0.2
+    DELAY_ESTIMATION_PEAK_DISTANCE = 1  # Seconds between candidates
+
     GOOGLE_AUTH_FILENAME = 'google_auth.json'
 
     GOOGLE_LANGUAGES = [{'language': 'af', 'name': 'Afrikaans'},
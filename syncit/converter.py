@@ -1,17 +1,16 @@
-from moviepy.editor import AudioFileClip
 import subprocess
-import base64
-import tempfile
-import shutil
 import os
-import base64
+import shutil
+import hashlib
 import threading
-import json
-import requests
 from datetime import datetime
-import uuid
-import speech_recognition as sr
+import numpy as np
 from syncit.constants import Constants
+from syncit.cache import LRUCache
+from syncit.recognizers import get_recognizer
+from syncit.coalescer import RequestCoalescer
+from syncit.resilience import SpeechToTextError
+from syncit.voice_activity import get_voice_activity
 import logging
 from logger_setup import setup_logging
 
@@ -20,15 +19,85 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
+def get_ffmpeg_binary():
+    """
+    Gets the ffmpeg binary: the FFMPEG_BINARY environment variable, ffmpeg on the PATH,
+    or the one bundled with imageio_ffmpeg (installed with MoviePy).
+
+    Returns:
+        str: Path (or name) of the binary.
+    """
+
+    if(os.getenv('FFMPEG_BINARY') is not None):
+        return os.getenv('FFMPEG_BINARY')
+    if(shutil.which('ffmpeg') is not None):
+        return 'ffmpeg'
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return 'ffmpeg'
+
+
+FFMPEG_BINARY = get_ffmpeg_binary()
+
+def decode_pcm(audio_binary: bytes, sample_rate: int):
+    """
+    Decodes audio with one ffmpeg process, straight to mono 16 bit PCM. Nothing is written to disk.
+
+    The audio is handed to ffmpeg through an anonymous in-memory file when the platform
+    supports it, because the m4a index (moov atom) is usually at the end of the file
+    and ffmpeg can't seek back in a pipe.
+
+    Params:
+        audio_binary (bytes): The audio file content.
+        sample_rate (int): Sample rate to decode to.
+
+    Returns:
+        np.ndarray: The int16 samples.
+    """
+
+    output_args = ['-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+                   '-ac', '1', '-ar', str(sample_rate), 'pipe:1']
+
+    if(hasattr(os, 'memfd_create')):
+        with os.fdopen(os.memfd_create('audio'), 'w+b') as memory_file:
+            memory_file.write(audio_binary)
+            memory_file.flush()
+            memory_file.seek(0)
+            command = [FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error',
+                       '-i', f'/dev/fd/{memory_file.fileno()}'] + output_args
+            process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     pass_fds=(memory_file.fileno(),))
+    else:
+        command = [FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0'] + output_args
+        process = subprocess.run(command, input=audio_binary, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    if(process.returncode != 0 or len(process.stdout) == 0):
+        raise Exception(f'Unable to decode audio file. ffmpeg: {process.stderr.decode(errors="replace")}')
+
+    return np.frombuffer(process.stdout, dtype=np.int16)
+
+
+# Transcripts of the process, shared between requests (clients often retry the same audio)
+transcripts_cache = LRUCache(Constants.TRANSCRIPTS_CACHE_SIZE, Constants.TRANSCRIPTS_CACHE_TTL)
+
+
 class Converter():
     """
     Class designed to make all the conversions and merges between video and audio.
 
     Attributes:
-        audio (str): Path to audio file.
-        tmpdir (str): Persistent temporary folder (if created).
+        pcm (np.ndarray): The decoded audio, mono int16 samples in one contiguous buffer.
+        sample_rate (int): Sample rate of the decoded audio.
+        sample_width (int): Sample width (in bytes) of the decoded audio.
+        audio_hash (str): Hash of the decoded audio (identifies the audio in the transcripts cache).
+        voice_activity (np.ndarray): Voice activity envelope, one value per Constants.VOICE_ACTIVITY_FRAME_TIME.
+        speech_frames (np.ndarray): Prefix sum of the frames with speech.
+        skipped_windows (int): Timespans not sent to the speech to text because they have no speech.
         language (str): Language of the audio.
-        session (requests.session): Session to persist when talking with API.
+        recognizer (Recognizer): The speech to text backend.
+        coalescer (RequestCoalescer): Shares the requests in flight between the callers of convert_audio_to_text.
     """
 
     def __init__(self, audio_file, language: str):
@@ -40,55 +109,88 @@ class Converter():
             language (str): Language of the audio.
         """
 
-        self.tmpdir = tempfile.mkdtemp()
-        self.audio = self.convert_filestorage_to_file(audio_file)
-        self.repair_audio_file()
+        self.skipped_windows = 0
+        self.lock = threading.Lock()
+        self.decode_audio(audio_file)
         # Replace 2 char code language with 4 char code language (e.g.: en -> en-US)
         self.language = list(filter(lambda lan: lan['code'] == language ,Constants.AUDIO_LANGUAGES))[0]['pocketsphinx_code']
-        self.session = requests.Session()
+        self.recognizer = get_recognizer()
+        self.coalescer = RequestCoalescer(Constants.COALESCE_TOLERANCE, Constants.COALESCE_LINGER)
 
-    def convert_filestorage_to_file(self, audio_file):
+    def decode_audio(self, audio_file):
         """
-        Converts FileStorage object to a file. Stores it in temporary location and returns it's path.
+        Decodes the uploaded audio (see decode_pcm) in the sample rate the speech to text expects,
+        and analyzes its voice activity.
 
         Params:
             audio_file (FileStorage): Object with the video file loaded.
-            extension (str): The file extension.
+        """
+
+        audio_binary = audio_file.read()
+        logger.debug(f'Decoding audio. Size: {len(audio_binary)} bytes.')
+        self.sample_rate = Constants.DECODED_AUDIO_SAMPLE_RATE
+        self.sample_width = Constants.DECODED_AUDIO_SAMPLE_WIDTH
+        self.pcm = decode_pcm(audio_binary, self.sample_rate)
+        self.audio_hash = hashlib.blake2b(self.pcm, digest_size=16).hexdigest()
+        self.voice_activity = get_voice_activity(self.pcm, self.sample_rate)
+        # Prefix sum of the speech frames, the speech time of any window is one subtraction
+        self.speech_frames = np.concatenate(
+            ([0], np.cumsum(self.voice_activity >= Constants.VOICE_ACTIVITY_SPEECH_THRESHOLD)))
+        logger.debug(f'Decoded {len(self.pcm)} samples. Sample rate: {self.sample_rate}.')
+
+    def get_audio_window(self, start: float, end: float):
+        """
+        Gets the PCM data of a timespan without copying it.
+
+        Params:
+            start (float): start time.
+            end (float): end time.
 
         Returns:
-            str: Path to video file.
+            memoryview: The raw frame data of the timespan.
         """
 
-        filename = f'{uuid.uuid4().hex[:10]}.{Constants.RECIEVED_AUDIO_FILE_EXTENSION}'
-        path = os.path.join(self.tmpdir, filename)
-        logger.debug(f'Converting FileStorage to file. path: {path}')
-        with open(path, 'wb') as f:
-            f.write(audio_file.read())
+        first_sample = min(max(int(start * self.sample_rate), 0), len(self.pcm))
+        last_sample = min(max(int(end * self.sample_rate), first_sample), len(self.pcm))
+        return memoryview(self.pcm[first_sample:last_sample])
 
-        logger.debug(f'Finished converting FileStorage to file.')
-        return path
+    def get_speech_time(self, start: float, end: float):
+        """
+        Gets how much speech there is in a timespan, by the voice activity.
 
-    def repair_audio_file(self):
+        Params:
+            start (float): start time.
+            end (float): end time.
+
+        Returns:
+            float: Speech time in seconds.
         """
-        Repairs the audio file loaded in self.audio
-        The frontend gives compressed audio file, moviepy can create a new repaired file
-        that will work with the speech recognition.
 
-        Re sets the path.
+        frame_time = Constants.VOICE_ACTIVITY_FRAME_TIME
+        first_frame = min(max(int(start / frame_time), 0), len(self.voice_activity))
+        last_frame = min(max(int(np.ceil(end / frame_time)), first_frame), len(self.voice_activity))
+        return (self.speech_frames[last_frame] - self.speech_frames[first_frame]) * frame_time
+
+    def is_silent(self, start: float, end: float):
         """
+        Checks if a timespan has too little speech to have a hot word (silence, music, effects).
+        Counts the skipped timespans.
 
-        logger.debug(f'Repairing audio file: {self.audio}')
-        clip = AudioFileClip(self.audio)
-        filename = f'{uuid.uuid4().hex[:10]}.{Constants.DESIRED_AUDIO_FILE_EXTENSION}'
-        path = os.path.join(self.tmpdir, filename)
-        logger.debug(f'Repairing audio file. New path: {path}')
-        clip.write_audiofile(path)
-        try:
-            os.remove(self.audio)
-            logger.debug(f'Removed file {self.audio}')
-        except:
-            logger.warning(f'Unable to remove file {self.audio}.')
-        self.audio = path
+        Params:
+            start (float): start time.
+            end (float): end time.
+
+        Returns:
+            bool: True if there is no need to send the timespan to the speech to text.
+        """
+
+        if(self.get_speech_time(start, end) >= Constants.VOICE_ACTIVITY_MIN_SPEECH_TIME):
+            return False
+
+        with self.lock:
+            self.skipped_windows += 1
+        logger.debug(f'Skipping {start}-{end}, no speech. Skipped windows: {self.skipped_windows}.')
+        return True
 
     def convert_audio_to_text(self, start: float, end: float, hot_words: str, stop):
         """
@@ -102,49 +204,106 @@ class Converter():
 
         Returns:
             str: The required transcript.
+
+        Raises:
+            SpeechToTextError: The speech to text failed (the transcript is unknown, not empty).
         """
 
-        recognizer = sr.Recognizer()
-        audio_file = sr.AudioFile(self.audio)
+        if(self.is_silent(start, end)):
+            return ''
 
-        with audio_file as source:
-            duration = end - start
-            audio = recognizer.record(source, offset=start, duration=duration)
+        cache_key = self.get_cache_key(start, end, hot_words, 'text')
+        transcript = transcripts_cache.get(cache_key)
+        if(transcript is not None):
+            logger.debug(f'Transcript of {start}-{end} with words {hot_words} found in cache. {transcripts_cache.stats()}')
+            return transcript
 
         try:
-            data = {
-                'frame_data_base64': base64.b64encode(audio.frame_data),
-                'sample_rate': audio.sample_rate,
-                'sample_width': audio.sample_width,
-                'language': self.language,
-                'hot_words': json.dumps(hot_words)
-            }
-            url = os.getenv('CONVERT_SPEECH_TO_TEXT_SERVER_URL')
-            if(url is None):
-                raise Exception(f'Convert speech to text server url (lambda) is None.')
-            
-            for _ in range(Constants.RETRIES_AFTER_API_ERROR):
-                if(stop() is True):
-                    logger.debug(f"Stopping check for {start}-{end} with words {hot_words}")
-                    return ''
-                res = self.session.post(url, data=data, timeout=Constants.REQUEST_TIMEOUT)
-                if(res.status_code == 200):
-                    return res.text
-            raise Exception(f'Recieved status code {res.status_code} from speech to text API. Response: {res.text}.')
+            return self.coalescer.request(start, end, hot_words, stop, self.recognize_text)
+        except SpeechToTextError:
+            raise
+        except Exception as e:
+            raise SpeechToTextError(f'Unknown Error while recognizing. Error: {e}') from e
 
+    def recognize_text(self, start: float, end: float, hot_words: list, stop):
+        """
+        Sends a timespan to the speech to text (see convert_audio_to_text, the requests in flight are shared by the coalescer).
 
-        except Exception as e:
-            logger.error(f'Unknown Error while recognizing. Error: {e}')
-            return ''
+        Params:
+            start (float): start time.
+            end (float): end time.
+            hot_words (list): hot words to look for.
+            stop (function): A flag, should the function stop before (checked before sending a request).
+
+        Returns:
+            str: The transcript.
+        """
+
+        frame_data = self.get_audio_window(start, end)
+        transcript = self.recognizer.recognize(
+            frame_data, self.sample_rate, self.sample_width, self.language, hot_words, stop)
+        # A stopped request has an empty transcript, don't cache it
+        if(stop() is False):
+            transcripts_cache.set(self.get_cache_key(start, end, hot_words, 'text'), transcript)
+        return transcript
 
-    def clean(self):
+    def convert_audio_to_words(self, start: float, end: float, hot_words: list, stop):
         """
-        Deletes the temporary folder, if created.
+        Converts audio file to words with their timestamps, so the position of a hot word is known
+        from one transcription of the timespan.
+
+        Params:
+            start (float): start time.
+            end (float): end time.
+            hot_words (list): hot words to look for.
+            stop (function): A flag, should the function stop before (checked before sending a request).
+
+        Returns:
+            list of dicts: The recognized words.
+                word (str): The word.
+                start (float): Start time of the word in the audio.
+                end (float): End time of the word in the audio.
+                confidence (float): Confidence of the recognition (0 to 1).
+
+        Raises:
+            SpeechToTextError: The speech to text failed.
         """
 
-        if(self.tmpdir):
+        if(self.is_silent(start, end)):
+            return []
+
+        cache_key = self.get_cache_key(start, end, hot_words, 'words')
+        words = transcripts_cache.get(cache_key)
+        if(words is None):
+            frame_data = self.get_audio_window(start, end)
             try:
-                logger.debug(f'Removed temporary folder. Folder: {self.tmpdir}')
-                shutil.rmtree(self.tmpdir)
-            except:
-                logger.warning(f'Unable to remove temporary folder. Path: {self.tmpdir}')
\ No newline at end of file
+                words = self.recognizer.recognize_words(
+                    frame_data, self.sample_rate, self.sample_width, self.language, hot_words, stop)
+            except SpeechToTextError:
+                raise
+            except Exception as e:
+                raise SpeechToTextError(f'Unknown Error while recognizing words. Error: {e}') from e
+
+            if(stop() is False):
+                transcripts_cache.set(cache_key, words)
+
+        # The recognizer times are relative to the timespan
+        return [dict(word, start=start + word['start'], end=start + word['end']) for word in words]
+
+    def get_cache_key(self, start: float, end: float, hot_words: list, kind: str):
+        """
+        Gets the key of a timespan in the transcripts cache.
+        Same audio, window (in milliseconds), language, hot words and backend -> same transcript.
+
+        Params:
+            start (float): start time.
+            end (float): end time.
+            hot_words (list): hot words to look for.
+            kind (str): The kind of transcript (text or words).
+
+        Returns:
+            tuple: The key.
+        """
+
+        return (self.audio_hash, int(round(start * 1000)), int(round(end * 1000)),
+                self.language, tuple(sorted(set(hot_words))), self.recognizer.name, kind)
@@ -4,11 +4,16 @@ import threading
 import time
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
 import numpy as np
 from syncit.constants import Constants
 from logger_setup import setup_logging
 from syncit.subtitle_parser import SubtitleParser
 from syncit.converter import Converter
+from syncit.scheduler import get_scheduler
+from syncit.occurences_index import OccurencesIndex
+from syncit.delay_estimator import estimate_delays
+from syncit.resilience import SpeechToTextError, CircuitOpenError
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -25,9 +30,15 @@ class DelayChecker():
         sp (SubtitleParser): SubtitleParser object with the subtitles loaded.
         hot_words (tuple): Hot words of this section.
         self.falty_delays (list): list of delays already verified falty. 
+        occurences_index (OccurencesIndex): The windows already checked for each hot word.
+        stt (RequestScope): Scope of this check in the process wide speech to text scheduler.
+        trim_stt_calls (dict): Speech to text requests used for trimming, by trim mode.
+        session (Session): The sync session of this chunk (None if the subtitles were uploaded with the chunk).
+        progress_callback (function): Called with the stage, the steps done and the total steps of the stage.
     """
 
-    def __init__(self, audio_file, start: int, end: int, subtitles_file: str, audio_language: str, subtitles_language: str):
+    def __init__(self, audio_file, start: int, end: int, subtitles_file: str, audio_language: str, subtitles_language: str,
+                 session=None, progress_callback=None):
         """
         Class to check the delay.
 
@@ -37,6 +48,8 @@ class DelayChecker():
             end (int): End time of the video.
             subtitles_file (FileStorafe): The subtitles file.
             extension (str): The extension.
+            session (Session): The sync session, its last delay is tried first and its falty delays are skipped.
+            progress_callback (function): Called as the check progresses (see report_progress).
         """
 
         self.converter = Converter(audio_file, audio_language)
@@ -49,7 +62,11 @@ class DelayChecker():
         self.hot_words = self.sp.get_valid_hot_words(start, end)
         logger.debug(f'Hot words: {self.hot_words} start: {start} end: {end}')
         self.falty_delays = []
-        self.checked = []
+        self.occurences_index = OccurencesIndex()
+        self.stt = get_scheduler().create_request_scope()
+        self.trim_stt_calls = {}
+        self.session = session
+        self.progress_callback = progress_callback
 
     def check_delay(self):
         """
@@ -62,6 +79,8 @@ class DelayChecker():
         if(len(self.hot_words) < Constants.VERIFY_DELAY_SAMPLES_TO_CHECK):
             logger.debug(f'Not enough hot words, aborting.')
             return
+
+        self.report_progress('occurences', 0, 1)
         grouped_sections = self.get_grouped_sections()
         grouped_sections = self.get_occurences_for_grouped_sections(
             grouped_sections)
@@ -69,31 +88,175 @@ class DelayChecker():
         if(len(self.hot_words) < Constants.VERIFY_DELAY_SAMPLES_TO_CHECK):
             logger.debug(f'Not enough hot words after filtering, aborting')
             return
+
+        # The delay of the previous chunk usually holds for the next ones
+        if(self.session is not None and self.session.last_delay is not None):
+            logger.debug(f'Verifing the last delay of the session {self.session.last_delay}.')
+            if(self.verify_delay(self.session.last_delay)):
+                return self.session.last_delay
+
+        # Try the delays estimated from the voice activity first, they don't need the trimming.
+        # Verified with the filtered hot words, common words (found everywhere) would pass any delay.
+        candidates = self.estimate_delays()
+        for index, candidate in enumerate(candidates):
+            self.report_progress('estimated', index, len(candidates))
+            if(self.is_known_falty(candidate['delay'])):
+                continue
+            logger.debug(f'Verifing estimated delay {candidate}.')
+            if(self.verify_delay(candidate['delay'])):
+                return candidate['delay']
+        # The estimated delays don't count towards the maximum delays to verify
+        estimated_falty_delays = len(self.falty_delays)
+
         grouped_sections = self.filter_grouped_sections(grouped_sections)
+        return self.search_trimmed_delays(grouped_sections, estimated_falty_delays)
 
-        for section in grouped_sections:
-            section_ids = [item['id'] for item in section['ids']]
-            trimmed_results = self.trim_section(
-                section['start'], section['end'], section_ids)
-            if(trimmed_results == None):
+    def search_trimmed_delays(self, grouped_sections: list, estimated_falty_delays: int):
+        """
+        Trims the sections and verifies their delays, pipelined: Constants.TRIM_SECTIONS_IN_FLIGHT sections are
+        trimmed at once, and the delays of a section are verified as soon as it's trimmed (while the next sections
+        are trimmed). The first verified delay cancels the rest of the trimming and verifing. A delay close to one
+        already verified in the search (Constants.SESSION_FALTY_DELAY_TOLERANCE, as is_known_falty) is skipped.
+
+        Params:
+            grouped_sections (list of dicts): The filtered sections (see filter_grouped_sections).
+            estimated_falty_delays (int): Falty delays found before the trimming (not counted towards
+                Constants.MAXIMUM_DELAYS_TO_VERIFY).
+
+        Returns:
+            float: The delay (None if not found).
+        """
+
+        cancelled = threading.Event()
+        trim_executor = ThreadPoolExecutor(max_workers=Constants.TRIM_SECTIONS_IN_FLIGHT, thread_name_prefix='trim-section')
+        verify_executor = ThreadPoolExecutor(max_workers=Constants.VERIFY_DELAYS_IN_FLIGHT, thread_name_prefix='verify-delay')
+        trim_futures = [trim_executor.submit(self.get_section_delays, section, cancelled.is_set)
+                        for section in grouped_sections]
+        verify_futures = {}
+        pending = set(trim_futures)
+        trimmed_sections = 0
+        self.report_progress('trimming', 0, len(grouped_sections))
+
+        try:
+            while(len(pending) > 0):
+                (done, pending) = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if(future.cancelled()):
+                        continue
+                    if(future in verify_futures):
+                        if(future.result()):
+                            return verify_futures[future]
+                        continue
+
+                    trimmed_sections += 1
+                    self.report_progress('trimming', trimmed_sections, len(grouped_sections))
+                    for delay in future.result():
+                        # Other sections can find the same delay, verify it once
+                        if(any(abs(delay - verified_delay) <= Constants.SESSION_FALTY_DELAY_TOLERANCE
+                               for verified_delay in verify_futures.values())):
+                            logger.debug(f'Delay {delay} is already verified, skipping.')
+                            continue
+                        # Stop verifing if already checked a lot of delays (counting the ones being verified)
+                        verifing = len([verify_future for verify_future in verify_futures if not verify_future.done()])
+                        if(len(self.falty_delays) - estimated_falty_delays + verifing > Constants.MAXIMUM_DELAYS_TO_VERIFY):
+                            logger.debug(f'Verified too many delays, skipping delay {delay}.')
+                            [trim_future.cancel() for trim_future in trim_futures]
+                            continue
+                        verify_future = verify_executor.submit(self.verify_delay, delay, cancelled.is_set)
+                        verify_futures[verify_future] = delay
+                        pending.add(verify_future)
+            return None
+
+        finally:
+            # The running stages see the cancel flag and stop sending requests
+            cancelled.set()
+            [future.cancel() for future in trim_futures + list(verify_futures)]
+            trim_executor.shutdown(wait=False)
+            verify_executor.shutdown(wait=False)
+
+    def get_section_delays(self, section: dict, cancelled=lambda: False):
+        """
+        Trims a grouped section and gets the delays of its hot words (runs in the pipeline, see search_trimmed_delays).
+
+        Params:
+            section (dict): The section (see filter_grouped_sections).
+            cancelled (function): Whether the search was cancelled.
+
+        Returns:
+            list of float: The delays, without the delays known falty.
+        """
+
+        section_ids = [item['id'] for item in section['ids']]
+        try:
+            trimmed_results = self.trim_section(section['start'], section['end'], section_ids, cancelled=cancelled)
+        except CircuitOpenError:
+            raise
+        except SpeechToTextError as err:
+            # Skip the section, the other ones can still find the delay
+            logger.warning(f'Unable to trim section {section["start"]}-{section["end"]}. Error: {err}')
+            return []
+        if(trimmed_results is None):
+            return []
+
+        delays = []
+        for trimmed_result in trimmed_results:
+            # Find the original time of the word in the subtitles
+            subtitles_start = [hot_word_item['start']
+                               for hot_word_item in self.hot_words if hot_word_item['id'] == trimmed_result['id']][0]
+            delay = trimmed_result['start'] - \
+                (subtitles_start % Constants.DELAY_CHECKER_SECTIONS_TIME)
+            if(self.is_known_falty(delay)):
                 continue
+            logger.debug(f'Delay {delay} of word id {trimmed_result["id"]}.')
+            delays.append(delay)
+        return delays
 
-            for trimmed_result in trimmed_results:
-                # Abort if already checked a lot of delays
-                if(len(self.falty_delays) > Constants.MAXIMUM_DELAYS_TO_VERIFY):
-                    return None
+    def report_progress(self, stage: str, done: int, total: int):
+        """
+        Reports the progress of the check to the progress callback (if any).
 
-                # Find the original time of the word in the subtitles
-                subtitles_start = [hot_word_item['start']
-                                   for hot_word_item in self.hot_words if hot_word_item['id'] == trimmed_result['id']][0]
-                delay = trimmed_result['start'] - \
-                    (subtitles_start % Constants.DELAY_CHECKER_SECTIONS_TIME)
-                logger.debug(
-                    f'Verifing delay {delay} of word id {trimmed_result["id"]}.')
-                is_verified = self.verify_delay(delay)
-                if(is_verified):
-                    self.converter.clean()
-                    return delay
+        Params:
+            stage (str): occurences (finding the hot words in the sections), estimated (verifing the estimated
+                delays) or trimming (trimming the sections and verifing their delays).
+            done (int): Steps of the stage done.
+            total (int): Steps in the stage.
+        """
+
+        if(self.progress_callback is not None):
+            self.progress_callback(stage, done, total)
+
+    def is_known_falty(self, delay: float):
+        """
+        Checks if the delay was verified falty in previous chunks of the session (see Session.is_known_falty).
+
+        Params:
+            delay (float): The delay.
+
+        Returns:
+            bool: Whether the delay is known falty.
+        """
+
+        if(self.session is None):
+            return False
+        return self.session.is_known_falty(delay)
+
+    def estimate_delays(self):
+        """
+        Estimates delays by aligning the voice activity of the audio with the subtitles cues.
+
+        Returns:
+            list of dicts: The estimated delays, ranked (only confident ones).
+                delay (float): The delay.
+                confidence (float): Correlation at this delay.
+        """
+
+        # Same time base as the delays (subtitles time % Constants.DELAY_CHECKER_SECTIONS_TIME), without wrapping around
+        section_offset = self.start - self.start % Constants.DELAY_CHECKER_SECTIONS_TIME
+        cues = [(cue_start - section_offset, cue_end - section_offset) for cue_start, cue_end
+                in self.sp.get_cues(self.start - Constants.DELAY_RADIUS, self.end + Constants.DELAY_RADIUS)]
+        candidates = estimate_delays(self.converter.voice_activity, cues)
+        logger.debug(f'Estimated delays: {candidates}')
+        return [candidate for candidate in candidates if candidate['confidence'] >= Constants.DELAY_ESTIMATION_MIN_CONFIDENCE]
 
     def get_grouped_sections(self):
         """
@@ -108,30 +271,27 @@ class DelayChecker():
                 end (float): End time.
         """
 
+        section_starts = list(range(0, Constants.DELAY_CHECKER_SECTIONS_TIME, Constants.DIVIDED_SECTIONS_TIME))
+        # Handle edge case where the end time is after the audio end time
+        section_ends = [min(section_start + Constants.DIVIDED_SECTIONS_TIME + Constants.ONE_WORD_AUDIO_TIME,
+                            Constants.DELAY_CHECKER_SECTIONS_TIME) for section_start in section_starts]
+
+        # The timespan each hot word can be said in (any delay inside the radius)
+        starts = np.array([hot_word_item['start'] for hot_word_item in self.hot_words], dtype=np.float64)
+        ends = np.array([hot_word_item['end'] for hot_word_item in self.hot_words], dtype=np.float64)
+        hot_words_starts = starts % Constants.DELAY_CHECKER_SECTIONS_TIME - Constants.DELAY_RADIUS
+        hot_words_ends = hot_words_starts + (Constants.DELAY_RADIUS * 2) + (ends - starts)
+
+        # Sections x hot words, whether the hot word can be said in the section
+        in_sections = (hot_words_starts[np.newaxis, :] < np.array(section_ends)[:, np.newaxis]) & \
+            (hot_words_ends[np.newaxis, :] > np.array(section_starts)[:, np.newaxis])
+
         grouped_sections = []
-        for section_start in range(0, Constants.DELAY_CHECKER_SECTIONS_TIME, Constants.DIVIDED_SECTIONS_TIME):
-            section_end = section_start + Constants.DIVIDED_SECTIONS_TIME + \
-                Constants.ONE_WORD_AUDIO_TIME
-            if(section_end > Constants.DELAY_CHECKER_SECTIONS_TIME):
-                # Handle edge case where the end time is after the audio end time
-                section_end = Constants.DELAY_CHECKER_SECTIONS_TIME
-            section_item = {'start': section_start,
-                            'end': section_end, 'ids': []}
-
-            # Append ids of hot words inside timespan
-            for hot_word_item in self.hot_words:
-                hot_word_start = hot_word_item['start'] % Constants.DELAY_CHECKER_SECTIONS_TIME - \
-                    Constants.DELAY_RADIUS
-                hot_word_end = hot_word_start + \
-                    (Constants.DELAY_RADIUS * 2) + \
-                    (hot_word_item['end'] - hot_word_item['start'])
-                is_word_in_section = hot_word_start < section_end and hot_word_end > section_start
-                if(is_word_in_section):
-                    section_item['ids'].append(
-                        {'id': hot_word_item['id'], 'occurences': None})
-
-            if(len(section_item['ids']) > 0):
-                grouped_sections.append(section_item)
+        for section_start, section_end, in_section in zip(section_starts, section_ends, in_sections):
+            indexes = np.flatnonzero(in_section)
+            if(len(indexes) > 0):
+                grouped_sections.append({'start': section_start, 'end': section_end,
+                                         'ids': [{'id': self.hot_words[index]['id'], 'occurences': None} for index in indexes]})
 
         logger.debug(f'Grouped sections: {grouped_sections}')
         return grouped_sections
@@ -157,19 +317,19 @@ class DelayChecker():
                 end (float): End time.
         """
 
-        threads = []
+        futures = []
         results = []
         for section_item in grouped_sections:
             start = section_item['start']
             end = section_item['end']
             ids = [item['id'] for item in section_item['ids']]
-            thread = threading.Thread(
-                target=self.get_hot_words_occurences, args=(start, end, ids, results))
-            thread.start()
-            threads.append(thread)
+            # The occurences are counted (see filter_hot_words), the index can't answer with a lower bound
+            futures.append(self.stt.submit(
+                self.get_hot_words_occurences, start, end, ids, results, exact=True))
 
-        # Wait for threads to finish
-        [thread.join() for thread in threads]
+        wait(futures)
+        # The sections of the failed requests are left out (like sections without the hot words)
+        self.check_failures(futures)
 
         logger.debug(f'Grouped Results with occurences: {results}')
         return results
@@ -201,8 +361,8 @@ class DelayChecker():
             for item in section['ids']:
                 words_total_occurences[item['id']] += item['occurences']
 
-        ids_to_remove = [id for id in words_total_occurences if words_total_occurences[id]
-                         == 0 or words_total_occurences[id] > Constants.FILTER_HOT_WORDS_MAXIMUM_OCCURENCES]
+        ids_to_remove = {id for id in words_total_occurences if words_total_occurences[id]
+                         == 0 or words_total_occurences[id] > Constants.FILTER_HOT_WORDS_MAXIMUM_OCCURENCES}
         filtered_hot_words = [
             hot_word_item for hot_word_item in self.hot_words if hot_word_item['id'] not in ids_to_remove]
         logger.debug(f'Filtered hot words: {filtered_hot_words}')
@@ -229,33 +389,33 @@ class DelayChecker():
                 end (float): End time.
         """
 
-        # Remove words who in at least one section, they were found more then the threshold set
-        ids_to_remove = [item['id'] for section in grouped_sections for item in section['ids']
-                         if item['occurences'] > Constants.MAX_OCCURENCES_IN_ONE_SECTION]
+        # Sections x ids, the occurences of each id in each section (0 if the id isn't in the section)
+        ids = list(dict.fromkeys(item['id'] for section in grouped_sections for item in section['ids']))
+        columns = {id: column for column, id in enumerate(ids)}
+        occurences = np.zeros((len(grouped_sections), len(ids)))
+        for row, section in enumerate(grouped_sections):
+            for item in section['ids']:
+                occurences[row, columns[item['id']]] = item['occurences']
 
-        # Remove words who were found in many sections
-        ids_of_grouped_sections = [
-            item['id'] for section in grouped_sections for item in section['ids'] if item['occurences'] > 0]
-        ids_to_remove += [id for id in ids_of_grouped_sections if ids_of_grouped_sections.count(
-            id) > Constants.MAX_OCCURENCES_FOR_ONE_WORD]
+        # Remove words who in at least one section, they were found more then the threshold set,
+        # and words who were found in many sections
+        to_remove = (occurences > Constants.MAX_OCCURENCES_IN_ONE_SECTION).any(axis=0) | \
+            ((occurences > 0).sum(axis=0) > Constants.MAX_OCCURENCES_FOR_ONE_WORD)
+        ids_to_remove = {ids[column] for column in np.flatnonzero(to_remove)}
 
         logger.debug(f'ids to remove: {ids_to_remove}')
         filtered_grouped_results = []
         for section in grouped_sections:
-            filtered_section = {
-                'start': section['start'], 'end': section['end'], 'ids': []}
-            for item in section['ids']:
-                # Remove word from ids_to_remove
-                if(item['id'] not in ids_to_remove and item['occurences'] != 0):
-                    filtered_section['ids'].append(item)
-
-            if(len(filtered_section['ids']) > 0):
-                filtered_grouped_results.append(filtered_section)
+            filtered_ids = [item for item in section['ids']
+                            if item['id'] not in ids_to_remove and item['occurences'] != 0]
+            if(len(filtered_ids) > 0):
+                filtered_grouped_results.append(
+                    {'start': section['start'], 'end': section['end'], 'ids': filtered_ids})
 
         logger.debug(f'Filtered Grouped Results: {filtered_grouped_results}')
         return filtered_grouped_results
 
-    def trim_section(self, start, end, ids):
+    def trim_section(self, start, end, ids, mode: str = Constants.TRIM_SECTION_MODE, cancelled=lambda: False):
         """
         Trim a section of hot words.
 
@@ -263,6 +423,11 @@ class DelayChecker():
             start (float): Start time.
             end (float): End time.
             ids (list of str): IDs to check for.
+            mode (str): How to trim the section.
+                sweep: Checks every step of the section at once.
+                bisect: Searches the step where the hot word disappears, in a few rounds of requests.
+                word_timestamps: Reads the start of the hot words from one transcription with word timestamps.
+            cancelled (function): Whether the check was cancelled (stops sending requests, returns None).
 
         Returns:
             list of dicts: The ids and their start time.
@@ -271,18 +436,46 @@ class DelayChecker():
         """
 
         logger.debug(
-            f'Start trimming. Start: {start}. End: {end}. Ids: {ids}.')
+            f'Start trimming. Start: {start}. End: {end}. Ids: {ids}. Mode: {mode}.')
+        if(mode == 'bisect'):
+            return self.bisect_section(start, end, ids, cancelled)
+        if(mode == 'word_timestamps'):
+            return self.locate_section(start, end, ids, cancelled)
+        return self.sweep_section(start, end, ids, cancelled)
+
+    def sweep_section(self, start, end, ids, cancelled=lambda: False):
+        """
+        Trim a section by checking every step of the section in parallel, and looking
+        for the step where the occurences of the hot word drop to 0.
+
+        Params:
+            start (float): Start time.
+            end (float): End time.
+            ids (list of str): IDs to check for.
+            cancelled (function): Whether the check was cancelled.
+
+        Returns:
+            list of dicts: The ids and their start time.
+                id (str): ID of word.
+                start (float): Start time of id after being trimmed.
+        """
+
         results = []
         stop = False
-        threads = []
+        futures = []
         starts_range = np.arange(start, end, Constants.TRIM_SECTION_STEP)
         for current_start in starts_range:
-            thread = threading.Thread(target=self.get_hot_words_occurences, args=(
-                current_start, end, ids, results, lambda: stop))
-            thread.start()
-            threads.append(thread)
+            futures.append(self.stt.submit(
+                self.get_hot_words_occurences, current_start, end, ids, results, lambda: stop or cancelled()))
+
+        all_trimmed_results = []
+        sorted_results = []
+        # Check the results again every time a request finishes
+        for _ in as_completed(futures):
+            if(cancelled()):
+                self.stop_sweep(futures)
+                return None
 
-        while True:
             # List of dicts with id and start time. (e.g.: {'id': 'hello-12vcb3', 'start': 10.799})
             all_trimmed_results = []
             # Sort results by start time
@@ -312,19 +505,192 @@ class DelayChecker():
 
                 if(len(all_trimmed_results) == len(ids)):
                     stop = True
+                    # The requests answered so far, the ones still running stop before they are sent
+                    self.count_trim_stt_calls('sweep', len(results))
+                    self.stop_sweep(futures)
                     logger.debug(
                         f'Final ids times returened: {all_trimmed_results}. Results: {sorted_results}')
                     return all_trimmed_results
-                
-            # Break loop if all threads are finished
-            if(len(results) == len(threads)):
-                logger.debug(f'Unable to trim {start}-{end}-{ids}. Results: {sorted_results}')
-                stop = True
-                break
 
+        logger.debug(f'Unable to trim {start}-{end}-{ids}. Results: {sorted_results}')
+        self.count_trim_stt_calls('sweep', len([future for future in futures if not future.cancelled()]))
+        self.check_failures(futures)
         logger.error(
             f'Unable to find trimmed time. Results: {sorted_results}. Final ids times: {all_trimmed_results}')
 
+    def stop_sweep(self, futures: list):
+        """
+        Cancels the queued requests of a sweep and waits for the running ones (they see the stop flag),
+        so no request of the sweep outlives it.
+
+        Params:
+            futures (list of Futures): The requests of the sweep.
+        """
+
+        [future.cancel() for future in futures]
+        wait(futures)
+
+    def bisect_section(self, start, end, ids, cancelled=lambda: False):
+        """
+        Trim a section by searching the step where the hot word disappears.
+        Whether the hot word is in the timespan is monotone in the start time, so each round
+        of requests narrows the steps between the last start with the hot word and the first without it.
+        Every round checks Constants.TRIM_SECTION_BISECT_PROBES steps in parallel (1 is a binary search).
+
+        Params:
+            start (float): Start time.
+            end (float): End time.
+            ids (list of str): IDs to check for.
+            cancelled (function): Whether the check was cancelled.
+
+        Returns:
+            list of dicts: The ids and their start time.
+                id (str): ID of word.
+                start (float): Start time of id after being trimmed.
+        """
+
+        starts_range = np.arange(start, end, Constants.TRIM_SECTION_STEP)
+        # For each id: [last step with the hot word, first step without it].
+        # The first step is the whole section, where the grouped sections already found the hot word.
+        bounds = {id: [0, len(starts_range)] for id in ids}
+        # Ids with a step found with the hot word (the bounds alone don't tell if the first step has it)
+        confirmed = set()
+        calls = 0
+
+        while True:
+            # Group the steps to check, so ids with the same bounds share the request
+            probes = {}
+            for id, (low, high) in bounds.items():
+                indexes = self.get_bisect_probes(low, high)
+                # Nothing left between the bounds, but no step was found with the hot word, check the first step
+                if(len(indexes) == 0 and id not in confirmed and low < high):
+                    indexes = [low]
+                for index in indexes:
+                    probes.setdefault(index, []).append(id)
+
+            if(len(probes) == 0):
+                break
+
+            futures = {index: self.stt.submit(self.get_hot_words_occurences, starts_range[index], end, probe_ids, [], cancelled)
+                       for index, probe_ids in probes.items()}
+            calls += len(futures)
+            wait(futures.values())
+            # The requests of a cancelled check stop without a transcript, their results mean nothing
+            if(cancelled()):
+                self.count_trim_stt_calls('bisect', calls)
+                return None
+            results = sorted([(index, future.result()) for index, future in futures.items()], key=lambda result: result[0])
+
+            for id in bounds:
+                occurences = [(index, item['occurences']) for index, result in results for item in result['ids'] if item['id'] == id]
+                # The first step without the hot word, and the last step before it that has the hot word
+                high = min([index for index, occurences_amount in occurences if occurences_amount == 0] + [bounds[id][1]])
+                found = [index for index, occurences_amount in occurences if occurences_amount > 0 and index < high]
+                if(len(found) > 0):
+                    confirmed.add(id)
+                low = max(found + [bounds[id][0]])
+                bounds[id] = [low, high]
+
+        self.count_trim_stt_calls('bisect', calls)
+        trimmed_results = [{'id': id, 'start': starts_range[low]} for id, (low, high) in bounds.items() if id in confirmed]
+        if(len(trimmed_results) == 0):
+            logger.error(f'Unable to find trimmed time. {start}-{end}-{ids}.')
+            return None
+
+        logger.debug(f'Final ids times returened: {trimmed_results}.')
+        return trimmed_results
+
+    def locate_section(self, start, end, ids, cancelled=lambda: False):
+        """
+        Trim a section by transcribing it once with word timestamps.
+        Like the other modes, a hot word said more than once is located by it's last occurence.
+
+        Params:
+            start (float): Start time.
+            end (float): End time.
+            ids (list of str): IDs to check for.
+            cancelled (function): Whether the check was cancelled.
+
+        Returns:
+            list of dicts: The ids and their start time.
+                id (str): ID of word.
+                start (float): Start time of id after being trimmed.
+        """
+
+        hot_words = {hot_word_item['id']: hot_word_item['hot_word'] for hot_word_item in self.hot_words if hot_word_item['id'] in ids}
+        future = self.stt.submit(self.converter.convert_audio_to_words,
+                                 start, end, list(hot_words.values()), cancelled)
+        if(cancelled()):
+            return None
+        words = [word for word in future.result() if word['confidence'] >= Constants.WORD_TIMESTAMPS_MIN_CONFIDENCE]
+        self.count_trim_stt_calls('word_timestamps', 1)
+
+        trimmed_results = []
+        for id, hot_word in hot_words.items():
+            starts = [word['start'] for word in words if word['word'] == hot_word]
+            if(len(starts) > 0):
+                trimmed_results.append({'id': id, 'start': starts[-1]})
+
+        if(len(trimmed_results) == 0):
+            logger.debug(f'Unable to locate {ids} in {start}-{end}. Words: {words}')
+            return None
+
+        logger.debug(f'Final ids times returened: {trimmed_results}.')
+        return trimmed_results
+
+    def get_bisect_probes(self, low: int, high: int):
+        """
+        Gets the steps to check in one round of bisect_section.
+
+        Params:
+            low (int): Last step known with the hot word.
+            high (int): First step known without the hot word.
+
+        Returns:
+            list of int: The steps, strictly between low and high.
+        """
+
+        probes_amount = Constants.TRIM_SECTION_BISECT_PROBES
+        indexes = {low + round((high - low) * part / (probes_amount + 1))
+                   for part in range(1, probes_amount + 1)}
+        return sorted([index for index in indexes if low < index < high])
+
+    def check_failures(self, futures: list):
+        """
+        Logs the failed speech to text requests, and stops the check if the speech to text circuit
+        is open (the rest of the requests would fail too).
+
+        Params:
+            futures (list of Futures): The requests.
+
+        Returns:
+            int: The failed requests.
+
+        Raises:
+            CircuitOpenError: The speech to text circuit is open.
+        """
+
+        errors = [future.exception() for future in futures
+                  if future.done() and future.cancelled() is False and future.exception() is not None]
+        for error in errors:
+            if(isinstance(error, CircuitOpenError)):
+                raise error
+        if(len(errors) > 0):
+            logger.warning(f'{len(errors)} of {len(futures)} speech to text requests failed. Error: {errors[0]}')
+        return len(errors)
+
+    def count_trim_stt_calls(self, mode: str, calls: int):
+        """
+        Counts the speech to text requests used for trimming.
+
+        Params:
+            mode (str): The trim mode.
+            calls (int): Requests used to trim one section.
+        """
+
+        self.trim_stt_calls[mode] = self.trim_stt_calls.get(mode, 0) + calls
+        logger.debug(f'Trimmed section using {calls} speech to text requests ({mode}). Total: {self.trim_stt_calls}.')
+
     def verify_trimmed_results(self, trimmed_results):
         """
         Verifies the trimming results before verifing a delay.
@@ -339,18 +705,16 @@ class DelayChecker():
         """
 
         logger.debug(f'Verifing trimmed results: {trimmed_results}')
-        threads = []
+        futures = []
         occurences_results = []
 
         for result in trimmed_results:
             logger.debug(f'Verifing result: {result}.')
-            thread = threading.Thread(target=self.get_hot_words_occurences, args=(
-                result['start'] - Constants.VERIFY_TRIMMED_WORD_RADIUS, result['start'] + Constants.ONE_WORD_AUDIO_TIME + Constants.VERIFY_TRIMMED_WORD_RADIUS, [result['id']], occurences_results))
-            thread.start()
-            threads.append(thread)
+            futures.append(self.stt.submit(self.get_hot_words_occurences, result['start'] - Constants.VERIFY_TRIMMED_WORD_RADIUS,
+                                           result['start'] + Constants.ONE_WORD_AUDIO_TIME + Constants.VERIFY_TRIMMED_WORD_RADIUS, [result['id']], occurences_results))
 
-        # Wait for threads to finish
-        [thread.join() for thread in threads]
+        wait(futures)
+        self.check_failures(futures)
 
         verified_trimmed_results = []
         for result in occurences_results:
@@ -361,12 +725,13 @@ class DelayChecker():
         logger.debug(f'Verified trimmed results: {verified_trimmed_results}')
         return verified_trimmed_results
 
-    def verify_delay(self, delay: float):
+    def verify_delay(self, delay: float, cancelled=lambda: False):
         """
         Checks if the delay is correct.
 
         Params:
             delay (float): The delay.                
+            cancelled (function): Whether the check was cancelled (returns False, the delay is not added to the falty delays).
 
         Returns:
             bool: Whether the delay is correct or not.
@@ -380,7 +745,7 @@ class DelayChecker():
         samples_to_check = Constants.VERIFY_DELAY_SAMPLES_TO_CHECK
         hot_words = hot_words[:samples_to_check]
         logger.debug(f'Hot words to check: {hot_words}')
-        threads = []
+        futures = []
         results = []
         stop = False
 
@@ -395,19 +760,24 @@ class DelayChecker():
                                 Constants.DELAY_CHECKER_SECTIONS_TIME) + delay
             transcript_end = transcript_start + Constants.ONE_WORD_AUDIO_TIME
 
-            thread = threading.Thread(target=self.get_hot_words_occurences, args=(
-                transcript_start, transcript_end, [hot_word_item['id']], results, lambda: stop))
-            thread.start()
-            threads.append(thread)
+            futures.append(self.stt.submit(
+                self.get_hot_words_occurences, transcript_start, transcript_end, [hot_word_item['id']], results,
+                lambda: stop or cancelled()))
+
+        logger.debug(f'Scheduled {len(futures)} requests')
+        # Check the results again every time a request finishes
+        for _ in as_completed(futures):
+            if(cancelled()):
+                [future.cancel() for future in futures]
+                return False
 
-        logger.debug(f'Started {len(threads)} threads')
-        while True:
             similars = len(
                 [result for result in results if result['ids'][0]['occurences'] > 0])
             unsimilars = len(results) - similars
             if(similars >= samples_to_pass):
                 logger.debug(f'Found delay: {delay}')
                 stop = True
+                [future.cancel() for future in futures]
                 return True
 
             if(unsimilars >= samples_to_check - samples_to_pass):
@@ -416,9 +786,16 @@ class DelayChecker():
                 logger.debug(
                     f"Added {delay} to falty delays. Results: {results} Falty delays: {self.falty_delays}")
                 stop = True
+                [future.cancel() for future in futures]
                 return False
 
-    def get_hot_words_occurences(self, start: float, end: float, ids: list, results: list, stop=lambda: False):
+        # All the requests finished without reaching a decision (some of them failed). The delay is unknown,
+        # not falty, so it's not added to the falty delays (it can be verified again).
+        self.check_failures(futures)
+        logger.warning(f'Unable to verify delay {delay}. Results: {results}')
+        return False
+
+    def get_hot_words_occurences(self, start: float, end: float, ids: list, results: list, stop=lambda: False, exact: bool = False):
         """
         Gets the occurences of the hot words inside the timespan.
 
@@ -428,9 +805,10 @@ class DelayChecker():
             ids (list of str): List of ids.
             results (list): List to update the results (useful for threading)
             stop (function): Should the converter stop before sending the request. If not passed, will not stop.
+            exact (bool): The occurences have to be exact, not only tell if the hot word is there (see OccurencesIndex.get).
 
-        Appending to results:
-            list of dicts:
+        Appending to results (and returns):
+            dict:
                 start (float): Start time.
                 end (float): End time.
                 ids (list of dicts): 
@@ -438,28 +816,30 @@ class DelayChecker():
                     occurences (int): occurences of id in timestamp.
         """
 
-        ids_checked = [id for id in ids for checked in self.checked if id == checked['id']
-                       and start >= checked['start'] and end <= checked['end'] and checked['occurences'] == 0]
+        # Answer the ids from the windows already checked
+        occurences = {id: self.occurences_index.get(id, start, end, exact) for id in ids}
+        unknown_ids = [id for id in ids if occurences[id] is None]
 
-        if(len(ids_checked) == len(ids)):
-            timespan_result = [{'id': id, 'occurences': 0}
-                               for index, id in enumerate(ids)]
-
-        else:
+        if(len(unknown_ids) > 0):
             # Get list of words from the list of ids
-            hot_words = [hot_word_item['hot_word']
-                         for hot_word_item in self.hot_words if hot_word_item['id'] in ids]
+            hot_words = {hot_word_item['id']: hot_word_item['hot_word'] for hot_word_item in self.hot_words}
+            unknown_hot_words = [hot_words[id] for id in unknown_ids]
             # Get transcript
             transcript = self.converter.convert_audio_to_text(
-                start, end, hot_words, stop)
+                start, end, unknown_hot_words, stop)
+            transcript_words = transcript.split()
 
-            # Foreach hot word, make an object with the id and occurences
-            timespan_result = [{'id': id, 'occurences': transcript.split().count(
-                hot_words[index])} for index, id in enumerate(ids)]
+            for id in unknown_ids:
+                occurences[id] = transcript_words.count(hot_words[id])
+                # A stopped request has an empty transcript, don't remember it
+                if(stop() is False):
+                    self.occurences_index.add(id, start, end, occurences[id])
 
-            self.checked += [{'start': start, 'end': end, 'id': item['id'],
-                              'occurences': item['occurences']} for item in timespan_result if item['occurences'] == 0]
+        # Foreach hot word, make an object with the id and occurences
+        timespan_result = [{'id': id, 'occurences': occurences[id]} for id in ids]
 
         logger.debug(
             f"Checked Occurences: {({'start': start, 'end': end, 'ids': timespan_result})}.")
-        results.append({'start': start, 'end': end, 'ids': timespan_result})
+        result = {'start': start, 'end': end, 'ids': timespan_result}
+        results.append(result)
+        return result
@@ -0,0 +1,73 @@
+import numpy as np
+from syncit.constants import Constants
+
+
+def get_cues_mask(cues: list, duration: float, step: float, radius: float):
+    """
+    Gets a binary mask of the subtitles cues, on a time grid from -radius to duration + radius.
+
+    Params:
+        cues (list of tuples): (start, end) of each cue, in seconds relative to the audio start.
+        duration (float): Duration of the audio.
+        step (float): Time of each grid cell.
+        radius (float): Maximum delay to check.
+
+    Returns:
+        np.ndarray: 1 where a cue is shown, 0 elsewhere.
+    """
+
+    mask = np.zeros(int(np.ceil((duration + 2 * radius) / step)))
+    for cue_start, cue_end in cues:
+        first = max(int((cue_start + radius) / step), 0)
+        last = min(int(np.ceil((cue_end + radius) / step)), len(mask))
+        mask[first:last] = 1
+
+    return mask
+
+
+def estimate_delays(voice_activity: np.ndarray, cues: list, step: float = Constants.VOICE_ACTIVITY_FRAME_TIME,
+                    radius: float = Constants.DELAY_RADIUS, candidates_amount: int = Constants.DELAY_ESTIMATION_CANDIDATES):
+    """
+    Estimates the delay without speech recognition, by finding the offset that best aligns
+    the voice activity of the audio with the times the subtitles are shown (FFT cross correlation).
+
+    Params:
+        voice_activity (np.ndarray): Voice activity envelope of the audio (see get_voice_activity).
+        cues (list of tuples): (start, end) of each cue, in seconds relative to the audio start.
+        step (float): Time of each voice activity frame.
+        radius (float): Maximum delay to check (both directions).
+        candidates_amount (int): How many delays to return.
+
+    Returns:
+        list of dicts: The best delays, ranked.
+            delay (float): The delay (audio time - subtitles time).
+            confidence (float): Correlation of the voice activity and the cues at this delay (-1 to 1).
+    """
+
+    mask = get_cues_mask(cues, len(voice_activity) * step, step, radius)
+    activity = voice_activity - voice_activity.mean()
+    mask = mask - mask.mean()
+    norm = np.linalg.norm(activity) * np.linalg.norm(mask)
+    if(len(activity) == 0 or norm == 0):
+        return []
+
+    # correlation[lag] = sum(activity[index + lag] * mask[index])
+    size = len(activity) + len(mask)
+    correlation = np.fft.irfft(np.fft.rfft(activity, size) * np.conj(np.fft.rfft(mask, size)), size) / norm
+
+    # The mask starts radius before the audio, so a lag of 0 is a delay of radius
+    lags = np.arange(-int(round(2 * radius / step)), 1)
+    scores = correlation[lags % size]
+    delays = lags * step + radius
+
+    candidates = []
+    min_distance = Constants.DELAY_ESTIMATION_PEAK_DISTANCE
+    for index in np.argsort(scores)[::-1]:
+        if(len(candidates) == candidates_amount):
+            break
+        # Skip the neighbours of a delay already taken (same peak)
+        if(any(abs(delays[index] - candidate['delay']) < min_distance for candidate in candidates)):
+            continue
+        candidates.append({'delay': round(float(delays[index]), 3), 'confidence': float(scores[index])})
+
+    return candidates
@@ -0,0 +1,209 @@
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from syncit.constants import Constants
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker():
+    """
+    Latencies of the recent requests, for the hedging delay.
+
+    Attributes:
+        latencies (deque): The latencies (seconds) of the last requests.
+        min_samples (int): Latencies needed before there is a percentile.
+    """
+
+    def __init__(self, samples: int, min_samples: int):
+        """
+        Constructor of LatencyTracker.
+
+        Params:
+            samples (int): Latencies kept.
+            min_samples (int): Latencies needed before there is a percentile.
+        """
+
+        self.latencies = deque(maxlen=samples)
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+    def add(self, latency: float):
+        """
+        Adds the latency of a request.
+
+        Params:
+            latency (float): The latency in seconds.
+        """
+
+        with self.lock:
+            self.latencies.append(latency)
+
+    def percentile(self, percentile: float):
+        """
+        Gets a percentile of the recent latencies.
+
+        Params:
+            percentile (float): The percentile (0 to 100).
+
+        Returns:
+            float: The latency in seconds (None if there are not enough latencies yet).
+        """
+
+        with self.lock:
+            if(len(self.latencies) < self.min_samples):
+                return None
+            return float(np.percentile(self.latencies, percentile))
+
+
+class Hedger():
+    """
+    Hedged requests: a request that didn't return by a percentile of the recent latencies is sent again,
+    and the first response is used. The other one is abandoned (its response is ignored, a request already
+    on the wire can't be taken back). Hedges are limited by a token bucket: every request adds max_ratio tokens,
+    up to max_tokens, and every hedge spends one. The hedges stay under max_ratio of the recent requests, and
+    a slowdown after a long calm can't release a burst of hedges beyond max_tokens.
+
+    Attributes:
+        percentile (float): The latency percentile to hedge at.
+        min_delay (float): Seconds to wait before hedging, at least.
+        max_ratio (float): Maximum hedges per request sent.
+        max_tokens (float): Size of the bucket (the most hedges sent in a row).
+        tokens (float): Hedges that can be sent.
+        tracker (LatencyTracker): The recent latencies.
+        executor (ThreadPoolExecutor): The threads the requests run in (the caller waits for the first response).
+        requests_sent (int): Requests (not counting hedges).
+        hedges_sent (int): Hedges sent.
+        hedges_won (int): Hedges that answered before the original request.
+    """
+
+    def __init__(self, percentile: float, min_delay: float, max_ratio: float, max_tokens: float, tracker: LatencyTracker,
+                 max_workers: int):
+        """
+        Constructor of Hedger.
+
+        Params:
+            percentile (float): The latency percentile to hedge at.
+            min_delay (float): Seconds to wait before hedging, at least.
+            max_ratio (float): Maximum hedges per request sent.
+            max_tokens (float): Size of the bucket (the most hedges sent in a row).
+            tracker (LatencyTracker): The recent latencies.
+            max_workers (int): Requests (and hedges) in flight.
+        """
+
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.max_tokens = max_tokens
+        self.tokens = 0
+        self.tracker = tracker
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedged-request')
+        self.requests_sent = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.lock = threading.Lock()
+
+    def call(self, send, is_success):
+        """
+        Sends a request, and a hedge if it's slow.
+
+        Params:
+            send (function): Sends the request and returns the response.
+            is_success (function): Whether a response is a success (a failed response waits for the other one).
+
+        Returns:
+            The first successful response (or the last response, or raises the last error, if none succeeded).
+        """
+
+        self.count_request()
+        futures = {self.executor.submit(self.timed, send): False}
+        delay = self.tracker.percentile(self.percentile)
+        if(delay is not None):
+            (done, _) = wait(futures, timeout=max(delay, self.min_delay))
+            if(len(done) == 0 and self.take_hedge()):
+                logger.debug(f'No response after {max(delay, self.min_delay):.2f}s, sending hedge. {self.stats()}')
+                futures[self.executor.submit(self.timed, send)] = True
+
+        pending = set(futures)
+        while(True):
+            (done, pending) = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if(future.exception() is None and is_success(future.result())):
+                    if(futures[future]):
+                        with self.lock:
+                            self.hedges_won += 1
+                    for other_future in pending:
+                        other_future.cancel()
+                    return future.result()
+            if(len(pending) == 0):
+                # Nothing succeeded, answer like the request without the hedge
+                return future.result()
+
+    def timed(self, send):
+        """
+        Sends a request and tracks its latency (runs in the executor).
+
+        Params:
+            send (function): Sends the request.
+
+        Returns:
+            The response.
+        """
+
+        started = time.monotonic()
+        response = send()
+        self.tracker.add(time.monotonic() - started)
+        return response
+
+    def count_request(self):
+        """
+        Counts a request, and adds its share of a hedge to the bucket.
+        """
+
+        with self.lock:
+            self.requests_sent += 1
+            self.tokens = min(self.tokens + self.max_ratio, self.max_tokens)
+
+    def take_hedge(self):
+        """
+        Takes a hedge from the bucket.
+
+        Returns:
+            bool: Whether a hedge can be sent.
+        """
+
+        with self.lock:
+            if(self.tokens < 1):
+                return False
+            self.tokens -= 1
+            self.hedges_sent += 1
+            return True
+
+    def stats(self):
+        """
+        Gets the counters of the hedger.
+
+        Returns:
+            dict: Requests, hedges sent and hedges won.
+        """
+
+        with self.lock:
+            return {'requests': self.requests_sent, 'hedges_sent': self.hedges_sent, 'hedges_won': self.hedges_won}
+
+
+def create_hedger():
+    """
+    Creates a hedger with the Constants.STT_HEDGE_* settings.
+
+    Returns:
+        Hedger: The hedger.
+    """
+
+    tracker = LatencyTracker(Constants.STT_HEDGE_LATENCY_SAMPLES, Constants.STT_HEDGE_MIN_SAMPLES)
+    return Hedger(Constants.STT_HEDGE_PERCENTILE, Constants.STT_HEDGE_MIN_DELAY, Constants.STT_HEDGE_MAX_RATIO,
+                  Constants.STT_HEDGE_MAX_TOKENS, tracker, Constants.STT_MAX_IN_FLIGHT * 2)
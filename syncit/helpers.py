@@ -1,12 +1,19 @@
 import string
 import re
 import logging
+from chardet import UniversalDetector
+from langdetect import DetectorFactory, detect_langs
+from langdetect.lang_detect_exception import LangDetectException
+from syncit.constants import Constants
 from logger_setup import setup_logging
 
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# langdetect is random by default, the same text should always get the same language
+DetectorFactory.seed = 0
+
 
 def clean_text(original_text: str):
     """
@@ -70,3 +77,78 @@ def convert_subs_time(subs_time: str):
         return time
     except:
         logger.warning(f'Wrong time format in subtitles. Recieved: {subs_time}')
+
+
+def detect_encoding(binary: bytes, start: int = 0):
+    """
+    Detects the encoding of a file, feeds it to the detector in chunks and stops once the detector
+    is confident (or after Constants.ENCODING_DETECTION_MAX_BYTES).
+
+    Params:
+        binary (bytes): The file content.
+        start (int): Where to start reading.
+
+    Returns:
+        tuple: (encoding, confidence). encoding is None if it wasn't detected.
+    """
+
+    detector = UniversalDetector()
+    chunk_size = Constants.ENCODING_DETECTION_CHUNK_SIZE
+    for index in range(start, min(len(binary), start + Constants.ENCODING_DETECTION_MAX_BYTES), chunk_size):
+        detector.feed(binary[index:index + chunk_size])
+        if(detector.done):
+            break
+
+    result = detector.close()
+    return (result['encoding'], result['confidence'])
+
+
+def decode_subtitles(binary: bytes):
+    """
+    Decodes a subtitles file with the detected encoding (bytes that still can't be decoded are replaced).
+
+    Params:
+        binary (bytes): The file content.
+
+    Returns:
+        tuple: (text, encoding, confidence).
+    """
+
+    (encoding, confidence) = detect_encoding(binary)
+    try:
+        return (binary.decode(encoding), encoding, confidence)
+    except UnicodeDecodeError as err:
+        # The start of the file wasn't enough (e.g.: ascii until the first accent), detect from the line that failed
+        start = binary.rfind(b'\n', 0, err.start) + 1
+        logger.debug(f'Unable to decode subtitles as {encoding} at byte {err.start}, detecting from byte {start}.')
+        (encoding, confidence) = detect_encoding(binary, start)
+        try:
+            return (binary.decode(encoding), encoding, confidence)
+        except (UnicodeDecodeError, LookupError, TypeError) as err:
+            # Mixed or broken encodings, keep the text and replace the bytes that can't be decoded
+            encoding = encoding or 'utf-8'
+            logger.warning(f'Unable to decode subtitles. Decoding as {encoding} with replacements. Error: {err}')
+            return (binary.decode(encoding, errors='replace'), encoding, 0.0)
+
+
+def detect_language(texts: list):
+    """
+    Detects the language of cleaned texts, from an evenly spaced sample of them
+    (Constants.LANGUAGE_DETECTION_SAMPLE_TEXTS), so the result is the same for the same texts.
+
+    Params:
+        texts (list): Cleaned texts (None items are skipped).
+
+    Returns:
+        tuple: (language, probability). language is None if there is no text to detect it from.
+    """
+
+    texts = [text for text in texts if text is not None]
+    step = max(len(texts) / Constants.LANGUAGE_DETECTION_SAMPLE_TEXTS, 1)
+    sample = [texts[int(index * step)] for index in range(min(len(texts), Constants.LANGUAGE_DETECTION_SAMPLE_TEXTS))]
+
+    try:
+        language = detect_langs(' '.join(sample))[0]
+    except LangDetectException:
+        return (None, 0.0)
+    return (language.lang, language.prob)
@@ -0,0 +1,336 @@
+import io
+import os
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from syncit.constants import Constants
+from syncit.delay_checker import DelayChecker
+from syncit.sessions import get_session_store, check_single_host
+from syncit.resilience import SpeechToTextError
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobStore():
+    """
+    Delay check jobs kept on disk (SQLite), shared by the processes of one host (see sessions.check_single_host).
+    Any process with a JobManager (the uwsgi workers, or separate `python -m syncit.jobs` processes) claims
+    the queued jobs, and any process can report their state.
+
+    Attributes:
+        path (str): Path of the database file.
+        connection (sqlite3.Connection): Connection to the database.
+        lock (threading.Lock): Lock of the connection.
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor of JobStore.
+
+        Params:
+            path (str): Path of the database file (created if needed).
+        """
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=Constants.JOB_STORE_TIMEOUT, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                worker TEXT,
+                params TEXT NOT NULL,
+                audio BLOB,
+                subtitles BLOB,
+                progress TEXT,
+                result TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL)''')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)')
+
+    def create(self, params: dict, audio: bytes, subtitles: bytes = None):
+        """
+        Queues a job, deletes the jobs finished more than Constants.JOB_TTL seconds ago.
+
+        Params:
+            params (dict): start, end, audio_language, subtitles_language and session_id (None without a session).
+            audio (bytes): The audio file content.
+            subtitles (bytes): The subtitles file content (None with a session).
+
+        Returns:
+            str: The job id.
+        """
+
+        id = uuid.uuid4().hex
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM jobs WHERE updated < ?', (now - Constants.JOB_TTL,))
+            self.connection.execute('''INSERT INTO jobs (id, status, params, audio, subtitles, created, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?)''', (id, QUEUED, json.dumps(params), audio, subtitles, now, now))
+        return id
+
+    def claim(self):
+        """
+        Claims the oldest queued job. Jobs running for more than Constants.JOB_STALE_TIMEOUT seconds
+        without progress (their process died) are failed.
+
+        Returns:
+            tuple: (id, params, audio, subtitles) of the job, None if no job is queued.
+        """
+
+        worker = uuid.uuid4().hex
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute('''UPDATE jobs SET status = ?, result = ?, audio = NULL, subtitles = NULL, updated = ?
+                WHERE status = ? AND updated < ?''', (FAILED, json.dumps({'error': 'Job stopped.'}), now, RUNNING,
+                                                      now - Constants.JOB_STALE_TIMEOUT))
+            # One statement, so two processes can't claim the same job
+            self.connection.execute('''UPDATE jobs SET status = ?, worker = ?, updated = ? WHERE id =
+                (SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1)''', (RUNNING, worker, now, QUEUED))
+            row = self.connection.execute('SELECT id, params, audio, subtitles FROM jobs WHERE worker = ?',
+                                          (worker,)).fetchone()
+
+        if(row is None):
+            return None
+        (id, params, audio, subtitles) = row
+        return (id, json.loads(params), audio, subtitles)
+
+    def set_progress(self, id: str, stage: str, done: int, total: int):
+        """
+        Sets the progress of a running job.
+
+        Params:
+            id (str): The job id.
+            stage (str): The stage (see DelayChecker.report_progress).
+            done (int): Steps of the stage done.
+            total (int): Steps in the stage.
+        """
+
+        with self.lock, self.connection:
+            self.connection.execute('UPDATE jobs SET progress = ?, updated = ? WHERE id = ? AND status = ?', (json.dumps(
+                {'stage': stage, 'done': done, 'total': total}), time.time(), id, RUNNING))
+
+    def finish(self, id: str, status: str, result: dict):
+        """
+        Sets the result of a job, and drops its files.
+
+        Params:
+            id (str): The job id.
+            status (str): DONE or FAILED.
+            result (dict): The response of the check (delay and encoding if found), or the error.
+        """
+
+        with self.lock, self.connection:
+            self.connection.execute('''UPDATE jobs SET status = ?, result = ?, audio = NULL, subtitles = NULL, updated = ?
+                WHERE id = ?''', (status, json.dumps(result), time.time(), id))
+
+    def get(self, id: str):
+        """
+        Gets the state of a job.
+
+        Returns:
+            dict: The job (None if it doesn't exist).
+                id (str): The job id.
+                status (str): queued, running, done or failed.
+                progress (dict): stage, done and total of the running stage (None before the job started).
+                result (dict): The response of the check, or the error (None until the job finished).
+        """
+
+        with self.lock:
+            row = self.connection.execute('SELECT status, progress, result FROM jobs WHERE id = ?', (id,)).fetchone()
+        if(row is None):
+            return None
+
+        (status, progress, result) = row
+        return {'id': id, 'status': status, 'progress': json.loads(progress) if progress else None,
+                'result': json.loads(result) if result else None}
+
+    def close(self):
+        """
+        Closes the connection.
+        """
+
+        with self.lock:
+            self.connection.close()
+
+
+class JobManager():
+    """
+    Runs the jobs of a JobStore in a pool of threads, claiming a job whenever a thread is free.
+
+    Attributes:
+        store (JobStore): The jobs.
+        executor (ThreadPoolExecutor): The threads the checks run in.
+        slots (threading.Semaphore): Free threads.
+        wake (threading.Event): Set when a job is queued by this process (claims it without waiting for the poll).
+        stopped (bool): Whether to stop claiming jobs (see shutdown).
+        claimer (threading.Thread): The background thread that claims the jobs.
+    """
+
+    def __init__(self, store: JobStore, workers: int):
+        """
+        Constructor of JobManager, starts claiming jobs.
+
+        Params:
+            store (JobStore): The jobs.
+            workers (int): Checks running at once.
+        """
+
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='delay-check')
+        self.slots = threading.Semaphore(workers)
+        self.wake = threading.Event()
+        self.stopped = False
+        self.claimer = threading.Thread(target=self.claim_jobs, daemon=True)
+        self.claimer.start()
+
+    def notify(self):
+        """
+        Wakes the claimer after a job is queued.
+        """
+
+        self.wake.set()
+
+    def shutdown(self):
+        """
+        Stops claiming jobs and waits for the running ones.
+        """
+
+        self.stopped = True
+        self.wake.set()
+        # The claimer stops first, so it doesn't claim a job the executor can't run anymore
+        self.slots.release()
+        self.claimer.join()
+        self.executor.shutdown(wait=True)
+
+    def claim_jobs(self):
+        """
+        Claims jobs as threads free up (runs in the background thread). Polls the store every
+        Constants.JOB_POLL_INTERVAL seconds for jobs queued by other processes.
+        """
+
+        while(True):
+            self.slots.acquire()
+            if(self.stopped):
+                return
+            try:
+                job = self.store.claim()
+            except sqlite3.Error as err:
+                logger.error(f'Unable to claim a job. Error: {err}')
+                job = None
+
+            if(job is None):
+                self.slots.release()
+                self.wake.wait(Constants.JOB_POLL_INTERVAL)
+                self.wake.clear()
+                continue
+
+            self.executor.submit(self.run, *job)
+
+    def run(self, id: str, params: dict, audio: bytes, subtitles: bytes):
+        """
+        Runs one check and stores its result.
+
+        Params:
+            id (str): The job id.
+            params (dict): See JobStore.create.
+            audio (bytes): The audio file content.
+            subtitles (bytes): The subtitles file content (None with a session).
+        """
+
+        logger.info(f'Running job {id}.')
+        try:
+            session = None
+            if(params['session_id'] is not None):
+                session = get_session_store().get(params['session_id'])
+                if(session is None):
+                    self.store.finish(id, FAILED, {'error': 'Session not found.'})
+                    return
+                subtitles = session.subtitles
+
+            dc = DelayChecker(io.BytesIO(audio), params['start'], params['end'], io.BytesIO(subtitles),
+                              params['audio_language'], params['subtitles_language'], session=session,
+                              progress_callback=lambda stage, done, total: self.store.set_progress(id, stage, done, total))
+            delay = dc.check_delay()
+            if(session is not None):
+                get_session_store().record(session.id, delay, dc.falty_delays)
+
+            if(delay is None):
+                self.store.finish(id, DONE, {})
+            else:
+                self.store.finish(id, DONE, {'delay': delay, 'encoding': dc.sp.encoding})
+        except SpeechToTextError as err:
+            # Like the 503 of /check_delay, the check can be queued again later
+            logger.error(f'Speech to text failed in job {id}. Error: {err}')
+            self.store.finish(id, FAILED, {'error': 'Speech to text unavailable.', 'retryable': True})
+        except Exception as err:
+            logger.error(f'Error in job {id}. Error: {err}')
+            self.store.finish(id, FAILED, {'error': 'Internal Server Error.'})
+        finally:
+            self.slots.release()
+
+
+_store = None
+_manager = None
+_lock = threading.Lock()
+
+
+def get_job_store():
+    """
+    Gets the job store of this process, at the JOB_STORE_PATH environment variable
+    (Constants.JOB_STORE_PATH by default).
+
+    Returns:
+        JobStore: The store.
+
+    Raises:
+        HostLocalStoreError: The app may run on several hosts (see sessions.check_single_host).
+    """
+
+    global _store
+    check_single_host('job')
+    with _lock:
+        if(_store is None):
+            _store = JobStore(os.getenv('JOB_STORE_PATH', Constants.JOB_STORE_PATH))
+        return _store
+
+
+def get_job_manager():
+    """
+    Gets the job manager of this process (created on first use, so each uwsgi worker has it's own),
+    with the JOB_WORKERS environment variable threads (Constants.JOB_WORKERS by default).
+
+    Returns:
+        JobManager: The manager (None if this process doesn't run jobs, JOB_WORKERS is 0).
+    """
+
+    global _manager
+    store = get_job_store()
+    workers = int(os.getenv('JOB_WORKERS', Constants.JOB_WORKERS))
+    if(workers == 0):
+        return None
+
+    with _lock:
+        if(_manager is None):
+            logger.debug(f'Creating job manager. Workers: {workers}.')
+            _manager = JobManager(store, workers)
+        return _manager
+
+
+if(__name__ == '__main__'):
+    # A compute process: runs the jobs queued by the web processes (which can then set JOB_WORKERS to 0)
+    if(get_job_manager() is None):
+        raise SystemExit('JOB_WORKERS is 0.')
+    threading.Event().wait()
@@ -0,0 +1,132 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+
+def to_milliseconds(time: float):
+    """
+    Quantizes a time to milliseconds, so float noise from the step arithmetic doesn't break comparisons.
+
+    Params:
+        time (float): Time in seconds.
+
+    Returns:
+        int: Time in milliseconds.
+    """
+
+    return int(round(time * 1000))
+
+
+class OccurencesIndex():
+    """
+    Index of the speech to text results of each hot word, answers windows that are already known.
+
+    A window without the hot word means every window inside it has no occurences, and a window
+    with the hot word means every window containing it has the hot word too.
+    For each hot word the windows are kept so none contains another, sorted by start time. This way the ends
+    are sorted as well, and checking if a window is inside (or contains) a known window is one binary search.
+
+    Attributes:
+        negatives (dict): id -> [starts, ends] of the largest windows known without the hot word.
+        positives (dict): id -> [starts, ends, occurences] of the smallest windows known with the hot word.
+    """
+
+    def __init__(self):
+        """
+        Constructor of OccurencesIndex.
+        """
+
+        self.negatives = {}
+        self.positives = {}
+        self.lock = threading.Lock()
+
+    def get(self, id: str, start: float, end: float, exact: bool = False):
+        """
+        Gets the occurences of a hot word in a window, if it can be answered from the known windows.
+
+        Params:
+            id (str): ID of the hot word.
+            start (float): Start time.
+            end (float): End time.
+            exact (bool): Answer only with the exact amount of occurences. A window containing a known window
+                has at least the occurences of that window, which is enough to tell the hot word is there, not to count it.
+
+        Returns:
+            int: The occurences (for a window containing a known window, the occurences in that window, unless exact).
+            NoneType: If the window is unknown.
+        """
+
+        start = to_milliseconds(start)
+        end = to_milliseconds(end)
+        with self.lock:
+            if(id in self.negatives):
+                starts, ends = self.negatives[id]
+                # The last window starting before the window is the one ending last
+                index = bisect_right(starts, start) - 1
+                if(index >= 0 and ends[index] >= end):
+                    return 0
+
+            if(id in self.positives):
+                starts, ends, occurences = self.positives[id]
+                # The first window starting after the window is the one ending first
+                index = bisect_left(starts, start)
+                if(index < len(starts) and ends[index] <= end):
+                    if(exact is False or (starts[index] == start and ends[index] == end)):
+                        return occurences[index]
+
+        return None
+
+    def add(self, id: str, start: float, end: float, occurences: int):
+        """
+        Adds the result of a window.
+
+        Params:
+            id (str): ID of the hot word.
+            start (float): Start time.
+            end (float): End time.
+            occurences (int): The occurences of the hot word in the window.
+        """
+
+        start = to_milliseconds(start)
+        end = to_milliseconds(end)
+        with self.lock:
+            if(occurences == 0):
+                self.add_negative(id, start, end)
+            else:
+                self.add_positive(id, start, end, occurences)
+
+    def add_negative(self, id: str, start: int, end: int):
+        """
+        Adds a window without the hot word, and removes the known windows inside it.
+        """
+
+        starts, ends = self.negatives.setdefault(id, [[], []])
+        index = bisect_right(starts, start) - 1
+        if(index >= 0 and ends[index] >= end):
+            return
+
+        first = bisect_left(starts, start)
+        last = first
+        while(last < len(starts) and ends[last] <= end):
+            last += 1
+
+        starts[first:last] = [start]
+        ends[first:last] = [end]
+
+    def add_positive(self, id: str, start: int, end: int, occurences: int):
+        """
+        Adds a window with the hot word, and removes the known windows containing it.
+        """
+
+        starts, ends, occurences_list = self.positives.setdefault(id, [[], [], []])
+        index = bisect_left(starts, start)
+        if(index < len(starts) and ends[index] <= end):
+            return
+
+        last = bisect_right(starts, start)
+        first = last
+        while(first > 0 and ends[first - 1] >= end):
+            first -= 1
+
+        starts[first:last] = [start]
+        ends[first:last] = [end]
+        occurences_list[first:last] = [occurences]
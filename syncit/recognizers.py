@@ -0,0 +1,322 @@
+import os
+import json
+import threading
+import time
+import multiprocessing
+import logging
+from abc import ABC, abstractmethod
+import requests
+from concurrent.futures import ProcessPoolExecutor
+from syncit.constants import Constants
+from syncit.hedging import create_hedger
+from syncit.resilience import (RETRYABLE_STATUS_CODES, SpeechToTextError, get_backoff_delay,
+                               get_circuit_breaker, get_concurrency_limiter)
+from syncit.wire_formats import WIRE_FORMATS, WIRE_CODECS, encode_request
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class Recognizer(ABC):
+    """
+    Interface of the speech to text backends (a backend missing a method can't be created).
+    """
+
+    name = None
+
+    @abstractmethod
+    def recognize(self, frame_data, sample_rate: int, sample_width: int, language: str, hot_words: list, stop):
+        """
+        Converts audio to text.
+
+        Params:
+            frame_data (bytes-like): Raw mono PCM data.
+            sample_rate (int): Sample rate of the audio.
+            sample_width (int): Sample width (in bytes) of the audio.
+            language (str): Language of the audio (e.g.: en-US).
+            hot_words (list): Hot words to look for.
+            stop (function): A flag, should the recognizer stop before sending a request.
+
+        Returns:
+            str: The transcript.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def recognize_words(self, frame_data, sample_rate: int, sample_width: int, language: str, hot_words: list, stop):
+        """
+        Converts audio to words with their timestamps.
+
+        Params:
+            Same as recognize.
+
+        Returns:
+            list of dicts: The recognized words, in the order they were said.
+                word (str): The word.
+                start (float): Start time of the word, relative to the audio start.
+                end (float): End time of the word, relative to the audio start.
+                confidence (float): Confidence of the recognition (0 to 1).
+        """
+
+        raise NotImplementedError
+
+
+class LambdaRecognizer(Recognizer):
+    """
+    Speech to text using the remote server (lambda) at CONVERT_SPEECH_TO_TEXT_SERVER_URL.
+
+    Attributes:
+        session (requests.session): Session to persist when talking with API.
+        wire_format (str): How the audio is sent (see wire_formats.WIRE_FORMATS), set by SPEECH_TO_TEXT_WIRE_FORMAT.
+        codec (str): How the audio is encoded (see wire_formats.WIRE_CODECS), set by SPEECH_TO_TEXT_WIRE_CODEC.
+        hedger (Hedger): Sends a slow request again (None if SPEECH_TO_TEXT_HEDGING isn't true).
+    """
+
+    name = 'lambda'
+
+    def __init__(self):
+        """
+        Constructor of LambdaRecognizer.
+        """
+
+        self.session = requests.Session()
+        self.wire_format = os.getenv('SPEECH_TO_TEXT_WIRE_FORMAT', Constants.SPEECH_TO_TEXT_WIRE_FORMAT)
+        self.codec = os.getenv('SPEECH_TO_TEXT_WIRE_CODEC', Constants.SPEECH_TO_TEXT_WIRE_CODEC)
+        if(self.wire_format not in WIRE_FORMATS or self.codec not in WIRE_CODECS):
+            raise Exception(f'Unknown wire format {self.wire_format} ({self.codec}). Options: {WIRE_FORMATS} ({WIRE_CODECS}).')
+        self.hedger = None
+        if(os.getenv('SPEECH_TO_TEXT_HEDGING', str(Constants.STT_HEDGING)).lower() == 'true'):
+            self.hedger = create_hedger()
+
+    def recognize(self, frame_data, sample_rate: int, sample_width: int, language: str, hot_words: list, stop):
+        fields = {
+            'language': language,
+            'hot_words': json.dumps(hot_words)
+        }
+        return self.post(frame_data, sample_rate, sample_width, fields, hot_words, stop)
+
+    def recognize_words(self, frame_data, sample_rate: int, sample_width: int, language: str, hot_words: list, stop):
+        fields = {
+            'language': language,
+            'hot_words': json.dumps(hot_words),
+            'word_timestamps': 'true'
+        }
+        response = self.post(frame_data, sample_rate, sample_width, fields, hot_words, stop)
+        if(response == ''):
+            return []
+        # The server answers with a json list of {word, start, end, confidence}
+        return json.loads(response)
+
+    def post(self, frame_data, sample_rate: int, sample_width: int, fields: dict, hot_words: list, stop):
+        """
+        Sends a request to the speech to text server, retries on errors (with backoff).
+        A server that doesn't support the wire format (415) is sent the base64 format from then on.
+
+        Params:
+            frame_data (bytes-like): Raw mono PCM data.
+            sample_rate (int): Sample rate of the audio.
+            sample_width (int): Sample width (in bytes) of the audio.
+            fields (dict): The other form fields.
+            hot_words (list): Hot words to look for (for logging).
+            stop (function): A flag, should the recognizer stop before sending a request.
+
+        Returns:
+            str: The response text (empty if stopped).
+
+        Raises:
+            SpeechToTextError: The request failed (CircuitOpenError if the server is failing).
+        """
+
+        url = os.getenv('CONVERT_SPEECH_TO_TEXT_SERVER_URL')
+        if(url is None):
+            raise Exception(f'Convert speech to text server url (lambda) is None.')
+
+        circuit_breaker = get_circuit_breaker()
+        wire_format = self.wire_format
+        request = encode_request(wire_format, self.codec, frame_data, sample_rate, sample_width, fields)
+        failures = 0
+        error = None
+        for _ in range(Constants.RETRIES_AFTER_API_ERROR):
+            if(failures > 0):
+                time.sleep(get_backoff_delay(failures))
+            if(stop() is True):
+                logger.debug(f"Stopping check with words {hot_words}")
+                return ''
+
+            trial = circuit_breaker.before_call()
+            try:
+                if(self.hedger is None):
+                    res = self.send(url, request)
+                else:
+                    res = self.hedger.call(lambda: self.send(url, request), lambda res: res.status_code == 200)
+                error = self.check_response(res, circuit_breaker)
+            except requests.RequestException as err:
+                circuit_breaker.record_failure()
+                error = f'{type(err).__name__}: {err}'
+            finally:
+                if(trial):
+                    circuit_breaker.end_trial()
+            if(error is not None):
+                failures += 1
+                continue
+
+            if(res.status_code == 200):
+                return res.text
+            if(res.status_code == 415 and wire_format != 'base64'):
+                logger.warning(f'Speech to text server does not support the {wire_format} wire format, using base64.')
+                self.wire_format = wire_format = 'base64'
+                request = encode_request(wire_format, self.codec, frame_data, sample_rate, sample_width, fields)
+                continue
+            raise SpeechToTextError(f'Recieved status code {res.status_code} from speech to text API. Response: {res.text}.')
+        raise SpeechToTextError(f'Speech to text API failed {Constants.RETRIES_AFTER_API_ERROR} times. Last error: {error}.')
+
+    def check_response(self, res, circuit_breaker):
+        """
+        Records a response in the circuit breaker. Throttling (429) is left to the concurrency limiter,
+        only server errors are failures of the server.
+
+        Params:
+            res (requests.Response): The response.
+            circuit_breaker (CircuitBreaker): The circuit breaker.
+
+        Returns:
+            str: The error to retry (None if the response is final).
+        """
+
+        if(res.status_code == 429):
+            return f'throttled. Response: {res.text}'
+        if(res.status_code in RETRYABLE_STATUS_CODES):
+            circuit_breaker.record_failure()
+            return f'status code {res.status_code}. Response: {res.text}'
+        circuit_breaker.record_success()
+        return None
+
+    def send(self, url: str, request: dict):
+        """
+        Sends one request, in a slot of the process wide concurrency limiter.
+
+        Params:
+            url (str): The speech to text server url.
+            request (dict): Keyword arguments for requests.post (see encode_request).
+
+        Returns:
+            requests.Response: The response.
+        """
+
+        concurrency_limiter = get_concurrency_limiter()
+        sent = concurrency_limiter.acquire()
+        congested = True
+        try:
+            res = self.session.post(url, timeout=Constants.REQUEST_TIMEOUT, **request)
+            congested = res.status_code in RETRYABLE_STATUS_CODES
+            return res
+        finally:
+            concurrency_limiter.release(sent, congested)
+
+
+class PocketSphinxRecognizer(Recognizer):
+    """
+    Offline keyword spotting with PocketSphinx, in a pool of processes (the decoding is CPU bound).
+    The transcript has only the hot words that were spotted.
+    """
+
+    name = 'pocketsphinx'
+
+    def recognize(self, frame_data, sample_rate: int, sample_width: int, language: str, hot_words: list, stop):
+        if(stop() is True):
+            logger.debug(f"Stopping check with words {hot_words}")
+            return ''
+
+        future = get_process_pool().submit(
+            spot_keywords, bytes(frame_data), sample_rate, sample_width, language, hot_words)
+        return future.result()
+
+    def recognize_words(self, frame_data, sample_rate: int, sample_width: int, language: str, hot_words: list, stop):
+        if(stop() is True):
+            logger.debug(f"Stopping check with words {hot_words}")
+            return []
+
+        future = get_process_pool().submit(
+            spot_keywords, bytes(frame_data), sample_rate, sample_width, language, hot_words, True)
+        return future.result()
+
+
+def spot_keywords(frame_data: bytes, sample_rate: int, sample_width: int, language: str, hot_words: list, word_timestamps: bool = False):
+    """
+    Spots the hot words in the audio with PocketSphinx (runs in the process pool).
+
+    Params:
+        frame_data (bytes): Raw mono PCM data.
+        sample_rate (int): Sample rate of the audio.
+        sample_width (int): Sample width (in bytes) of the audio.
+        language (str): Language of the audio (e.g.: en-US).
+        hot_words (list): Hot words to look for.
+        word_timestamps (bool): Return the spotted words with their timestamps.
+
+    Returns:
+        str: The spotted hot words, separated by spaces.
+        list of dicts: If word_timestamps, the spotted words (see Recognizer.recognize_words).
+    """
+
+    import speech_recognition as sr
+
+    audio = sr.AudioData(frame_data, sample_rate, sample_width)
+    keyword_entries = [(hot_word, Constants.POCKETSPHINX_KEYWORD_SENSITIVITY) for hot_word in set(hot_words)]
+    try:
+        if(word_timestamps is False):
+            return sr.Recognizer().recognize_sphinx(audio, language=language, keyword_entries=keyword_entries)
+
+        decoder = sr.Recognizer().recognize_sphinx(
+            audio, language=language, keyword_entries=keyword_entries, show_all=True)
+    except sr.UnknownValueError:
+        return [] if word_timestamps else ''
+
+    # Segments are in frames, PocketSphinx uses 100 frames per second
+    return [{'word': segment.word.strip(), 'start': segment.start_frame / 100, 'end': segment.end_frame / 100, 'confidence': segment.prob}
+            for segment in decoder.seg() if segment.word.strip() in hot_words]
+
+
+_process_pool = None
+_recognizer = None
+_lock = threading.Lock()
+
+
+def get_process_pool():
+    """
+    Gets the process pool for the CPU bound recognizers (created on first use).
+    The workers are started by a forkserver, forking this (multithreaded) process could copy locks held by other threads.
+
+    Returns:
+        ProcessPoolExecutor: The pool.
+    """
+
+    global _process_pool
+    with _lock:
+        if(_process_pool is None):
+            _process_pool = ProcessPoolExecutor(max_workers=Constants.POCKETSPHINX_PROCESSES or os.cpu_count(),
+                                                mp_context=multiprocessing.get_context('forkserver'))
+        return _process_pool
+
+
+RECOGNIZERS = {recognizer.name: recognizer for recognizer in (LambdaRecognizer, PocketSphinxRecognizer)}
+
+
+def get_recognizer():
+    """
+    Gets the recognizer of this process, set by the SPEECH_TO_TEXT_BACKEND environment variable (lambda by default).
+
+    Returns:
+        Recognizer: The recognizer.
+    """
+
+    global _recognizer
+    with _lock:
+        if(_recognizer is None):
+            backend = os.getenv('SPEECH_TO_TEXT_BACKEND', Constants.SPEECH_TO_TEXT_BACKEND)
+            if(backend not in RECOGNIZERS):
+                raise Exception(f'Unknown speech to text backend {backend}. Options: {list(RECOGNIZERS)}.')
+            logger.debug(f'Using {backend} speech to text backend.')
+            _recognizer = RECOGNIZERS[backend]()
+        return _recognizer
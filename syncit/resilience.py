@@ -0,0 +1,225 @@
+import random
+import threading
+import time
+import logging
+from syncit.constants import Constants
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Responses that mean the speech to text server is overloaded or unavailable (worth retrying later)
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class SpeechToTextError(Exception):
+    """
+    A speech to text request failed (the transcript is unknown, not empty).
+    """
+
+
+class CircuitOpenError(SpeechToTextError):
+    """
+    The speech to text server is failing, requests are not sent until it recovers (see CircuitBreaker).
+    """
+
+
+def get_backoff_delay(attempt: int):
+    """
+    Gets the time to wait before a retry, exponential backoff with full jitter (so retries of
+    concurrent requests spread out instead of hitting the server together).
+
+    Params:
+        attempt (int): The retry (1 for the first retry).
+
+    Returns:
+        float: Seconds to wait.
+    """
+
+    return random.uniform(0, min(Constants.STT_BACKOFF_MAX, Constants.STT_BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+class ConcurrencyLimiter():
+    """
+    Adaptive limit of the speech to text requests in flight (AIMD): the limit grows by one for every
+    limit successful requests, and halves when the server is congested (throttling, errors, timeouts).
+    One burst of congested responses halves it once, only requests sent after the last decrease count.
+
+    Attributes:
+        limit (float): Requests allowed in flight.
+        min_limit (int): The lowest limit.
+        max_limit (int): The highest limit.
+        in_flight (int): Requests in flight.
+        last_decrease (float): When the limit was last decreased.
+        condition (threading.Condition): Wakes the requests waiting for a slot.
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int):
+        """
+        Constructor of ConcurrencyLimiter.
+
+        Params:
+            initial_limit (int): Requests allowed in flight at first.
+            min_limit (int): The lowest limit.
+            max_limit (int): The highest limit.
+        """
+
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.last_decrease = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits for a slot.
+
+        Returns:
+            float: When the request was sent (pass to release).
+        """
+
+        with self.condition:
+            while(self.in_flight >= int(self.limit)):
+                self.condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, sent: float, congested: bool):
+        """
+        Frees a slot and adapts the limit.
+
+        Params:
+            sent (float): When the request was sent (from acquire).
+            congested (bool): Whether the server was congested.
+        """
+
+        with self.condition:
+            self.in_flight -= 1
+            if(congested is False):
+                self.limit = min(self.limit + Constants.STT_LIMIT_INCREASE / self.limit, self.max_limit)
+            elif(sent >= self.last_decrease):
+                self.limit = max(self.limit * Constants.STT_LIMIT_DECREASE, self.min_limit)
+                self.last_decrease = time.monotonic()
+                logger.warning(f'Speech to text server congested, limit decreased to {self.limit:.1f}.')
+            self.condition.notify_all()
+
+
+class CircuitBreaker():
+    """
+    Fails fast while the speech to text server is failing. After failure_threshold failures in a row
+    the circuit opens and requests fail without being sent. After reset_timeout seconds one request
+    is let through (half open), its success closes the circuit and its failure opens it again.
+
+    Attributes:
+        failure_threshold (int): Failures in a row that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open.
+        failures (int): Failures in a row.
+        opened (float): When the circuit opened (None if closed).
+        trial (bool): Whether the half open request is in flight.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """
+        Constructor of CircuitBreaker.
+
+        Params:
+            failure_threshold (int): Failures in a row that open the circuit.
+            reset_timeout (float): Seconds the circuit stays open.
+        """
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Checks if a request can be sent.
+
+        Returns:
+            bool: Whether the request is the half open trial (end it with end_trial).
+
+        Raises:
+            CircuitOpenError: The circuit is open.
+        """
+
+        with self.lock:
+            if(self.opened is None):
+                return False
+            if(self.trial is False and time.monotonic() - self.opened >= self.reset_timeout):
+                self.trial = True
+                logger.info('Speech to text circuit half open, sending a trial request.')
+                return True
+        raise CircuitOpenError('Speech to text server is failing, not sending requests.')
+
+    def end_trial(self):
+        """
+        Ends the half open trial request (call in a finally). A trial that didn't record a result (throttled, or
+        an unexpected error) lets the next request be the trial, instead of keeping the circuit open forever.
+        """
+
+        with self.lock:
+            self.trial = False
+
+    def record_success(self):
+        """
+        Records a request the server answered (closes the circuit).
+        """
+
+        with self.lock:
+            if(self.opened is not None):
+                logger.info('Speech to text circuit closed.')
+            self.failures = 0
+            self.opened = None
+            self.trial = False
+
+    def record_failure(self):
+        """
+        Records a failed request (opens the circuit after failure_threshold in a row, or if the trial failed).
+        """
+
+        with self.lock:
+            self.failures += 1
+            if(self.trial or (self.opened is None and self.failures >= self.failure_threshold)):
+                logger.error(f'Speech to text circuit open after {self.failures} failures.')
+                self.opened = time.monotonic()
+                self.trial = False
+
+
+_concurrency_limiter = None
+_circuit_breaker = None
+_lock = threading.Lock()
+
+
+def get_concurrency_limiter():
+    """
+    Gets the concurrency limiter of this process, shared by all the speech to text requests (created on first use).
+
+    Returns:
+        ConcurrencyLimiter: The limiter.
+    """
+
+    global _concurrency_limiter
+    with _lock:
+        if(_concurrency_limiter is None):
+            _concurrency_limiter = ConcurrencyLimiter(
+                Constants.STT_LIMIT_INITIAL, Constants.STT_LIMIT_MIN, Constants.STT_MAX_IN_FLIGHT)
+        return _concurrency_limiter
+
+
+def get_circuit_breaker():
+    """
+    Gets the circuit breaker of this process (created on first use).
+
+    Returns:
+        CircuitBreaker: The circuit breaker.
+    """
+
+    global _circuit_breaker
+    with _lock:
+        if(_circuit_breaker is None):
+            _circuit_breaker = CircuitBreaker(Constants.STT_CIRCUIT_FAILURE_THRESHOLD, Constants.STT_CIRCUIT_RESET_TIMEOUT)
+        return _circuit_breaker
@@ -0,0 +1,147 @@
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from syncit.constants import Constants
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class SpeechToTextScheduler():
+    """
+    Process wide scheduler for the speech to text requests.
+    All the requests run on one bounded pool of workers, so the pool size is the global
+    in-flight limit of the process.
+
+    Attributes:
+        executor (ThreadPoolExecutor): The shared workers.
+        max_in_flight_per_request (int): How many requests one delay check can have in flight.
+    """
+
+    def __init__(self, max_in_flight: int, max_in_flight_per_request: int):
+        """
+        Constructor of SpeechToTextScheduler.
+
+        Params:
+            max_in_flight (int): Maximum requests in flight for the whole process.
+            max_in_flight_per_request (int): Maximum requests in flight for one delay check.
+        """
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix='speech-to-text')
+        self.max_in_flight_per_request = max_in_flight_per_request
+
+    def create_request_scope(self):
+        """
+        Creates a scope for the requests of one delay check.
+
+        Returns:
+            RequestScope: The scope.
+        """
+
+        return RequestScope(self.executor, self.max_in_flight_per_request)
+
+
+class RequestScope():
+    """
+    The requests of one delay check. Holds the requests beyond the per request limit
+    and dispatches them to the shared workers as earlier ones finish.
+
+    Attributes:
+        executor (ThreadPoolExecutor): The shared workers.
+        max_in_flight (int): Maximum requests of this scope in flight.
+        in_flight (int): Requests of this scope currently dispatched.
+        pending (deque): Requests waiting for a free slot.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, max_in_flight: int):
+        """
+        Constructor of RequestScope.
+
+        Params:
+            executor (ThreadPoolExecutor): The shared workers.
+            max_in_flight (int): Maximum requests of this scope in flight.
+        """
+
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.pending = deque()
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedules a call. Cancelling the returned future before it started removes it from the queue.
+
+        Params:
+            fn (function): The function to call.
+            args, kwargs: Arguments for the function.
+
+        Returns:
+            Future: Future with the result of the call.
+        """
+
+        future = Future()
+        with self.lock:
+            self.pending.append((future, fn, args, kwargs))
+        self.dispatch()
+        return future
+
+    def dispatch(self):
+        """
+        Dispatches pending calls to the shared workers while there are free slots.
+        """
+
+        while True:
+            with self.lock:
+                if(self.in_flight >= self.max_in_flight or len(self.pending) == 0):
+                    return
+                future, fn, args, kwargs = self.pending.popleft()
+
+                # Skip calls cancelled while waiting
+                if(future.set_running_or_notify_cancel() is False):
+                    continue
+                self.in_flight += 1
+
+            inner_future = self.executor.submit(fn, *args, **kwargs)
+            inner_future.add_done_callback(
+                lambda inner_future, future=future: self.on_done(future, inner_future))
+
+    def on_done(self, future: Future, inner_future: Future):
+        """
+        Passes the result of a finished call and frees its slot.
+        """
+
+        with self.lock:
+            self.in_flight -= 1
+
+        error = inner_future.exception()
+        if(error is None):
+            future.set_result(inner_future.result())
+        else:
+            future.set_exception(error)
+
+        self.dispatch()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Gets the speech to text scheduler of this process (created on first use, so each uwsgi worker has it's own).
+
+    Returns:
+        SpeechToTextScheduler: The scheduler.
+    """
+
+    global _scheduler
+    with _scheduler_lock:
+        if(_scheduler is None):
+            logger.debug(f'Creating speech to text scheduler. Max in flight: {Constants.STT_MAX_IN_FLIGHT}.')
+            _scheduler = SpeechToTextScheduler(
+                Constants.STT_MAX_IN_FLIGHT, Constants.STT_MAX_IN_FLIGHT_PER_REQUEST)
+        return _scheduler
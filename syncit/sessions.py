@@ -0,0 +1,300 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from syncit.constants import Constants
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class Session():
+    """
+    A subtitles file synced chunk by chunk. The subtitles are uploaded once, the later chunks
+    only send the audio.
+
+    Attributes:
+        id (str): The session id.
+        subtitles (bytes): The subtitles file content.
+        subtitles_language (str): The language of the subtitles, as requested ('ad' to auto detect).
+        audio_language (str): The language of the audio.
+        falty_delays (list of dicts): Delays already verified falty in the previous chunks (see merge_falty_delays).
+            delay (float): The delay.
+            rejections (int): Chunks that verified it falty.
+            rejected (float): When it was last verified falty (unix time).
+        last_delay (float): The last verified delay (None if no delay was verified yet).
+    """
+
+    def __init__(self, id: str, subtitles: bytes, subtitles_language: str, audio_language: str,
+                 falty_delays: list, last_delay: float):
+        """
+        Constructor of Session.
+
+        Params:
+            id (str): The session id.
+            subtitles (bytes): The subtitles file content.
+            subtitles_language (str): The language of the subtitles.
+            audio_language (str): The language of the audio.
+            falty_delays (list of dicts): Delays already verified falty.
+            last_delay (float): The last verified delay.
+        """
+
+        self.id = id
+        self.subtitles = subtitles
+        self.subtitles_language = subtitles_language
+        self.audio_language = audio_language
+        self.falty_delays = falty_delays
+        self.last_delay = last_delay
+
+    def is_known_falty(self, delay: float):
+        """
+        Checks if the delay was verified falty by enough of the previous chunks, recently.
+
+        Params:
+            delay (float): The delay.
+
+        Returns:
+            bool: Whether the delay is known falty.
+        """
+
+        now = time.time()
+        return any(abs(delay - item['delay']) <= Constants.SESSION_FALTY_DELAY_TOLERANCE and
+                   item['rejections'] >= Constants.SESSION_FALTY_DELAY_MIN_REJECTIONS and
+                   now - item['rejected'] <= Constants.SESSION_FALTY_DELAY_TTL for item in self.falty_delays)
+
+
+def merge_falty_delays(stored_falty_delays: list, falty_delays: list, delay: float, now: float):
+    """
+    Merges the falty delays of a chunk into the falty delays of the session. A delay close to a stored one
+    (Constants.SESSION_FALTY_DELAY_TOLERANCE) is one more rejection of it, the delays close to the verified
+    delay are dropped, and so are the expired ones and the oldest beyond Constants.SESSION_MAX_FALTY_DELAYS.
+
+    Params:
+        stored_falty_delays (list of dicts): The falty delays of the session (see Session).
+        falty_delays (list of float): The delays verified falty in the chunk.
+        delay (float): The delay verified in the chunk (None if no delay was verified).
+        now (float): The time of the chunk (unix time).
+
+    Returns:
+        list of dicts: The merged falty delays.
+    """
+
+    tolerance = Constants.SESSION_FALTY_DELAY_TOLERANCE
+    merged = [dict(item) for item in stored_falty_delays if now - item['rejected'] <= Constants.SESSION_FALTY_DELAY_TTL]
+    rejected_items = []
+    for falty_delay in falty_delays:
+        item = next((item for item in merged if abs(item['delay'] - falty_delay) <= tolerance), None)
+        if(item is None):
+            item = {'delay': falty_delay, 'rejections': 0, 'rejected': now}
+            merged.append(item)
+        # One rejection per chunk, even if the chunk rejected a few close delays
+        if(all(item is not rejected_item for rejected_item in rejected_items)):
+            item['rejections'] += 1
+            item['rejected'] = now
+            rejected_items.append(item)
+
+    if(delay is not None):
+        # A verified delay (and the delays close to it) is not falty anymore
+        merged = [item for item in merged if abs(item['delay'] - delay) > tolerance]
+
+    merged.sort(key=lambda item: item['rejected'], reverse=True)
+    return merged[:Constants.SESSION_MAX_FALTY_DELAYS]
+
+
+class SessionStore():
+    """
+    Sessions kept on disk (SQLite) so every uwsgi process can continue a session, the parsed subtitles
+    and their translations are kept by each process (see parsed_subtitles_cache and TranslationStore).
+    Sessions expire after idle_timeout seconds without a chunk, and the least recently used sessions
+    are evicted beyond max_size bytes of subtitles.
+
+    Attributes:
+        path (str): Path of the database file.
+        max_size (int): Maximum bytes of subtitles in the store.
+        idle_timeout (float): Seconds a session is kept without a chunk.
+        connection (sqlite3.Connection): Connection to the database.
+        lock (threading.Lock): Lock of the connection.
+    """
+
+    def __init__(self, path: str, max_size: int = Constants.SESSION_STORE_MAX_SIZE,
+                 idle_timeout: float = Constants.SESSION_IDLE_TIMEOUT):
+        """
+        Constructor of SessionStore.
+
+        Params:
+            path (str): Path of the database file (created if needed).
+            max_size (int): Maximum bytes of subtitles in the store.
+            idle_timeout (float): Seconds a session is kept without a chunk.
+        """
+
+        self.path = path
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=Constants.SESSION_STORE_TIMEOUT, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('''CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                subtitles BLOB NOT NULL,
+                subtitles_language TEXT NOT NULL,
+                audio_language TEXT NOT NULL,
+                falty_delays TEXT NOT NULL,
+                last_delay REAL,
+                used REAL NOT NULL)''')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS sessions_used ON sessions (used)')
+
+    def create(self, subtitles: bytes, subtitles_language: str, audio_language: str):
+        """
+        Creates a session, evicts the expired sessions and the least recently used ones beyond max_size.
+
+        Params:
+            subtitles (bytes): The subtitles file content.
+            subtitles_language (str): The language of the subtitles.
+            audio_language (str): The language of the audio.
+
+        Returns:
+            Session: The new session.
+        """
+
+        session = Session(uuid.uuid4().hex, subtitles, subtitles_language, audio_language, [], None)
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM sessions WHERE used < ?', (now - self.idle_timeout,))
+            self.connection.execute('INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                    (session.id, subtitles, subtitles_language, audio_language, '[]', None, now))
+            rows = self.connection.execute('SELECT id, LENGTH(subtitles) FROM sessions ORDER BY used DESC').fetchall()
+            size = 0
+            evicted = []
+            for id, subtitles_size in rows:
+                size += subtitles_size
+                if(size > self.max_size and id != session.id):
+                    evicted.append((id,))
+            self.connection.executemany('DELETE FROM sessions WHERE id = ?', evicted)
+
+        if(len(evicted) > 0):
+            logger.debug(f'Evicted {len(evicted)} sessions beyond the size limit.')
+        return session
+
+    def get(self, id: str):
+        """
+        Gets a session and marks it used.
+
+        Params:
+            id (str): The session id.
+
+        Returns:
+            Session: The session (None if it doesn't exist or expired).
+        """
+
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute('''SELECT subtitles, subtitles_language, audio_language, falty_delays, last_delay
+                FROM sessions WHERE id = ? AND used >= ?''', (id, now - self.idle_timeout)).fetchone()
+            if(row is None):
+                return None
+            self.connection.execute('UPDATE sessions SET used = ? WHERE id = ?', (now, id))
+
+        (subtitles, subtitles_language, audio_language, falty_delays, last_delay) = row
+        return Session(id, subtitles, subtitles_language, audio_language, json.loads(falty_delays), last_delay)
+
+    def record(self, id: str, delay: float, falty_delays: list):
+        """
+        Records the result of a chunk. The falty delays are merged with the ones already stored
+        (chunks of the same session may be checked by different processes, see merge_falty_delays).
+
+        Params:
+            id (str): The session id.
+            delay (float): The verified delay (None if no delay was verified).
+            falty_delays (list): The delays verified falty in the chunk.
+        """
+
+        with self.lock, self.connection:
+            row = self.connection.execute('SELECT falty_delays, last_delay FROM sessions WHERE id = ?', (id,)).fetchone()
+            if(row is None):
+                return
+            now = time.time()
+            stored_falty_delays = merge_falty_delays(json.loads(row[0]), falty_delays, delay, now)
+            last_delay = row[1] if delay is None else delay
+            self.connection.execute('UPDATE sessions SET falty_delays = ?, last_delay = ?, used = ? WHERE id = ?',
+                                    (json.dumps(stored_falty_delays), last_delay, now, id))
+
+    def delete(self, id: str):
+        """
+        Deletes a session.
+
+        Params:
+            id (str): The session id.
+
+        Returns:
+            bool: Whether the session existed.
+        """
+
+        with self.lock, self.connection:
+            return self.connection.execute('DELETE FROM sessions WHERE id = ?', (id,)).rowcount > 0
+
+    def close(self):
+        """
+        Closes the connection.
+        """
+
+        with self.lock:
+            self.connection.close()
+
+
+class HostLocalStoreError(Exception):
+    """
+    A store that is a file on this host (sessions, jobs) is used where the app runs on several hosts.
+    """
+
+
+def check_single_host(store: str):
+    """
+    Makes sure the app runs on a single host. The session and job stores are SQLite files shared by the processes
+    of one host, with several instances (e.g. Cloud Run scales to many) a session or job created on one instance
+    is not found on the others. Cloud Run is detected by the K_SERVICE environment variable, and SINGLE_HOST=true
+    overrides it for a service limited to one instance (--max-instances 1).
+
+    Params:
+        store (str): The name of the store (for the error).
+
+    Raises:
+        HostLocalStoreError: The app may run on several hosts.
+    """
+
+    single_host = os.getenv('SINGLE_HOST')
+    if(single_host is None):
+        single_host = os.getenv('K_SERVICE') is None
+    else:
+        single_host = single_host.lower() == 'true'
+    if(single_host is False):
+        raise HostLocalStoreError(f'The {store} store is a file on this host, it needs a single host deployment '
+                                  f'(set SINGLE_HOST=true if the service has one instance).')
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    Gets the session store of this process, at the SESSION_STORE_PATH environment variable
+    (Constants.SESSION_STORE_PATH by default).
+
+    Returns:
+        SessionStore: The store.
+
+    Raises:
+        HostLocalStoreError: The app may run on several hosts (see check_single_host).
+    """
+
+    global _store
+    check_single_host('session')
+    with _lock:
+        if(_store is None):
+            _store = SessionStore(os.getenv('SESSION_STORE_PATH', Constants.SESSION_STORE_PATH))
+        return _store
@@ -0,0 +1,51 @@
+"""
+Local stand-in for the speech to text server (lambda), with offline keyword spotting (PocketSphinx).
+Understands every wire format (see syncit/wire_formats.py).
+
+Usage (from the repository root):
+    python -m syncit.stt_server [port]
+    CONVERT_SPEECH_TO_TEXT_SERVER_URL=http://localhost:5001/
+"""
+
+import sys
+import json
+import logging
+from flask import Flask, request, Response
+from syncit.recognizers import spot_keywords
+from syncit.wire_formats import UnsupportedWireFormat, decode_request
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+
+
+@app.route('/', methods=['POST'])
+def convert_speech_to_text():
+    """
+    Route to convert audio to text.
+
+    Request Params:
+        The audio (in any wire format), sample_rate, sample_width, language, hot_words (json list)
+        and word_timestamps ('true' for the words with their timestamps).
+
+    Response:
+        The spotted hot words separated by spaces, or a json list of {word, start, end, confidence}.
+    """
+
+    try:
+        (frame_data, sample_rate, sample_width, fields) = decode_request(request)
+    except UnsupportedWireFormat as err:
+        return Response(str(err), 415)
+    except (KeyError, ValueError) as err:
+        return Response(f'Bad Request. Error: {err}', 400)
+
+    word_timestamps = fields.get('word_timestamps') == 'true'
+    logger.debug(f'Spotting {fields["hot_words"]} in {len(frame_data)} bytes. Content type: {request.mimetype}.')
+    result = spot_keywords(frame_data, sample_rate, sample_width, fields['language'], fields['hot_words'], word_timestamps)
+    return Response(json.dumps(result) if word_timestamps else result, 200)
+
+
+if(__name__ == '__main__'):
+    app.run('0.0.0.0', int(sys.argv[1]) if len(sys.argv) > 1 else 5001)
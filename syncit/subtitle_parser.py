@@ -2,20 +2,23 @@ from dotenv import load_dotenv
 import re
 import random
 from syncit.constants import Constants
-from syncit.helpers import convert_subs_time, clean_text
+from syncit.helpers import convert_subs_time, clean_text, decode_subtitles, detect_language
 import logging
-import threading
 import os
 from syncit.translate import CustomTranslator
-from chardet import detect as detect_encoding
-from langdetect import detect as detect_language
 from logger_setup import setup_logging
 import uuid
+import hashlib
+import numpy as np
+from syncit.cache import LRUCache
 
 load_dotenv()
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Parsed subtitles of the process, shared between requests (the frontend uploads the same file for every section)
+parsed_subtitles_cache = LRUCache(Constants.PARSED_SUBTITLES_CACHE_SIZE, Constants.PARSED_SUBTITLES_CACHE_TTL)
+
 
 class SubtitleParser():
     """
@@ -24,12 +27,27 @@ class SubtitleParser():
     Attributes:
         subtitles (str): Subtitles file content.
         re_subs (list): List of tuples containing the parsed subtitles.
+        starts_ms (np.ndarray): Start time of each cue in milliseconds.
+        ends_ms (np.ndarray): End time of each cue in milliseconds.
+        texts (list): Cleaned text of each cue (None if there is no text).
+        first_words (list): First word of each cue (None if there is no text).
+        order (np.ndarray): Indexes of the cues sorted by start time.
+        sorted_starts_ms (np.ndarray): Start times of the cues sorted.
+        max_duration_ms (int): Duration of the longest cue.
         subtitles_language (str): Language of the subtitles.
         audio_language (str): Language of the audio.
         encoding (str): The encoding of the subtitles.
+        encoding_confidence (float): Confidence of the encoding detection (0 to 1).
+        language_confidence (float): Probability of the detected language (None if the language wasn't detected).
+        translations (dict): Subtitles already translated to the audio language (source text -> translated text).
         translator (Translator): Translator instace with the languages loaded.
     """
 
+    # The state shared by all the parsers of the same file and languages (see parsed_subtitles_cache)
+    cached_attributes = ('subtitles', 'encoding', 'encoding_confidence', 're_subs', 'starts_ms', 'ends_ms', 'texts', 'first_words',
+                         'order', 'sorted_starts_ms', 'max_duration_ms', 'subtitles_language',
+                         'language_confidence', 'translations')
+
     def __init__(self, subtitles_file, subtitles_language: str, audio_language: str):
         """
         Constructor for the SubtitlesParser class.
@@ -41,18 +59,42 @@ class SubtitleParser():
         """
 
         subtitles_binary = subtitles_file.read()
-        encoding = detect_encoding(subtitles_binary)['encoding']
-        self.subtitles = subtitles_binary.decode(encoding)
+        self.audio_language = audio_language
+
+        cache_key = (hashlib.blake2b(subtitles_binary, digest_size=16).hexdigest(), subtitles_language, audio_language)
+        state = parsed_subtitles_cache.get(cache_key)
+        if(state is None):
+            self.parse_subtitles(subtitles_binary, subtitles_language)
+            parsed_subtitles_cache.set(cache_key, {attribute: getattr(self, attribute) for attribute in self.cached_attributes})
+        else:
+            logger.debug(f'Subtitles loaded from cache. Encoding: {state["encoding"]}')
+            for attribute, value in state.items():
+                setattr(self, attribute, value)
+
+        self.translator = CustomTranslator(self.subtitles_language, audio_language)
+
+    def parse_subtitles(self, subtitles_binary: bytes, subtitles_language: str):
+        """
+        Decodes the subtitles, parses them and detects their language (if needed).
+
+        Params:
+            subtitles_binary (bytes): The subtitles file content.
+            subtitles_language (str): The language of the subtitles ('ad' to auto detect).
+        """
+
+        (self.subtitles, encoding, self.encoding_confidence) = decode_subtitles(subtitles_binary)
         self.encoding = encoding
-        logger.debug(f'Subtitles Encoding: {encoding}')
+        logger.debug(f'Subtitles Encoding: {encoding} (confidence {self.encoding_confidence})')
         logger.debug(f'Subtitles[:100]: {[self.subtitles[:1000]]}')
         self.read_subtitles()
-        self.audio_language = audio_language
 
         # Detect subtitles language
         if(subtitles_language == 'ad'):  # ad = Auto Detect
-            detected_language = detect_language(self.subtitles)
-            logger.debug(f"Subtitles language detected as {detected_language}")
+            (detected_language, self.language_confidence) = detect_language(self.texts)
+            if(detected_language is None):
+                # No cue has text left after cleaning, detect on the whole file
+                (detected_language, self.language_confidence) = detect_language([self.subtitles])
+            logger.debug(f"Subtitles language detected as {detected_language} (probability {self.language_confidence})")
 
             # True if the detected language in google's supported languages
             language_items = any(map(
@@ -64,8 +106,9 @@ class SubtitleParser():
 
         else:
             self.subtitles_language = subtitles_language
+            self.language_confidence = None
 
-        self.translator = CustomTranslator(self.subtitles_language, audio_language)
+        self.translations = {}
 
     def read_subtitles(self):
         """
@@ -85,11 +128,28 @@ class SubtitleParser():
             re_subs = re.findall(pattern, self.subtitles, re.M | re.I)
             if(len(re_subs) > 1):
                 self.re_subs = re_subs
+                self.index_subtitles()
                 return
 
         raise Exception(
             f're_subs length is {len(re_subs)}. Maybe the regex pattern is falty?')
 
+    def index_subtitles(self):
+        """
+        Parses the cues once into columns (times in milliseconds, cleaned text and first word),
+        so timespan lookups are binary searches instead of parsing the cues on every request.
+        """
+
+        self.starts_ms = np.array([int(round(convert_subs_time(match[1]) * 1000)) for match in self.re_subs], dtype=np.int64)
+        self.ends_ms = np.array([int(round(convert_subs_time(match[2]) * 1000)) for match in self.re_subs], dtype=np.int64)
+        self.texts = [clean_text(match[3]) for match in self.re_subs]
+        self.first_words = [text.split()[0] if text is not None else None for text in self.texts]
+
+        # The cues by start time (files are usually sorted already)
+        self.order = np.argsort(self.starts_ms, kind='stable')
+        self.sorted_starts_ms = self.starts_ms[self.order]
+        self.max_duration_ms = int(np.max(self.ends_ms - self.starts_ms, initial=0))
+
     def get_subtitles(self, index: int):
         """
         Gets cleaned subtitles and the timespan of a specific index in seconds.
@@ -101,13 +161,31 @@ class SubtitleParser():
             tuple: (cleaned_subtitles, start, end)
         """
 
-        match = self.re_subs[index - 1]
-        start = convert_subs_time(match[1])
-        end = convert_subs_time(match[2])
-        subtitles = match[3]
-        subtitles = clean_text(subtitles)
+        return (self.texts[index - 1], int(self.starts_ms[index - 1]) / 1000, int(self.ends_ms[index - 1]) / 1000)
 
-        return (subtitles, start, end)
+    def get_cues(self, start: float, end: float):
+        """
+        Gets the times of the cues shown in the timespan.
+        Cues without speech (e.g.: '(MUSIC PLAYING)') are skipped.
+
+        Params:
+            start (float): start time.
+            end (float): end time.
+
+        Returns:
+            list of tuples: (start, end) of each cue.
+        """
+
+        # Cues starting before start - (longest cue) can't be shown in the timespan
+        first = np.searchsorted(self.sorted_starts_ms, start * 1000 - self.max_duration_ms, 'right')
+        last = np.searchsorted(self.sorted_starts_ms, end * 1000, 'left')
+
+        cues = []
+        for index in self.order[first:last]:
+            if(self.ends_ms[index] > start * 1000 and self.texts[index] is not None):
+                cues.append((int(self.starts_ms[index]) / 1000, int(self.ends_ms[index]) / 1000))
+
+        return cues
 
     def get_valid_hot_words(self, start: float, end: float):
         """
@@ -128,40 +206,32 @@ class SubtitleParser():
 
         valid_hot_words = []
 
-        subs_length = len(self.re_subs)
-        logger.debug(f'Subs Length: {subs_length}')
-
-        for sub in range(1, subs_length):
-
-            # Get the subtitles by index
-            (subtitles, subtitles_start, subtitles_end) = self.get_subtitles(sub)
-
-            # Skip to the start time
-            if(subtitles_start < start):
-                continue
+        # Cues starting inside the timespan, until the first cue that ends after it
+        first = np.searchsorted(self.sorted_starts_ms, start * 1000, 'left')
+        last = np.searchsorted(self.sorted_starts_ms, end * 1000, 'right')
+        indexes = self.order[first:last]
+        ending_after = np.nonzero(self.ends_ms[indexes] > end * 1000)[0]
+        if(len(ending_after) > 0):
+            indexes = indexes[:ending_after[0]]
+        logger.debug(f'Subs Length: {len(self.texts)}. Cues in timespan: {len(indexes)}')
 
-            # Reached the end
-            if(subtitles_end > end):
-                break
+        for index in indexes:
+            hot_word = self.first_words[index]
 
             # Don't check empty subtitles (e.g.: {Quack})
-            try:
-                hot_word = subtitles.split()[0]
-            except:
+            if(hot_word is None):
                 continue
 
             # Don't take numbers as hot words
             if(hot_word.replace('.', '', 1).isdigit()):  # The replace is if the number is a float
                 continue
 
-            # If no translation is needed -> Append the word and continue.
-            # if(self.audio_language == self.subtitles_language):
             valid_hot_words.append({
                 'id': f'{hot_word}-{uuid.uuid4().hex[:6]}',
                 'hot_word': hot_word,
-                'subtitles': subtitles,
-                'start': subtitles_start,
-                'end': subtitles_end
+                'subtitles': self.texts[index],
+                'start': int(self.starts_ms[index]) / 1000,
+                'end': int(self.ends_ms[index]) / 1000
             })
         
         if(self.subtitles_language != self.audio_language):
@@ -195,23 +265,22 @@ class SubtitleParser():
                 end (float): End time.
         """       
 
-        threads = []
         translated_hot_words = []
-        results = []
+
+        # Subtitles translated in an earlier request for this file are not translated again
+        pending_subtitles = list({hot_word_item['subtitles'] for hot_word_item in hot_words} - self.translations.keys())
 
         # Try using free and unstable API first, if not working use the official API
-        for hot_word_item in hot_words:
-            thread = threading.Thread(target=self.translator.translate, args=(hot_word_item['subtitles'], results))
-            thread.start()
-            threads.append(thread)
-
-        # Wait for threads to finish
-        [thread.join() for thread in threads]
-
-        for result in results:
-            source_subtitles = result['source_text']
-            item = [hot_word_item for hot_word_item in hot_words if hot_word_item['subtitles'] == source_subtitles][0]
-            cleaned_translated_subtitles = clean_text(result['translated_text'])
+        translated_subtitles = self.translator.translate_many(pending_subtitles)
+        for source_subtitles, translated_text in zip(pending_subtitles, translated_subtitles):
+            if(translated_text is not None):
+                self.translations[source_subtitles] = translated_text
+
+        for item in hot_words:
+            source_subtitles = item['subtitles']
+            if(source_subtitles not in self.translations):
+                continue
+            cleaned_translated_subtitles = clean_text(self.translations[source_subtitles])
             if(cleaned_translated_subtitles is None):
                 continue
 
@@ -233,29 +302,49 @@ class SubtitleParser():
     def filter_hot_words(self, hot_words: list):
         """
         Filters the translated hot words, removes the falty ones.
+        A hot word is falty if it's in the subtitles of another hot word in it's range (start and end closer than
+        Constants.DELAY_RADIUS). E.g. hot word 'hello' which is said at 00:42, when the subtitles at 00:52-00:56 is
+        'that is how you say hello'.
+
+        One pass over the hot words sorted by start time, with a window of the hot words in range of the start
+        and the words of their subtitles, so only the hot words in range with the same word are compared.
 
         Params:
             hot_words (list): List of dictionaries {hot_word, subtitles, start, end}
 
         Returns:
-            list: List of dictionaries, filter.
+            list: List of dictionaries, filter (the same list, the falty ones removed).
         """
 
-        to_remove = []
-        for hot_word_item in hot_words:
-            hot_word = hot_word_item['hot_word']
-
-            # True if the hot word is in the subtitles of it's range. (E.g. hot word 'hello' which is said at 00:42, when the subtitles at 00:52-00:56 is 'that is how you say hello')
+        radius = Constants.DELAY_RADIUS
+        words = [set(hot_word_item['subtitles'].split()) for hot_word_item in hot_words]
+        order = sorted(range(len(hot_words)), key=lambda index: hot_words[index]['start'])
+
+        # word -> indexes of the hot words in the window with the word in their subtitles
+        window = {}
+        first = 0
+        last = 0
+        falty = set()
+        for index in order:
+            hot_word_item = hot_words[index]
+            start = hot_word_item['start']
+
+            # Add the hot words starting before start + radius, remove the ones starting before start - radius
+            while(last < len(order) and hot_words[order[last]]['start'] - start < radius):
+                for word in words[order[last]]:
+                    window.setdefault(word, set()).add(order[last])
+                last += 1
+            while(start - hot_words[order[first]]['start'] >= radius):
+                for word in words[order[first]]:
+                    window[word].discard(order[first])
+                first += 1
+
+            # An equal hot word doesn't count (e.g.: the hot word itself)
             is_hot_word_falty = any(
-                [hot_word in i['subtitles'].split() for i in hot_words if i != hot_word_item
-                 and abs(i['start'] - hot_word_item['start']) < Constants.DELAY_RADIUS
-                 and abs(i['end'] - hot_word_item['end']) < Constants.DELAY_RADIUS
-                 ])
+                hot_words[other] != hot_word_item and abs(hot_words[other]['end'] - hot_word_item['end']) < radius
+                for other in window.get(hot_word_item['hot_word'], ()))
             if(is_hot_word_falty):
-                to_remove.append(hot_word_item)
-
-        # Can't remove them in the loop because then it will cause problems
-        for item in to_remove:
-            hot_words.remove(item)
+                falty.add(index)
 
+        hot_words[:] = [hot_word_item for index, hot_word_item in enumerate(hot_words) if index not in falty]
         return hot_words
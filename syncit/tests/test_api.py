@@ -0,0 +1,241 @@
+import unittest
+import io
+import os
+import json
+import tempfile
+import time
+from unittest.mock import patch
+from syncit.constants import Constants
+from syncit.api import app
+from syncit.sessions import SessionStore, HostLocalStoreError, get_session_store
+from syncit.resilience import SpeechToTextError
+from syncit.jobs import JobStore, JobManager, QUEUED, RUNNING, DONE, FAILED
+
+# Setup Constants
+SUBTITLES_FILE = os.path.join(Constants.SAMPLES_FOLDER, 'subtitles.srt')
+LANGUAGE = 'en'
+AUDIO = b'audio'
+
+# test_check_session_delay Constants
+DELAY = 2.5
+FALTY_DELAYS = [-4.0]
+ENCODING = 'utf-8'
+
+# TestJobRoutes Constants
+WORKERS = 1
+TIMEOUT = 5
+
+
+class FakeDelayChecker():
+    """
+    DelayChecker that finds DELAY (or fails like the speech to text if the audio is empty).
+    """
+
+    def __init__(self, audio_file, start, end, subtitles_file, audio_language, subtitles_language,
+                 session=None, progress_callback=None):
+        self.audio = audio_file.read()
+        self.falty_delays = list(FALTY_DELAYS)
+        self.sp = type('SubtitleParser', (), {'encoding': ENCODING})
+
+    def check_delay(self):
+        if(self.audio == b''):
+            raise SpeechToTextError('Speech to text server is failing.')
+        return DELAY
+
+
+class TestSessionRoutes(unittest.TestCase):
+    """
+    Test for the /sessions routes, with a session store in a temporary directory.
+
+    Attributes:
+        directory (TemporaryDirectory): Directory of the database.
+        store (SessionStore): Store in the temporary directory.
+        client (FlaskClient): Client of the app.
+    """
+
+    def setUp(self):
+        """
+        Create a store in a temporary directory and a client of the app.
+        """
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SessionStore(os.path.join(self.directory.name, 'sessions.sqlite3'))
+        self.patches = [patch('syncit.api.get_session_store', return_value=self.store),
+                        patch('syncit.api.get_job_manager', return_value=None),
+                        patch('syncit.api.DelayChecker', FakeDelayChecker)]
+        [item.start() for item in self.patches]
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """
+        Delete the database.
+        """
+
+        [item.stop() for item in self.patches]
+        self.store.close()
+        self.directory.cleanup()
+
+    def create_session(self, subtitles: bytes):
+        """
+        Posts /sessions.
+        """
+
+        return self.client.post('/sessions', data={'video_language': LANGUAGE, 'subtitles_language': LANGUAGE,
+                                                   'subtitles': (io.BytesIO(subtitles), 'subtitles.srt')})
+
+    def test_create_session(self):
+        """
+        Make sure a session is created from valid subtitles, and bad subtitles or params are a bad request.
+        """
+
+        with open(SUBTITLES_FILE, 'rb') as f:
+            response = self.create_session(f.read())
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(self.store.get(json.loads(response.data)['session_id']))
+
+        self.assertEqual(self.create_session(b'not subtitles').status_code, 400)
+        self.assertEqual(self.client.post('/sessions', data={'video_language': LANGUAGE}).status_code, 400)
+
+    def test_check_session_delay(self):
+        """
+        Make sure a chunk of a session is checked and recorded, a failing speech to text is 503,
+        and a deleted session is not found.
+        """
+
+        with open(SUBTITLES_FILE, 'rb') as f:
+            session = self.store.create(f.read(), LANGUAGE, LANGUAGE)
+        url = f'/sessions/{session.id}/check_delay'
+
+        response = self.client.post(url, data={'start': 600, 'end': 900, 'audio': (io.BytesIO(AUDIO), 'audio.m4a')})
+        self.assertEqual((response.status_code, json.loads(response.data)), (200, {'delay': DELAY, 'encoding': ENCODING}))
+        session = self.store.get(session.id)
+        self.assertEqual(session.last_delay, DELAY)
+        self.assertEqual([item['delay'] for item in session.falty_delays], FALTY_DELAYS)
+
+        response = self.client.post(url, data={'start': 600, 'end': 900, 'audio': (io.BytesIO(b''), 'audio.m4a')})
+        self.assertEqual(response.status_code, 503)
+
+        self.assertEqual(self.client.delete(f'/sessions/{session.id}').status_code, 200)
+        self.assertEqual(self.client.delete(f'/sessions/{session.id}').status_code, 404)
+        response = self.client.post(url, data={'start': 600, 'end': 900, 'audio': (io.BytesIO(AUDIO), 'audio.m4a')})
+        self.assertEqual(response.status_code, 404)
+
+    def test_several_hosts(self):
+        """
+        Make sure the sessions fail loudly where the app may run on several hosts (Cloud Run).
+        """
+
+        with patch.dict(os.environ, {'K_SERVICE': 'syncit-backend'}):
+            with self.assertRaises(HostLocalStoreError):
+                get_session_store()
+            with patch('syncit.api.get_session_store', side_effect=HostLocalStoreError('Single host only.')):
+                self.assertEqual(self.client.delete('/sessions/session').status_code, 501)
+
+
+
+class TestJobRoutes(unittest.TestCase):
+    """
+    Test for the /jobs routes, with a job store in a temporary directory.
+
+    Attributes:
+        directory (TemporaryDirectory): Directory of the database.
+        store (JobStore): Store in the temporary directory.
+        client (FlaskClient): Client of the app.
+    """
+
+    def setUp(self):
+        """
+        Create a store in a temporary directory and a client of the app.
+        """
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.directory.name, 'jobs.sqlite3'))
+        self.patches = [patch('syncit.api.get_job_store', return_value=self.store),
+                        patch('syncit.api.get_job_manager', return_value=None),
+                        patch('syncit.jobs.DelayChecker', FakeDelayChecker)]
+        [item.start() for item in self.patches]
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """
+        Delete the database.
+        """
+
+        [item.stop() for item in self.patches]
+        self.store.close()
+        self.directory.cleanup()
+
+    def create_job(self, audio: bytes):
+        """
+        Posts /jobs with the subtitles.
+        """
+
+        with open(SUBTITLES_FILE, 'rb') as f:
+            return self.client.post('/jobs', data={'start': 600, 'end': 900, 'video_language': LANGUAGE,
+                                                   'subtitles_language': LANGUAGE, 'audio': (io.BytesIO(audio), 'audio.m4a'),
+                                                   'subtitles': (io.BytesIO(f.read()), 'subtitles.srt')})
+
+    def run_jobs(self):
+        """
+        Runs the queued jobs.
+        """
+
+        manager = JobManager(self.store, WORKERS)
+        manager.notify()
+        deadline = time.monotonic() + TIMEOUT
+        while(time.monotonic() < deadline and self.store.connection.execute(
+                'SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)).fetchone()[0] > 0):
+            time.sleep(0.05)
+        manager.shutdown()
+
+    def test_jobs(self):
+        """
+        Make sure a job is queued, its state is found and its events streamed until it's done,
+        and a failing speech to text is a retryable error.
+        """
+
+        response = self.create_job(AUDIO)
+        self.assertEqual(response.status_code, 202)
+        job_id = json.loads(response.data)['job_id']
+        self.assertEqual(json.loads(self.client.get(f'/jobs/{job_id}').data)['status'], 'queued')
+
+        failed_job_id = json.loads(self.create_job(b'').data)['job_id']
+        self.run_jobs()
+
+        job = json.loads(self.client.get(f'/jobs/{job_id}').data)
+        self.assertEqual((job['status'], job['result']), (DONE, {'delay': DELAY, 'encoding': ENCODING}))
+        job = json.loads(self.client.get(f'/jobs/{failed_job_id}').data)
+        self.assertEqual((job['status'], job['result']['retryable']), (FAILED, True))
+
+        response = self.client.get(f'/jobs/{job_id}/events')
+        events = [line[len('data: '):] for line in response.get_data(as_text=True).split('\n') if line.startswith('data: ')]
+        self.assertEqual([json.loads(event)['status'] for event in events], [DONE])
+
+        self.assertEqual(self.client.get('/jobs/job').status_code, 404)
+        self.assertEqual(self.client.get('/jobs/job/events').status_code, 404)
+        self.assertEqual(self.client.post('/jobs', data={'start': 600}).status_code, 400)
+        self.assertEqual(self.client.post('/jobs', data={'start': 600, 'end': 900, 'session_id': 'session',
+                                                         'audio': (io.BytesIO(AUDIO), 'audio.m4a')}).status_code, 404)
+
+    def test_event_streams_limit(self):
+        """
+        Make sure the event streams beyond the limit of the process are turned away, until one ends.
+        """
+
+        job_id = json.loads(self.create_job(AUDIO).data)['job_id']
+        with patch.object(Constants, 'JOB_EVENTS_MAX_DURATION', 0):
+            streams = [self.client.get(f'/jobs/{job_id}/events') for _ in range(Constants.JOB_EVENTS_MAX_STREAMS)]
+            self.assertEqual(self.client.get(f'/jobs/{job_id}/events').status_code, 429)
+            [stream.close() for stream in streams]
+            response = self.client.get(f'/jobs/{job_id}/events')
+            self.assertEqual(response.status_code, 200)
+            response.close()
+
+    def test_several_hosts(self):
+        """
+        Make sure the jobs fail loudly where the app may run on several hosts (Cloud Run), and the other routes work.
+        """
+
+        with patch.dict(os.environ, {'K_SERVICE': 'syncit-backend'}), \
+                patch('syncit.api.get_job_store', side_effect=HostLocalStoreError('Single host only.')):
+            self.assertEqual(self.client.get('/jobs/job').status_code, 501)
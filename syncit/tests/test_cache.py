@@ -0,0 +1,48 @@
+import unittest
+import time
+from syncit.cache import LRUCache
+
+# Setup Constants
+MAX_SIZE = 2
+TTL = 0.2
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    Test for the LRUCache class.
+
+    Attributes:
+        cache (LRUCache): Small cache with a short ttl.
+    """
+
+    def setUp(self):
+        """
+        Create a cache instance.
+        """
+
+        self.cache = LRUCache(MAX_SIZE, TTL)
+
+    def test_size_eviction(self):
+        """
+        Make sure the least recently used item is evicted, and hits and misses are counted.
+        """
+
+        self.cache.set('a', 'transcript a')
+        self.cache.set('b', 'transcript b')
+        self.assertEqual(self.cache.get('a'), 'transcript a')
+        self.cache.set('c', 'transcript c')
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('c'), 'transcript c')
+        self.assertEqual(self.cache.stats(), {'size': MAX_SIZE, 'hits': 2, 'misses': 1})
+
+    def test_ttl_eviction(self):
+        """
+        Make sure expired items are not returned.
+        """
+
+        self.cache.set('a', '')
+        self.assertEqual(self.cache.get('a'), '')
+        time.sleep(TTL * 1.5)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['size'], 0)
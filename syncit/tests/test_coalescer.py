@@ -0,0 +1,112 @@
+import unittest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from syncit.coalescer import RequestCoalescer
+
+# Setup Constants
+TOLERANCE = 0.05
+LINGER = 0.05
+RESPONSE_TIME = 0.1
+# Between the calls, so they arrive in order (well within the linger time)
+STAGGER = 0.005
+# The time each word is said in the audio
+ONSETS = {'elsa': 121.3, 'stood': 123.7, 'anna': 140}
+
+# test_same_window Constants
+WINDOW = (120, 125)
+CLOSE_WINDOW = (120.02, 124.99)
+
+# test_contained_window Constants
+LARGE_WINDOW = (120, 130)
+EMPTY_WINDOW = (121.5, 123)
+WORD_WINDOW = (123, 124)
+
+
+class TestRequestCoalescer(unittest.TestCase):
+    """
+    Test for the RequestCoalescer class, with a simulated speech to text.
+
+    Attributes:
+        coalescer (RequestCoalescer): The coalescer.
+        requests (list): The requests sent (start, end, hot words).
+    """
+
+    def setUp(self):
+        """
+        Create a coalescer.
+        """
+
+        self.coalescer = RequestCoalescer(TOLERANCE, LINGER)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def recognize(self, start, end, hot_words, stop):
+        """
+        Simulated speech to text, the transcript has the hot words said inside the window.
+        """
+
+        if(stop()):
+            return ''
+        with self.lock:
+            self.requests.append((start, end, sorted(hot_words)))
+        time.sleep(RESPONSE_TIME)
+        return ' '.join(word for word in hot_words if start <= ONSETS[word] < end)
+
+    def request_all(self, calls: list):
+        """
+        Sends the calls at once (in order).
+
+        Params:
+            calls (list of tuples): start, end and hot words of each call.
+
+        Returns:
+            list: The transcript of each call.
+        """
+
+        futures = []
+        with ThreadPoolExecutor(len(calls)) as executor:
+            for start, end, hot_words in calls:
+                futures.append(executor.submit(self.coalescer.request, start, end, hot_words, lambda: False, self.recognize))
+                time.sleep(STAGGER)
+            return [future.result() for future in futures]
+
+    def test_same_window(self):
+        """
+        Make sure calls for the same window (up to the tolerance) share one request with their hot words combined.
+        """
+
+        transcripts = self.request_all([(*WINDOW, ['elsa']), (*CLOSE_WINDOW, ['stood']), (*WINDOW, ['elsa'])])
+        self.assertEqual(self.requests, [(*WINDOW, ['elsa', 'stood'])])
+        self.assertEqual(transcripts, ['elsa stood'] * 3)
+        self.assertEqual(self.coalescer.stats(), {'sent': 1, 'joined': 2})
+
+    def test_contained_window(self):
+        """
+        Make sure a call inside a window in flight is answered by it only if its hot words aren't there.
+        """
+
+        transcripts = self.request_all([(*LARGE_WINDOW, ['elsa', 'stood']), (*EMPTY_WINDOW, ['anna']),
+                                        (*WORD_WINDOW, ['stood'])])
+        self.assertEqual(self.requests, [(*LARGE_WINDOW, ['anna', 'elsa', 'stood']), (*WORD_WINDOW, ['stood'])])
+        self.assertEqual(transcripts, ['elsa stood', 'elsa stood', 'stood'])
+
+    def test_stop(self):
+        """
+        Make sure a request is sent if only one caller stopped, and errors reach every caller.
+        """
+
+        transcript = self.coalescer.request(*WINDOW, ['elsa'], lambda: True, self.recognize)
+        self.assertEqual((transcript, self.requests), ('', []))
+        self.assertEqual(self.request_all([(*WINDOW, ['elsa'])]), ['elsa'])
+
+        def fail(start, end, hot_words, stop):
+            time.sleep(RESPONSE_TIME)
+            raise ConnectionError('Speech to text unavailable.')
+
+        sent_requests = self.coalescer.stats()['sent']
+        with ThreadPoolExecutor(2) as executor:
+            futures = [executor.submit(self.coalescer.request, *WINDOW, ['elsa'], lambda: False, fail) for _ in range(2)]
+            for future in futures:
+                self.assertRaises(ConnectionError, future.result)
+        self.assertEqual(self.coalescer.stats()['sent'], sent_requests + 1)
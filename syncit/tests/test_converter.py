@@ -1,15 +1,19 @@
 import base64
 import unittest
 import os
-from moviepy.editor import AudioFileClip
+import numpy as np
 from syncit.converter import Converter
 from syncit.constants import Constants
+from syncit.recognizers import PocketSphinxRecognizer
 from werkzeug.datastructures import FileStorage
 
 # Setup Constants
 SAMPLE_AUDIO = os.path.join(Constants.SAMPLES_FOLDER, 'audio.m4a')
 LANGUAGE = 'en'
 
+# test_decode_audio Constants
+SAMPLE_AUDIO_DURATION = 80
+
 # test_language_conversion Constants
 LANGUAGE_CODE = 'en-US'
 
@@ -18,6 +22,14 @@ WORD = 'elsa'
 START = 57
 END = 60
 
+# test_is_silent Constants
+SILENT_START = 0
+SILENT_END = 5
+
+# test_get_audio_window Constants
+WINDOW_START = 10
+WINDOW_END = 12.5
+
 
 class TestConverter(unittest.TestCase):
     """
@@ -27,10 +39,12 @@ class TestConverter(unittest.TestCase):
     def setUp(self):
         """
         Setup to run before each test.
+        Uses the offline speech to text backend, so the tests don't need the speech to text server.
         """
 
         audio = open(SAMPLE_AUDIO, 'rb')
         self.converter = Converter(FileStorage(audio), 'en')
+        self.converter.recognizer = PocketSphinxRecognizer()
         audio.close()
 
     def test_language_conversion(self):
@@ -41,15 +55,34 @@ class TestConverter(unittest.TestCase):
         self.assertEqual(self.converter.language, LANGUAGE_CODE,
                          'Check the language conversion.')
 
-    def test_repair_file(self):
+    def test_decode_audio(self):
+        """
+        Make sure the audio is decoded to mono 16 bit PCM in the speech to text sample rate.
+        """
+
+        self.assertEqual(self.converter.sample_rate, Constants.DECODED_AUDIO_SAMPLE_RATE)
+        self.assertEqual(self.converter.pcm.dtype, np.int16)
+        self.assertAlmostEqual(len(self.converter.pcm) / self.converter.sample_rate, SAMPLE_AUDIO_DURATION, places=1)
+
+    def test_get_audio_window(self):
         """
-        Make sure the output file is wav format that can be used in moviepy.
+        Make sure the window is sliced from the decoded buffer without copying it.
         """
 
-        audio_path = self.converter.audio
-        self.assertTrue(audio_path.endswith('.wav'))
-        # Make sure it can be loaded in moviepy
-        clip = AudioFileClip(audio_path)
+        window = self.converter.get_audio_window(WINDOW_START, WINDOW_END)
+        expected_samples = int(WINDOW_END * self.converter.sample_rate) - int(WINDOW_START * self.converter.sample_rate)
+        self.assertEqual(len(window), expected_samples)
+        self.assertTrue(np.shares_memory(np.asarray(window), self.converter.pcm))
+
+    def test_is_silent(self):
+        """
+        Make sure silent timespans are skipped (and counted), and timespans with speech are not.
+        """
+
+        self.assertTrue(self.converter.is_silent(SILENT_START, SILENT_END))
+        self.assertFalse(self.converter.is_silent(START, END))
+        self.assertEqual(self.converter.convert_audio_to_text(SILENT_START, SILENT_END, [WORD], lambda: False), '')
+        self.assertEqual(self.converter.skipped_windows, 2)
 
     def test_convert_audio_to_text(self):
         """
@@ -59,3 +92,12 @@ class TestConverter(unittest.TestCase):
         text = self.converter.convert_audio_to_text(START, END, [WORD], lambda: False)
         text = text.strip()
         self.assertEqual(text, WORD)
+
+    def test_convert_audio_to_words(self):
+        """
+        Check the convert_audio_to_words method gives the word with it's time in the audio.
+        """
+
+        words = self.converter.convert_audio_to_words(START, END, [WORD], lambda: False)
+        self.assertEqual([word['word'] for word in words], [WORD])
+        self.assertTrue(START <= words[0]['start'] < words[0]['end'] <= END)
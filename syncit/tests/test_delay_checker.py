@@ -0,0 +1,375 @@
+import unittest
+import threading
+import random
+import time
+import numpy as np
+from syncit.constants import Constants
+from syncit.delay_checker import DelayChecker
+from syncit.scheduler import SpeechToTextScheduler
+from syncit.sessions import Session
+from syncit.occurences_index import OccurencesIndex
+from syncit.resilience import SpeechToTextError, CircuitOpenError
+
+# Setup Constants
+SCHEDULER_MAX_IN_FLIGHT = 32
+
+# test_trim_section Constants
+SECTION_START = 120
+SECTION_END = 125
+# The time each hot word is said in the audio
+ONSETS = {'stood-af7502': 123.7, 'elsa-3cd1f0': 121.3}
+TRIMMED_STARTS = {'stood-af7502': 123.6, 'elsa-3cd1f0': 121.2}
+
+# test_trim_section_edges Constants
+FIRST_STEP_ONSETS = {'stood-af7502': 120.1, 'elsa-3cd1f0': 120.05}
+FIRST_STEP_TRIMMED_STARTS = {'stood-af7502': 120, 'elsa-3cd1f0': 120}
+MISSING_ONSETS = {'stood-af7502': 130, 'elsa-3cd1f0': 110}
+
+# test_verify_delay Constants
+LANGUAGE = 'en'
+DELAY = 2.5
+FALTY_DELAY = -4
+HOT_WORDS = [{'id': f'word-{index}', 'hot_word': 'word', 'start': 600 + index * 7.3, 'end': 601 + index * 7.3}
+             for index in range(20)]
+
+# test_check_delay_estimated Constants
+ESTIMATED_DELAY = 9
+# Words said all the time (e.g.: 'you'), they would be found at any delay
+COMMON_HOT_WORDS = [{'id': f'you-{index}', 'hot_word': 'you', 'start': 610 + index * 15.1, 'end': 611 + index * 15.1}
+                    for index in range(15)]
+COMMON_ONSETS = np.arange(0, Constants.DELAY_CHECKER_SECTIONS_TIME, 0.5)
+
+# test_check_delay_session Constants
+SESSION_FALTY_DELAYS = [{'delay': ESTIMATED_DELAY, 'rejections': Constants.SESSION_FALTY_DELAY_MIN_REJECTIONS,
+                         'rejected': time.time()}]
+
+# test_verify_delay_failures Constants
+# Requests of every other hot word fail, the others don't find it (not enough results to decide)
+FAILED_HOT_WORDS = {hot_word_item['id'] for hot_word_item in HOT_WORDS[::2]}
+
+# test_search_trimmed_delays Constants
+SECTIONS_AMOUNT = 24
+# The section with the right delay, the others have a wrong delay each
+RIGHT_SECTION = 3
+TRIM_LATENCY = 0.05
+VERIFY_LATENCY = 0.05
+
+# test_search_duplicate_delays Constants
+# Each section finds the falty delay, a bit off (within the tolerance)
+DUPLICATE_DELAYS = [FALTY_DELAY + offset for offset in (0, 0.02, -0.02, 0.04, 0.01)]
+
+# test_grouped_sections_equivalence Constants
+SEED = 1112
+RANDOM_HOT_WORDS_AMOUNT = 60
+
+
+def get_grouped_sections_reference(hot_words: list):
+    """
+    The previous implementation of DelayChecker.get_grouped_sections (loops over every section and hot word).
+    """
+
+    grouped_sections = []
+    for section_start in range(0, Constants.DELAY_CHECKER_SECTIONS_TIME, Constants.DIVIDED_SECTIONS_TIME):
+        section_end = min(section_start + Constants.DIVIDED_SECTIONS_TIME + Constants.ONE_WORD_AUDIO_TIME,
+                          Constants.DELAY_CHECKER_SECTIONS_TIME)
+        section_item = {'start': section_start, 'end': section_end, 'ids': []}
+        for hot_word_item in hot_words:
+            hot_word_start = hot_word_item['start'] % Constants.DELAY_CHECKER_SECTIONS_TIME - Constants.DELAY_RADIUS
+            hot_word_end = hot_word_start + (Constants.DELAY_RADIUS * 2) + (hot_word_item['end'] - hot_word_item['start'])
+            if(hot_word_start < section_end and hot_word_end > section_start):
+                section_item['ids'].append({'id': hot_word_item['id'], 'occurences': None})
+        if(len(section_item['ids']) > 0):
+            grouped_sections.append(section_item)
+    return grouped_sections
+
+
+def filter_grouped_sections_reference(grouped_sections: list):
+    """
+    The previous implementation of DelayChecker.filter_grouped_sections (list.count for every found id).
+    """
+
+    ids_to_remove = [item['id'] for section in grouped_sections for item in section['ids']
+                     if item['occurences'] > Constants.MAX_OCCURENCES_IN_ONE_SECTION]
+    ids_of_grouped_sections = [
+        item['id'] for section in grouped_sections for item in section['ids'] if item['occurences'] > 0]
+    ids_to_remove += [id for id in ids_of_grouped_sections if ids_of_grouped_sections.count(
+        id) > Constants.MAX_OCCURENCES_FOR_ONE_WORD]
+
+    filtered_grouped_results = []
+    for section in grouped_sections:
+        filtered_section = {'start': section['start'], 'end': section['end'], 'ids': []}
+        for item in section['ids']:
+            if(item['id'] not in ids_to_remove and item['occurences'] != 0):
+                filtered_section['ids'].append(item)
+        if(len(filtered_section['ids']) > 0):
+            filtered_grouped_results.append(filtered_section)
+    return filtered_grouped_results
+
+
+class TestDelayChecker(unittest.TestCase):
+    """
+    Test for the DelayChecker class, with the speech to text replaced by the known times of the hot words.
+
+    Attributes:
+        dc (DelayChecker): DelayChecker without audio or subtitles loaded.
+        stt_calls (int): Requests sent to the simulated speech to text.
+    """
+
+    def setUp(self):
+        """
+        Create a dc instance.
+        """
+
+        self.dc = DelayChecker.__new__(DelayChecker)
+        self.dc.stt = SpeechToTextScheduler(
+            SCHEDULER_MAX_IN_FLIGHT, SCHEDULER_MAX_IN_FLIGHT).create_request_scope()
+        self.dc.trim_stt_calls = {}
+        self.dc.get_hot_words_occurences = self.get_hot_words_occurences
+        self.dc.falty_delays = []
+        self.dc.session = None
+        self.dc.progress_callback = None
+        self.stt_calls = 0
+        self.lock = threading.Lock()
+        self.onsets = dict(ONSETS)
+
+    def get_hot_words_occurences(self, start, end, ids, results, stop=lambda: False, exact=False):
+        """
+        Simulated DelayChecker.get_hot_words_occurences, a hot word is found if it's said inside the timespan.
+        A stopped request is not sent (not counted).
+        """
+
+        if(stop()):
+            result = {'start': start, 'end': end, 'ids': [{'id': id, 'occurences': 0} for id in ids]}
+            results.append(result)
+            return result
+        with self.lock:
+            self.stt_calls += 1
+        timespan_result = [{'id': id, 'occurences': int(np.sum((start <= np.atleast_1d(self.onsets[id]))
+                                                               & (np.atleast_1d(self.onsets[id]) < end)))} for id in ids]
+        result = {'start': start, 'end': end, 'ids': timespan_result}
+        results.append(result)
+        return result
+
+    def trim(self, mode: str):
+        """
+        Trims the section with both hot words.
+
+        Returns:
+            dict: The trimmed start time of each id.
+        """
+
+        trimmed_results = self.dc.trim_section(SECTION_START, SECTION_END, list(ONSETS), mode)
+        if(trimmed_results is None):
+            return None
+        return {trimmed_result['id']: round(trimmed_result['start'], 3) for trimmed_result in trimmed_results}
+
+    def test_trim_section(self):
+        """
+        Make sure both trim modes find the step the hot words start in, and bisect uses fewer requests.
+        """
+
+        self.assertEqual(self.trim('sweep'), TRIMMED_STARTS)
+        sweep_calls = self.stt_calls
+        self.assertLessEqual(self.dc.trim_stt_calls['sweep'], sweep_calls)
+
+        self.stt_calls = 0
+        self.assertEqual(self.trim('bisect'), TRIMMED_STARTS)
+        bisect_calls = self.stt_calls
+
+        self.assertLess(bisect_calls, sweep_calls)
+        self.assertEqual(self.dc.trim_stt_calls['bisect'], bisect_calls)
+
+    def test_trim_section_edges(self):
+        """
+        Make sure a hot word said in the first step is found, and hot words not said in the section are not.
+        """
+
+        for mode in ('sweep', 'bisect'):
+            self.onsets = dict(FIRST_STEP_ONSETS)
+            self.assertEqual(self.trim(mode), FIRST_STEP_TRIMMED_STARTS, mode)
+            self.onsets = dict(MISSING_ONSETS)
+            self.assertIsNone(self.trim(mode), mode)
+
+    def test_trim_section_word_timestamps(self):
+        """
+        Make sure the word_timestamps mode reads the start of the hot words from one request.
+        """
+
+        self.dc.hot_words = [{'id': id, 'hot_word': id.split('-')[0]} for id in ONSETS]
+        words = [{'word': id.split('-')[0], 'start': onset, 'end': onset + 0.4, 'confidence': 0.9}
+                 for id, onset in ONSETS.items()]
+        self.dc.converter = type('Converter', (), {'convert_audio_to_words': lambda start, end, hot_words, stop: words})
+
+        trimmed_results = self.dc.trim_section(SECTION_START, SECTION_END, list(ONSETS), 'word_timestamps')
+        self.assertEqual({trimmed_result['id']: trimmed_result['start'] for trimmed_result in trimmed_results}, ONSETS)
+        self.assertEqual(self.dc.trim_stt_calls['word_timestamps'], 1)
+
+    def test_verify_delay(self):
+        """
+        Make sure verify_delay accepts the real delay and adds a wrong one to the falty delays.
+        """
+
+        self.dc.hot_words = HOT_WORDS
+        self.dc.audio_language = LANGUAGE
+        self.dc.sp = type('SubtitleParser', (), {'subtitles_language': LANGUAGE})
+        self.onsets = {hot_word_item['id']: hot_word_item['start'] % Constants.DELAY_CHECKER_SECTIONS_TIME + DELAY + 0.3
+                       for hot_word_item in HOT_WORDS}
+
+        self.assertTrue(self.dc.verify_delay(DELAY))
+        self.assertFalse(self.dc.verify_delay(FALTY_DELAY))
+        self.assertEqual(self.dc.falty_delays, [FALTY_DELAY])
+
+    def test_verify_delay_failures(self):
+        """
+        Make sure failed requests are not recorded as missing hot words (in the index or as a falty delay),
+        and an open circuit stops the check.
+        """
+
+        def convert_audio_to_text(start, end, hot_words, stop):
+            if(any(abs(start - (hot_word_item['start'] % Constants.DELAY_CHECKER_SECTIONS_TIME + DELAY)) < 0.01
+                   for hot_word_item in HOT_WORDS if hot_word_item['id'] in FAILED_HOT_WORDS)):
+                raise SpeechToTextError('Simulated failure.')
+            return ''
+
+        del self.dc.get_hot_words_occurences
+        self.dc.occurences_index = OccurencesIndex()
+        self.dc.converter = type('Converter', (), {'convert_audio_to_text': staticmethod(convert_audio_to_text)})
+        self.dc.hot_words = HOT_WORDS[:Constants.VERIFY_DELAY_SAMPLES_TO_CHECK]
+        self.dc.audio_language = LANGUAGE
+        self.dc.sp = type('SubtitleParser', (), {'subtitles_language': LANGUAGE})
+
+        self.assertFalse(self.dc.verify_delay(DELAY))
+        self.assertEqual(self.dc.falty_delays, [])
+        for hot_word_item in self.dc.hot_words:
+            start = hot_word_item['start'] % Constants.DELAY_CHECKER_SECTIONS_TIME + DELAY
+            occurences = self.dc.occurences_index.get(hot_word_item['id'], start, start + Constants.ONE_WORD_AUDIO_TIME)
+            if(hot_word_item['id'] in FAILED_HOT_WORDS):
+                self.assertIsNone(occurences)
+            else:
+                self.assertEqual(occurences, 0)
+
+        def open_circuit(start, end, hot_words, stop):
+            raise CircuitOpenError('Simulated open circuit.')
+
+        self.dc.converter.convert_audio_to_text = staticmethod(open_circuit)
+        self.dc.occurences_index = OccurencesIndex()
+        with self.assertRaises(CircuitOpenError):
+            self.dc.verify_delay(DELAY)
+        self.assertEqual(self.dc.falty_delays, [])
+
+    def test_check_delay_estimated(self):
+        """
+        Make sure a wrong estimated delay is verified with the filtered hot words (without the common words),
+        and the delay is then found by the trimming.
+        """
+
+        self.dc.hot_words = HOT_WORDS[:Constants.VERIFY_DELAY_SAMPLES_TO_CHECK] + COMMON_HOT_WORDS
+        self.dc.audio_language = LANGUAGE
+        self.dc.sp = type('SubtitleParser', (), {'subtitles_language': LANGUAGE})
+        self.dc.estimate_delays = lambda: [{'delay': ESTIMATED_DELAY, 'confidence': 1}]
+        self.onsets = {hot_word_item['id']: hot_word_item['start'] % Constants.DELAY_CHECKER_SECTIONS_TIME + DELAY + 0.3
+                       for hot_word_item in HOT_WORDS}
+        self.onsets.update({hot_word_item['id']: COMMON_ONSETS for hot_word_item in COMMON_HOT_WORDS})
+
+        delay = self.dc.check_delay()
+        self.assertEqual(self.dc.falty_delays[0], ESTIMATED_DELAY)
+        self.assertAlmostEqual(delay, DELAY, delta=Constants.TRIM_SECTION_STEP * 2)
+
+    def test_check_delay_session(self):
+        """
+        Make sure the last delay of the session is verified first (without trimming),
+        and the delays already falty in the session are not verified again.
+        """
+
+        self.dc.hot_words = HOT_WORDS[:Constants.VERIFY_DELAY_SAMPLES_TO_CHECK]
+        self.dc.audio_language = LANGUAGE
+        self.dc.sp = type('SubtitleParser', (), {'subtitles_language': LANGUAGE})
+        self.dc.estimate_delays = lambda: [{'delay': ESTIMATED_DELAY, 'confidence': 1}]
+        self.onsets = {hot_word_item['id']: hot_word_item['start'] % Constants.DELAY_CHECKER_SECTIONS_TIME + DELAY + 0.3
+                       for hot_word_item in HOT_WORDS}
+
+        self.dc.session = Session('session', b'', LANGUAGE, LANGUAGE, SESSION_FALTY_DELAYS, DELAY)
+        self.assertEqual(self.dc.check_delay(), DELAY)
+        self.assertEqual(self.dc.trim_stt_calls, {})
+
+        self.dc.session.last_delay = None
+        delay = self.dc.check_delay()
+        self.assertAlmostEqual(delay, DELAY, delta=Constants.TRIM_SECTION_STEP * 2)
+        self.assertEqual(self.dc.falty_delays, [])
+
+    def test_search_trimmed_delays(self):
+        """
+        Make sure the sections are trimmed and their delays verified at once, the first verified delay cancels
+        the rest of the work, and the search stops after the maximum delays to verify.
+        """
+
+        trimmed = []
+
+        def get_section_delays(section, cancelled):
+            trimmed.append(section['index'])
+            time.sleep(TRIM_LATENCY)
+            return [DELAY] if section['index'] == RIGHT_SECTION else [FALTY_DELAY - section['index']]
+
+        def verify_delay(delay, cancelled):
+            time.sleep(VERIFY_LATENCY)
+            if(delay != DELAY):
+                self.dc.falty_delays.append(delay)
+            return delay == DELAY
+
+        self.dc.get_section_delays = get_section_delays
+        self.dc.verify_delay = verify_delay
+        sections = [{'index': index} for index in range(SECTIONS_AMOUNT)]
+
+        started = time.monotonic()
+        self.assertEqual(self.dc.search_trimmed_delays(sections, 0), DELAY)
+        # One section at a time takes (RIGHT_SECTION + 1) * (TRIM_LATENCY + VERIFY_LATENCY)
+        self.assertLess(time.monotonic() - started, (RIGHT_SECTION + 1) * (TRIM_LATENCY + VERIFY_LATENCY) / 2)
+        self.assertLess(len(trimmed), SECTIONS_AMOUNT)
+
+        sections = [section for section in sections if section['index'] != RIGHT_SECTION] * 2
+        self.dc.falty_delays = []
+        self.assertIsNone(self.dc.search_trimmed_delays(sections, 0))
+        self.assertLessEqual(len(self.dc.falty_delays), Constants.MAXIMUM_DELAYS_TO_VERIFY + 1)
+
+    def test_search_duplicate_delays(self):
+        """
+        Make sure a delay found by several sections is verified once, even while its verification is running.
+        """
+
+        verified = []
+
+        def verify_delay(delay, cancelled):
+            verified.append(delay)
+            time.sleep(VERIFY_LATENCY)
+            self.dc.falty_delays.append(delay)
+            return False
+
+        self.dc.get_section_delays = lambda section, cancelled: [section['delay']]
+        self.dc.verify_delay = verify_delay
+        sections = [{'delay': delay} for delay in DUPLICATE_DELAYS] + [{'delay': DELAY}]
+
+        self.assertIsNone(self.dc.search_trimmed_delays(sections, 0))
+        self.assertEqual(len(verified), 2)
+        self.assertIn(DELAY, verified)
+
+    def test_grouped_sections_equivalence(self):
+        """
+        Make sure get_grouped_sections and filter_grouped_sections return what the previous implementations returned,
+        on random hot words and occurences.
+        """
+
+        rng = random.Random(SEED)
+        for _ in range(20):
+            self.dc.hot_words = []
+            for index in range(RANDOM_HOT_WORDS_AMOUNT):
+                start = rng.choice([rng.uniform(0, 900), rng.randint(0, 900)])
+                self.dc.hot_words.append({'id': f'word-{index}', 'start': start, 'end': start + rng.uniform(0.5, 4)})
+
+            grouped_sections = self.dc.get_grouped_sections()
+            self.assertEqual(grouped_sections, get_grouped_sections_reference(self.dc.hot_words))
+
+            for section in grouped_sections:
+                for item in section['ids']:
+                    item['occurences'] = rng.choice([0, 0, 0, 1, 1, 2, 3])
+            self.assertEqual(self.dc.filter_grouped_sections(grouped_sections),
+                             filter_grouped_sections_reference(grouped_sections))
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from syncit.constants import Constants
+from syncit.voice_activity import get_voice_activity
+from syncit.delay_estimator import estimate_delays
+
+# Setup Constants
+SAMPLE_RATE = 16000
+DURATION = 120
+SEED = 1112
+
+# test_estimate_delays Constants
+DELAY = -7.35
+CUES_AMOUNT = 30
+
+
+class TestDelayEstimator(unittest.TestCase):
+    """
+    Test for the delay estimation, with synthetic audio where speech is loud noise said exactly when the cues are shown (+ delay).
+
+    Attributes:
+        cues (list of tuples): (start, end) of each cue.
+        pcm (np.ndarray): The synthetic audio.
+    """
+
+    def setUp(self):
+        """
+        Creates the cues and the audio.
+        """
+
+        random = np.random.default_rng(SEED)
+        starts = np.sort(random.uniform(-Constants.DELAY_RADIUS, DURATION + Constants.DELAY_RADIUS, CUES_AMOUNT))
+        self.cues = [(start, start + random.uniform(0.8, 3)) for start in starts]
+
+        # Quiet background, with speech bursts when the cues are shown (+ delay)
+        self.pcm = random.normal(0, 30, DURATION * SAMPLE_RATE)
+        for cue_start, cue_end in self.cues:
+            first = max(int((cue_start + DELAY) * SAMPLE_RATE), 0)
+            last = max(int((cue_end + DELAY) * SAMPLE_RATE), 0)
+            self.pcm[first:last] += random.normal(0, 3000, len(self.pcm[first:last]))
+        self.pcm = self.pcm.astype(np.int16)
+
+    def test_get_voice_activity(self):
+        """
+        Make sure the envelope is high in the speech bursts and low elsewhere.
+        """
+
+        voice_activity = get_voice_activity(self.pcm, SAMPLE_RATE)
+        self.assertEqual(len(voice_activity), int(DURATION / Constants.VOICE_ACTIVITY_FRAME_TIME))
+
+        cue_start, cue_end = [cue for cue in self.cues if cue[0] + DELAY > 0][0]
+        middle = ((cue_start + cue_end) / 2 + DELAY) / Constants.VOICE_ACTIVITY_FRAME_TIME
+        self.assertEqual(voice_activity[int(middle)], 1)
+        self.assertLess(np.median(voice_activity), 0.5)
+
+    def test_estimate_delays(self):
+        """
+        Make sure the best candidate is the delay of the audio.
+        """
+
+        voice_activity = get_voice_activity(self.pcm, SAMPLE_RATE)
+        candidates = estimate_delays(voice_activity, self.cues)
+
+        self.assertEqual(len(candidates), Constants.DELAY_ESTIMATION_CANDIDATES)
+        self.assertAlmostEqual(candidates[0]['delay'], DELAY, delta=Constants.VOICE_ACTIVITY_FRAME_TIME)
+        self.assertGreater(candidates[0]['confidence'], Constants.DELAY_ESTIMATION_MIN_CONFIDENCE)
@@ -0,0 +1,92 @@
+import unittest
+import threading
+import time
+from syncit.hedging import LatencyTracker, Hedger
+
+# Setup Constants
+PERCENTILE = 90
+MIN_DELAY = 0.01
+MAX_RATIO = 0.5
+MAX_TOKENS = 2
+MAX_WORKERS = 4
+SAMPLES = 10
+USUAL_LATENCY = 0.02
+SLOW_LATENCY = 1
+
+# test_budget Constants
+REQUESTS = 100
+
+
+class TestHedger(unittest.TestCase):
+    """
+    Test for the Hedger class, with simulated requests.
+
+    Attributes:
+        hedger (Hedger): Hedger with the usual latencies tracked.
+        calls (int): Requests sent (with the hedges).
+    """
+
+    def setUp(self):
+        """
+        Create a hedger with the usual latencies tracked.
+        """
+
+        tracker = LatencyTracker(SAMPLES, SAMPLES)
+        for _ in range(SAMPLES):
+            tracker.add(USUAL_LATENCY)
+        self.hedger = Hedger(PERCENTILE, MIN_DELAY, MAX_RATIO, MAX_TOKENS, tracker, MAX_WORKERS)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def send(self, latencies: list):
+        """
+        Simulated request, each call takes the next latency and answers with its number.
+        """
+
+        with self.lock:
+            call = self.calls
+            self.calls += 1
+        time.sleep(latencies[call])
+        return call
+
+    def test_hedge(self):
+        """
+        Make sure a slow request is hedged and the hedge answers, and a fast one is not.
+        """
+
+        self.hedger.tokens = 1
+        started = time.monotonic()
+        self.assertEqual(self.hedger.call(lambda: self.send([SLOW_LATENCY, USUAL_LATENCY]), lambda response: True), 1)
+        self.assertLess(time.monotonic() - started, SLOW_LATENCY / 2)
+        self.assertEqual(self.hedger.stats(), {'requests': 1, 'hedges_sent': 1, 'hedges_won': 1})
+
+        self.calls = 0
+        self.assertEqual(self.hedger.call(lambda: self.send([MIN_DELAY / 2]), lambda response: True), 0)
+        self.assertEqual(self.hedger.stats()['hedges_sent'], 1)
+
+    def test_failed_hedge(self):
+        """
+        Make sure a failed hedge waits for the request.
+        """
+
+        self.hedger.tokens = 1
+        self.assertEqual(self.hedger.call(lambda: self.send([USUAL_LATENCY * 10, USUAL_LATENCY]),
+                                          lambda response: response == 0), 0)
+        self.assertEqual(self.hedger.stats(), {'requests': 1, 'hedges_sent': 1, 'hedges_won': 0})
+
+    def test_budget(self):
+        """
+        Make sure a long calm doesn't save up a burst of hedges beyond the bucket, and the bucket refills
+        at the ratio of the requests.
+        """
+
+        for _ in range(REQUESTS):
+            self.hedger.count_request()
+        hedges = [self.hedger.take_hedge() for _ in range(REQUESTS)]
+        self.assertEqual(hedges, [True] * MAX_TOKENS + [False] * (REQUESTS - MAX_TOKENS))
+
+        hedges = []
+        for _ in range(REQUESTS):
+            self.hedger.count_request()
+            hedges.append(self.hedger.take_hedge())
+        self.assertEqual(sum(hedges), int(REQUESTS * MAX_RATIO))
@@ -1,5 +1,7 @@
 import unittest
-from syncit.helpers import clean_text, convert_subs_time
+from unittest.mock import patch
+from syncit.constants import Constants
+from syncit.helpers import clean_text, convert_subs_time, decode_subtitles, detect_encoding, detect_language
 
 
 class TestChecker(unittest.TestCase):
@@ -56,3 +58,35 @@ class TestChecker(unittest.TestCase):
         sample_time = '02:20:06,181'
         time = convert_subs_time(sample_time)
         self.assertEqual(time, 8406.181)
+
+    def test_detect_encoding(self):
+        """
+        Test for detect_encoding and decode_subtitles, also when the first non ascii character is after the bytes read.
+        """
+
+        text = 'Où êtes-vous? Très bien.\n' * 100
+        (encoding, confidence) = detect_encoding(text.encode('utf-8-sig'))
+        self.assertEqual(encoding.lower(), 'utf-8-sig')
+        self.assertGreater(confidence, 0.9)
+
+        late_text = 'Hello there\n' * (Constants.ENCODING_DETECTION_MAX_BYTES // 10) + text
+        (decoded_text, encoding, confidence) = decode_subtitles(late_text.encode('utf-8'))
+        self.assertEqual(decoded_text, late_text)
+
+        # Still not decodable after detecting again, the bytes are replaced
+        with patch('syncit.helpers.detect_encoding', return_value=('ascii', 1.0)):
+            (decoded_text, encoding, confidence) = decode_subtitles(late_text.encode('utf-8'))
+        self.assertEqual(decoded_text.replace('\ufffd', ''), late_text.encode('ascii', errors='ignore').decode('ascii'))
+        self.assertEqual(confidence, 0.0)
+
+    def test_detect_language(self):
+        """
+        Test for detect_language, the same texts always get the same result, and no texts get no language.
+        """
+
+        texts = ['where are you going', None, 'i am going home now', 'the princess is trapped in the snow'] * 100
+        (language, probability) = detect_language(texts)
+        self.assertEqual(language, 'en')
+        self.assertEqual(detect_language(texts), (language, probability))
+
+        self.assertEqual(detect_language([None, None]), (None, 0.0))
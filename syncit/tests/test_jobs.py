@@ -0,0 +1,108 @@
+import unittest
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+from syncit.jobs import JobStore, JobManager, QUEUED, RUNNING, DONE, FAILED
+
+# Setup Constants
+WORKERS = 2
+TIMEOUT = 5
+PARAMS = {'start': 600, 'end': 900, 'audio_language': 'en', 'subtitles_language': 'en', 'session_id': None}
+AUDIO = b'audio'
+SUBTITLES = b'subtitles'
+
+# test_manager Constants
+DELAY = 2.5
+ENCODING = 'utf-8'
+PROGRESS = ('trimming', 3, 10)
+
+
+class FakeDelayChecker():
+    """
+    DelayChecker that reports progress, and finds DELAY (or fails if the audio is empty).
+    """
+
+    def __init__(self, audio_file, start, end, subtitles_file, audio_language, subtitles_language,
+                 session=None, progress_callback=None):
+        self.audio = audio_file.read()
+        self.progress_callback = progress_callback
+        self.falty_delays = []
+        self.sp = type('SubtitleParser', (), {'encoding': ENCODING})
+
+    def check_delay(self):
+        if(self.audio == b''):
+            raise Exception('Unable to decode audio.')
+        self.progress_callback(*PROGRESS)
+        return DELAY
+
+
+class TestJobs(unittest.TestCase):
+    """
+    Test for the JobStore and JobManager classes.
+
+    Attributes:
+        directory (TemporaryDirectory): Directory of the database.
+        store (JobStore): Store in the temporary directory.
+    """
+
+    def setUp(self):
+        """
+        Create a store in a temporary directory.
+        """
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.directory.name, 'jobs.sqlite3'))
+
+    def tearDown(self):
+        """
+        Delete the database.
+        """
+
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_claim(self):
+        """
+        Make sure the jobs are claimed once, oldest first, and their files dropped when finished.
+        """
+
+        first_id = self.store.create(PARAMS, AUDIO, SUBTITLES)
+        second_id = self.store.create(PARAMS, AUDIO, SUBTITLES)
+        self.assertEqual(self.store.get(first_id), {'id': first_id, 'status': QUEUED, 'progress': None, 'result': None})
+
+        self.assertEqual(self.store.claim(), (first_id, PARAMS, AUDIO, SUBTITLES))
+        self.assertEqual(self.store.claim()[0], second_id)
+        self.assertIsNone(self.store.claim())
+        self.assertEqual(self.store.get(first_id)['status'], RUNNING)
+
+        self.store.finish(first_id, DONE, {})
+        self.assertEqual(self.store.get(first_id)['status'], DONE)
+        self.assertEqual(self.store.connection.execute('SELECT audio FROM jobs WHERE id = ?', (first_id,)).fetchone(), (None,))
+        self.assertIsNone(self.store.get('missing'))
+
+    def test_manager(self):
+        """
+        Make sure the manager runs the queued jobs, reports their progress and result, and fails the broken ones.
+        """
+
+        finished = threading.Event()
+        finish = self.store.finish
+
+        def finish_and_notify(*args):
+            finish(*args)
+            if(self.store.connection.execute('SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)).fetchone()[0] == 0):
+                finished.set()
+
+        self.store.finish = finish_and_notify
+        job_id = self.store.create(PARAMS, AUDIO, SUBTITLES)
+        broken_job_id = self.store.create(PARAMS, b'', SUBTITLES)
+        with patch('syncit.jobs.DelayChecker', FakeDelayChecker):
+            manager = JobManager(self.store, WORKERS)
+            manager.notify()
+            self.assertTrue(finished.wait(TIMEOUT))
+            manager.shutdown()
+
+        self.assertEqual(self.store.get(job_id), {'id': job_id, 'status': DONE, 'result': {'delay': DELAY, 'encoding': ENCODING},
+                                                  'progress': dict(zip(('stage', 'done', 'total'), PROGRESS))})
+        self.assertEqual(self.store.get(broken_job_id)['status'], FAILED)
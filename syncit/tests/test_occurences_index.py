@@ -0,0 +1,85 @@
+import unittest
+from syncit.occurences_index import OccurencesIndex
+
+# Setup Constants
+ID = 'elsa-3cd1f0'
+OTHER_ID = 'stood-af7502'
+
+# test_negatives Constants
+NEGATIVE_WINDOWS = [(10, 12), (11, 15), (20, 21), (10.5, 11.5)]
+INSIDE_NEGATIVES = [(10, 12), (11.2, 15), (12.4, 14.9), (20.2, 20.8)]
+# (11, 21) is covered by two windows together, but the hot word can be on the border between them
+OUTSIDE_NEGATIVES = [(9.8, 12), (14, 16), (11, 21), (19, 20.5)]
+
+# test_positives Constants
+POSITIVE_WINDOWS = [(30, 35, 2), (31.2, 32, 1), (40, 45, 1)]
+CONTAINING_POSITIVES = [((31.2, 32), 1), ((30.4, 34.6), 1), ((39, 46), 1), ((30, 35), 1)]
+OUTSIDE_POSITIVES = [(31.4, 35), (30, 31.9), (41, 45)]
+# Only the windows added exactly (30-35 was replaced by the smaller 31.2-32, it has at least 1 occurence, not exactly 1)
+EXACT_POSITIVES = [((31.2, 32), 1), ((40, 45), 1)]
+NOT_EXACT_POSITIVES = [(30, 35), (30.4, 34.6), (39, 46)]
+
+
+class TestOccurencesIndex(unittest.TestCase):
+    """
+    Test for the OccurencesIndex class.
+
+    Attributes:
+        index (OccurencesIndex): Empty index.
+    """
+
+    def setUp(self):
+        """
+        Create an index instance.
+        """
+
+        self.index = OccurencesIndex()
+
+    def test_negatives(self):
+        """
+        Make sure windows inside a window without the hot word have no occurences, and other windows are unknown.
+        """
+
+        for start, end in NEGATIVE_WINDOWS:
+            self.index.add(ID, start, end, 0)
+
+        for start, end in INSIDE_NEGATIVES:
+            self.assertEqual(self.index.get(ID, start, end), 0, f'Window {start}-{end}')
+
+        for start, end in OUTSIDE_NEGATIVES:
+            self.assertIsNone(self.index.get(ID, start, end), f'Window {start}-{end}')
+
+        self.assertIsNone(self.index.get(OTHER_ID, 10, 12))
+
+    def test_positives(self):
+        """
+        Make sure windows containing a window with the hot word are answered, and other windows are unknown.
+        """
+
+        for start, end, occurences in POSITIVE_WINDOWS:
+            self.index.add(ID, start, end, occurences)
+
+        for (start, end), occurences in CONTAINING_POSITIVES:
+            self.assertEqual(self.index.get(ID, start, end), occurences, f'Window {start}-{end}')
+
+        for start, end in OUTSIDE_POSITIVES:
+            self.assertIsNone(self.index.get(ID, start, end), f'Window {start}-{end}')
+
+    def test_exact(self):
+        """
+        Make sure exact lookups are answered only by windows without the hot word and the exact windows with it.
+        """
+
+        for start, end, occurences in POSITIVE_WINDOWS:
+            self.index.add(ID, start, end, occurences)
+        for start, end in NEGATIVE_WINDOWS:
+            self.index.add(ID, start, end, 0)
+
+        for (start, end), occurences in EXACT_POSITIVES:
+            self.assertEqual(self.index.get(ID, start, end, exact=True), occurences, f'Window {start}-{end}')
+
+        for start, end in NOT_EXACT_POSITIVES:
+            self.assertIsNone(self.index.get(ID, start, end, exact=True), f'Window {start}-{end}')
+
+        start, end = INSIDE_NEGATIVES[0]
+        self.assertEqual(self.index.get(ID, start, end, exact=True), 0)
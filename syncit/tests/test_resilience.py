@@ -0,0 +1,153 @@
+import unittest
+import time
+from syncit.constants import Constants
+from syncit.resilience import ConcurrencyLimiter, CircuitBreaker, CircuitOpenError, get_backoff_delay
+
+# Setup Constants
+INITIAL_LIMIT = 8
+MIN_LIMIT = 2
+MAX_LIMIT = 10
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 0.05
+
+# test_backoff Constants
+ATTEMPTS = 8
+SAMPLES = 50
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    """
+    Test for the ConcurrencyLimiter class.
+
+    Attributes:
+        limiter (ConcurrencyLimiter): Limiter at the initial limit.
+    """
+
+    def setUp(self):
+        """
+        Create a limiter.
+        """
+
+        self.limiter = ConcurrencyLimiter(INITIAL_LIMIT, MIN_LIMIT, MAX_LIMIT)
+
+    def test_increase(self):
+        """
+        Make sure the limit grows by about one for every limit successful requests, up to the maximum.
+        """
+
+        for _ in range(INITIAL_LIMIT):
+            self.limiter.release(self.limiter.acquire(), False)
+        self.assertAlmostEqual(self.limiter.limit, INITIAL_LIMIT + 1, delta=0.1)
+
+        for _ in range(MAX_LIMIT * 10):
+            self.limiter.release(self.limiter.acquire(), False)
+        self.assertEqual(self.limiter.limit, MAX_LIMIT)
+        self.assertEqual(self.limiter.in_flight, 0)
+
+    def test_decrease(self):
+        """
+        Make sure a burst of congested requests halves the limit once, and it doesn't go under the minimum.
+        """
+
+        burst = [self.limiter.acquire() for _ in range(INITIAL_LIMIT)]
+        for sent in burst:
+            self.limiter.release(sent, True)
+        self.assertEqual(self.limiter.limit, INITIAL_LIMIT * Constants.STT_LIMIT_DECREASE)
+
+        for _ in range(INITIAL_LIMIT):
+            self.limiter.release(self.limiter.acquire(), True)
+        self.assertEqual(self.limiter.limit, MIN_LIMIT)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test for the CircuitBreaker class.
+
+    Attributes:
+        circuit_breaker (CircuitBreaker): Closed circuit breaker.
+    """
+
+    def setUp(self):
+        """
+        Create a circuit breaker.
+        """
+
+        self.circuit_breaker = CircuitBreaker(FAILURE_THRESHOLD, RESET_TIMEOUT)
+
+    def open(self):
+        """
+        Fails requests until the circuit opens.
+        """
+
+        for _ in range(FAILURE_THRESHOLD):
+            self.circuit_breaker.before_call()
+            self.circuit_breaker.record_failure()
+
+    def test_open(self):
+        """
+        Make sure the circuit opens after the failures in a row, and a success resets the count.
+        """
+
+        for _ in range(FAILURE_THRESHOLD - 1):
+            self.circuit_breaker.record_failure()
+        self.circuit_breaker.record_success()
+        self.circuit_breaker.record_failure()
+        self.circuit_breaker.before_call()
+        self.circuit_breaker.record_success()
+
+        self.open()
+        with self.assertRaises(CircuitOpenError):
+            self.circuit_breaker.before_call()
+
+    def test_half_open(self):
+        """
+        Make sure one trial request is let through after the timeout, its failure opens the circuit again
+        and its success closes it.
+        """
+
+        self.open()
+        time.sleep(RESET_TIMEOUT)
+        self.circuit_breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.circuit_breaker.before_call()
+        self.circuit_breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.circuit_breaker.before_call()
+
+        time.sleep(RESET_TIMEOUT)
+        self.circuit_breaker.before_call()
+        self.circuit_breaker.record_success()
+        for _ in range(FAILURE_THRESHOLD):
+            self.circuit_breaker.before_call()
+
+    def test_end_trial(self):
+        """
+        Make sure a trial ended without a result (throttled) lets the next request be the trial.
+        """
+
+        self.assertFalse(self.circuit_breaker.before_call())
+        self.open()
+        time.sleep(RESET_TIMEOUT)
+        self.assertTrue(self.circuit_breaker.before_call())
+        self.circuit_breaker.end_trial()
+        self.assertTrue(self.circuit_breaker.before_call())
+        with self.assertRaises(CircuitOpenError):
+            self.circuit_breaker.before_call()
+
+
+
+class TestBackoff(unittest.TestCase):
+    """
+    Test for get_backoff_delay.
+    """
+
+    def test_backoff(self):
+        """
+        Make sure the delays are jittered up to the exponential bound, and capped.
+        """
+
+        for attempt in range(1, ATTEMPTS + 1):
+            bound = min(Constants.STT_BACKOFF_MAX, Constants.STT_BACKOFF_BASE * 2 ** (attempt - 1))
+            delays = [get_backoff_delay(attempt) for _ in range(SAMPLES)]
+            self.assertTrue(all(0 <= delay <= bound for delay in delays))
+            self.assertGreater(len(set(delays)), 1)
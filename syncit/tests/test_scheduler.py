@@ -0,0 +1,82 @@
+import unittest
+import threading
+import time
+from concurrent.futures import wait
+from syncit.scheduler import SpeechToTextScheduler
+
+# Setup Constants
+MAX_IN_FLIGHT = 4
+MAX_IN_FLIGHT_PER_REQUEST = 2
+CALLS = 10
+CALL_DURATION = 0.05
+
+
+class TestScheduler(unittest.TestCase):
+    """
+    Test for the SpeechToTextScheduler class.
+
+    Attributes:
+        scheduler (SpeechToTextScheduler): Scheduler with small limits.
+        in_flight (int): Calls currently running.
+        peak_in_flight (int): Most calls that ran together.
+    """
+
+    def setUp(self):
+        """
+        Create a scheduler instance.
+        """
+
+        self.scheduler = SpeechToTextScheduler(MAX_IN_FLIGHT, MAX_IN_FLIGHT_PER_REQUEST)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def call(self, index: int):
+        """
+        Simulates a speech to text call.
+        """
+
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(CALL_DURATION)
+        with self.lock:
+            self.in_flight -= 1
+        return index
+
+    def test_per_request_limit(self):
+        """
+        Make sure one scope never has more calls in flight than it's limit, and results keep their futures.
+        """
+
+        scope = self.scheduler.create_request_scope()
+        futures = [scope.submit(self.call, index) for index in range(CALLS)]
+        wait(futures)
+
+        self.assertEqual([future.result() for future in futures], list(range(CALLS)))
+        self.assertEqual(self.peak_in_flight, MAX_IN_FLIGHT_PER_REQUEST)
+
+    def test_global_limit(self):
+        """
+        Make sure all the scopes together never pass the global limit.
+        """
+
+        scopes = [self.scheduler.create_request_scope() for _ in range(3)]
+        futures = [scope.submit(self.call, index) for scope in scopes for index in range(CALLS)]
+        wait(futures)
+
+        self.assertEqual(self.peak_in_flight, MAX_IN_FLIGHT)
+
+    def test_cancel_pending(self):
+        """
+        Make sure calls cancelled while waiting for a slot never run.
+        """
+
+        scope = self.scheduler.create_request_scope()
+        futures = [scope.submit(self.call, index) for index in range(CALLS)]
+        cancelled = [future.cancel() for future in futures[MAX_IN_FLIGHT_PER_REQUEST:]]
+        wait(futures)
+
+        self.assertTrue(all(cancelled))
+        self.assertEqual([future.result() for future in futures[:MAX_IN_FLIGHT_PER_REQUEST]],
+                         list(range(MAX_IN_FLIGHT_PER_REQUEST)))
@@ -0,0 +1,123 @@
+import unittest
+import os
+import time
+import tempfile
+from syncit.constants import Constants
+from syncit.sessions import SessionStore, Session, merge_falty_delays
+
+# Setup Constants
+IDLE_TIMEOUT = 0.2
+SUBTITLES = b'1\n00:00:01,000 --> 00:00:02,000\nHi\n'
+SUBTITLES_LANGUAGE = 'ad'
+AUDIO_LANGUAGE = 'en'
+MAX_SIZE = len(SUBTITLES) * 2  # Two sessions
+
+# test_record Constants
+FIRST_FALTY_DELAYS = [3.5, -12.2]
+SECOND_FALTY_DELAYS = [-12.22, 7.1]
+# Close to the first falty delay (within the tolerance)
+DELAY = 3.55
+
+# test_merge_falty_delays Constants
+NOW = 1000000
+
+
+class TestSessionStore(unittest.TestCase):
+    """
+    Test for the SessionStore class.
+
+    Attributes:
+        directory (TemporaryDirectory): Directory of the database.
+        path (str): Path of the database.
+        store (SessionStore): Small store with a short idle timeout.
+    """
+
+    def setUp(self):
+        """
+        Create a store in a temporary directory.
+        """
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'sessions.sqlite3')
+        self.store = SessionStore(self.path, MAX_SIZE, IDLE_TIMEOUT)
+
+    def tearDown(self):
+        """
+        Delete the database.
+        """
+
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_get(self):
+        """
+        Make sure a session is found by another store (process) on the same database, until it's idle or deleted.
+        """
+
+        session = self.store.create(SUBTITLES, SUBTITLES_LANGUAGE, AUDIO_LANGUAGE)
+        other_store = SessionStore(self.path, MAX_SIZE, IDLE_TIMEOUT)
+        try:
+            found_session = other_store.get(session.id)
+        finally:
+            other_store.close()
+        self.assertEqual((found_session.subtitles, found_session.subtitles_language, found_session.audio_language),
+                         (SUBTITLES, SUBTITLES_LANGUAGE, AUDIO_LANGUAGE))
+        self.assertEqual((found_session.falty_delays, found_session.last_delay), ([], None))
+
+        time.sleep(IDLE_TIMEOUT * 1.5)
+        self.assertIsNone(self.store.get(session.id))
+
+        session = self.store.create(SUBTITLES, SUBTITLES_LANGUAGE, AUDIO_LANGUAGE)
+        self.assertTrue(self.store.delete(session.id))
+        self.assertIsNone(self.store.get(session.id))
+
+    def test_size_eviction(self):
+        """
+        Make sure the least recently used sessions are evicted beyond the size limit.
+        """
+
+        first_session = self.store.create(SUBTITLES, SUBTITLES_LANGUAGE, AUDIO_LANGUAGE)
+        second_session = self.store.create(SUBTITLES, SUBTITLES_LANGUAGE, AUDIO_LANGUAGE)
+        self.store.get(first_session.id)
+        self.store.create(SUBTITLES, SUBTITLES_LANGUAGE, AUDIO_LANGUAGE)
+
+        self.assertIsNone(self.store.get(second_session.id))
+        self.assertIsNotNone(self.store.get(first_session.id))
+
+    def test_record(self):
+        """
+        Make sure the falty delays of the chunks are merged, and a verified delay is the last delay and not falty.
+        """
+
+        session = self.store.create(SUBTITLES, SUBTITLES_LANGUAGE, AUDIO_LANGUAGE)
+        self.store.record(session.id, None, FIRST_FALTY_DELAYS)
+        self.store.record(session.id, DELAY, SECOND_FALTY_DELAYS)
+
+        session = self.store.get(session.id)
+        self.assertEqual(sorted((item['delay'], item['rejections']) for item in session.falty_delays), [(-12.2, 2), (7.1, 1)])
+        self.assertEqual(session.last_delay, DELAY)
+
+        # Skipped only after enough rejections
+        self.assertTrue(session.is_known_falty(-12.25))
+        self.assertFalse(session.is_known_falty(7.1))
+
+    def test_merge_falty_delays(self):
+        """
+        Make sure the falty delays expire, count one rejection per chunk and are capped.
+        """
+
+        falty_delays = merge_falty_delays([], [1.0, 1.05], None, NOW)
+        self.assertEqual(falty_delays, [{'delay': 1.0, 'rejections': 1, 'rejected': NOW}])
+
+        falty_delays = merge_falty_delays(falty_delays, [1.02], None, NOW + Constants.SESSION_FALTY_DELAY_TTL + 1)
+        self.assertEqual([item['rejections'] for item in falty_delays], [1])
+
+        falty_delays = merge_falty_delays([], [index * 1.0 for index in range(Constants.SESSION_MAX_FALTY_DELAYS)], None, NOW)
+        falty_delays = merge_falty_delays(falty_delays, [-5.0], None, NOW + 1)
+        self.assertEqual(len(falty_delays), Constants.SESSION_MAX_FALTY_DELAYS)
+        self.assertEqual(falty_delays[0]['delay'], -5.0)
+
+        session = Session('session', SUBTITLES, SUBTITLES_LANGUAGE, AUDIO_LANGUAGE,
+                          [{'delay': 1.0, 'rejections': Constants.SESSION_FALTY_DELAY_MIN_REJECTIONS,
+                            'rejected': time.time() - Constants.SESSION_FALTY_DELAY_TTL - 1}], None)
+        self.assertFalse(session.is_known_falty(1.0))
@@ -1,9 +1,11 @@
 import unittest
 import os
 import tempfile
+import random
+from unittest.mock import patch
 from werkzeug.datastructures import FileStorage
 from syncit.constants import Constants
-from syncit.subtitle_parser import SubtitleParser
+from syncit.subtitle_parser import SubtitleParser, parsed_subtitles_cache
 
 # Setup Constant
 SAMPLE_SUBTITLES_PATH = os.path.join(Constants.SAMPLES_FOLDER, 'subtitles.srt')
@@ -28,6 +30,16 @@ WORDS = [{'hot_word': 'bedtime', 'subtitles': 'bedtime soon', 'start': 67.4, 'en
              'start': 70.242, 'end': 71.808},
          {'hot_word': 'quick', 'subtitles': 'quick elsa make a prince a fancy one', 'start': 71.811, 'end': 74.611}]
 LANGUAGE = 'en'
+LAST_CUE_START = 6158
+LAST_CUE_END = 6170
+LAST_CUE_HOT_WORD = 'subtitles'
+
+# test_get_cues Constants
+CUES = [(65.237, 67.37), (67.4, 68.37), (68.373, 70.239), (70.242, 71.808), (71.811, 74.611), (74.612, 76.847)]
+
+# test_translations_cache Constants
+TRANSLATION_AUDIO_LANGUAGE = 'es'
+TRANSLATED_SUBTITLES = 'hora de dormir pronto'
 
 # test_filter_hot_words Constants
 HOT_WORDS = [
@@ -43,6 +55,33 @@ DESIRED_FILTERED_HOT_WORDS = [
     {'hot_word': 'please', 'subtitles': 'please dont take me', 'start': 70, 'end': 80},
 ]
 
+# test_filter_hot_words_equivalence Constants
+SEED = 1112
+RANDOM_HOT_WORDS_AMOUNT = 300
+RANDOM_VOCABULARY = ['hello', 'take', 'please', 'me', 'it', 'elsa', 'snow', 'prince', 'the', 'quick']
+
+
+def filter_hot_words_reference(hot_words: list):
+    """
+    The previous implementation of SubtitleParser.filter_hot_words (compares every pair of hot words).
+    """
+
+    to_remove = []
+    for hot_word_item in hot_words:
+        hot_word = hot_word_item['hot_word']
+        is_hot_word_falty = any(
+            [hot_word in i['subtitles'].split() for i in hot_words if i != hot_word_item
+             and abs(i['start'] - hot_word_item['start']) < Constants.DELAY_RADIUS
+             and abs(i['end'] - hot_word_item['end']) < Constants.DELAY_RADIUS
+             ])
+        if(is_hot_word_falty):
+            to_remove.append(hot_word_item)
+
+    for item in to_remove:
+        hot_words.remove(item)
+
+    return hot_words
+
 
 class TestSubtitleParser(unittest.TestCase):
     """
@@ -54,9 +93,13 @@ class TestSubtitleParser(unittest.TestCase):
 
     def setUp(self):
         """
-        Create a sp instance.
+        Create a sp instance (without the translation store of the process).
         """
 
+        store_patcher = patch('syncit.translate.get_translation_store', return_value=None)
+        store_patcher.start()
+        self.addCleanup(store_patcher.stop)
+
         subtitles_binary = open(SAMPLE_SUBTITLES_PATH, 'rb')
         subtitles_file = FileStorage(subtitles_binary)
         self.sp = SubtitleParser(subtitles_file, SAMPLE_SUBTITLES_LANGUAGE, SAMPLE_AUDIO_LANGUAGE)
@@ -88,6 +131,69 @@ class TestSubtitleParser(unittest.TestCase):
         hot_words_without_ids = [{'hot_word':hot_word_item['hot_word'], 'start':hot_word_item['start'], 'end': hot_word_item['end'], 'subtitles': hot_word_item['subtitles']} for hot_word_item in hot_word_items]
         self.assertEqual(hot_words_without_ids, WORDS, 'Check get_valid_hot_words.')
 
+        # The last cue of the file is a valid hot word too
+        hot_word_items = self.sp.get_valid_hot_words(LAST_CUE_START, LAST_CUE_END)
+        self.assertEqual([hot_word_item['hot_word'] for hot_word_item in hot_word_items], [LAST_CUE_HOT_WORD])
+
+    def test_get_cues(self):
+        """
+        Make sure you get every cue shown in the window (also the ones that are partly in it).
+        """
+
+        self.assertEqual(self.sp.get_cues(START, END), CUES)
+
+    def test_detect_language(self):
+        """
+        Make sure the language of the subtitles is detected (ad = auto detect), with its probability.
+        """
+
+        with open(SAMPLE_SUBTITLES_PATH, 'rb') as subtitles_binary:
+            sp = SubtitleParser(FileStorage(subtitles_binary), 'ad', SAMPLE_AUDIO_LANGUAGE)
+
+        self.assertEqual(sp.subtitles_language, SAMPLE_SUBTITLES_LANGUAGE)
+        self.assertGreater(sp.language_confidence, 0.9)
+        self.assertGreater(sp.encoding_confidence, 0.9)
+
+    def test_parsed_subtitles_cache(self):
+        """
+        Make sure the same file with the same languages is parsed only once.
+        """
+
+        hits = parsed_subtitles_cache.stats()['hits']
+        with open(SAMPLE_SUBTITLES_PATH, 'rb') as subtitles_binary:
+            sp = SubtitleParser(FileStorage(subtitles_binary), SAMPLE_SUBTITLES_LANGUAGE, SAMPLE_AUDIO_LANGUAGE)
+
+        self.assertEqual(parsed_subtitles_cache.stats()['hits'], hits + 1)
+        self.assertIs(sp.starts_ms, self.sp.starts_ms)
+        self.assertEqual(sp.encoding, self.sp.encoding)
+        self.assertEqual(sp.get_valid_hot_words(START, END)[0]['hot_word'], WORDS[0]['hot_word'])
+
+    def test_translations_cache(self):
+        """
+        Make sure subtitles translated once are not translated again (also by another parser of the file).
+        """
+
+        with open(SAMPLE_SUBTITLES_PATH, 'rb') as subtitles_binary:
+            sp = SubtitleParser(FileStorage(subtitles_binary), SAMPLE_SUBTITLES_LANGUAGE, TRANSLATION_AUDIO_LANGUAGE)
+
+        translated = []
+        def translate_many(texts):
+            translated.extend(texts)
+            return [TRANSLATED_SUBTITLES for text in texts]
+        sp.translator.translate_many = translate_many
+
+        hot_words = sp.translate_hot_words([dict(WORDS[0])])
+        self.assertEqual(hot_words[0]['subtitles'], TRANSLATED_SUBTITLES)
+        self.assertEqual(translated, [WORDS[0]['subtitles']])
+
+        with open(SAMPLE_SUBTITLES_PATH, 'rb') as subtitles_binary:
+            sp = SubtitleParser(FileStorage(subtitles_binary), SAMPLE_SUBTITLES_LANGUAGE, TRANSLATION_AUDIO_LANGUAGE)
+        sp.translator.translate_many = translate_many
+
+        hot_words = sp.translate_hot_words([dict(WORDS[0])])
+        self.assertEqual(hot_words[0]['hot_word'], TRANSLATED_SUBTITLES.split()[0])
+        self.assertEqual(len(translated), 1)
+
     def test_filter_hot_words(self):
         """
         Make sure that filter_hot_words removes the correct subtitles.
@@ -95,3 +201,25 @@ class TestSubtitleParser(unittest.TestCase):
 
         recieved_hot_words = self.sp.filter_hot_words(HOT_WORDS)
         self.assertEqual(recieved_hot_words, DESIRED_FILTERED_HOT_WORDS)
+
+    def test_filter_hot_words_equivalence(self):
+        """
+        Make sure filter_hot_words removes exactly what the previous implementation removed, on random hot words
+        (integer times, so many are exactly Constants.DELAY_RADIUS apart, and some duplicates).
+        """
+
+        rng = random.Random(SEED)
+        for _ in range(20):
+            hot_words = []
+            for _ in range(RANDOM_HOT_WORDS_AMOUNT):
+                subtitles = ' '.join(rng.choice(RANDOM_VOCABULARY) for _ in range(rng.randint(1, 5)))
+                start = rng.randint(0, 600)
+                hot_words.append({'hot_word': subtitles.split()[0], 'subtitles': subtitles,
+                                  'start': start, 'end': start + rng.choice([1, 2.5, Constants.DELAY_RADIUS, 30])})
+            hot_words += [dict(hot_word_item) for hot_word_item in rng.sample(hot_words, 10)]
+            rng.shuffle(hot_words)
+
+            expected_hot_words = filter_hot_words_reference([dict(hot_word_item) for hot_word_item in hot_words])
+            recieved_hot_words = self.sp.filter_hot_words(hot_words)
+            self.assertIs(recieved_hot_words, hot_words)
+            self.assertEqual(recieved_hot_words, expected_hot_words)
@@ -0,0 +1,94 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from syncit.constants import Constants
+from syncit.translate import CustomTranslator, get_batches
+from syncit.translation_store import TranslationStore
+
+# Setup Constants
+SOURCE_LANGUAGE = 'en'
+TARGET_LANGUAGE = 'es'
+
+# test_get_batches Constants
+TEXTS_AMOUNT = 250
+LONG_TEXT = 'a' * (Constants.TRANSLATION_BATCH_MAX_CHARACTERS - 2)
+
+
+class TestCustomTranslator(unittest.TestCase):
+    """
+    Test for the CustomTranslator class (without the translation APIs, the batches are translated by a stub).
+
+    Attributes:
+        translator (CustomTranslator): Translator with the stub, and a store in a temporary directory.
+        batches (list): The batches the stub recieved.
+    """
+
+    def setUp(self):
+        """
+        Create a translator, that translates a text to its upper case.
+        """
+
+        # Don't open the store of the process
+        with patch('syncit.translate.get_translation_store', return_value=None):
+            self.translator = CustomTranslator(SOURCE_LANGUAGE, TARGET_LANGUAGE)
+        self.directory = tempfile.TemporaryDirectory()
+        self.translator.store = TranslationStore(os.path.join(self.directory.name, 'translations.sqlite3'))
+        self.batches = []
+
+        def translate_batch(texts):
+            self.batches.append(texts)
+            if('fail' in texts):
+                raise Exception('Translation failed.')
+            return [text.upper() for text in texts]
+        self.translator.translate_batch = translate_batch
+
+    def tearDown(self):
+        """
+        Delete the store.
+        """
+
+        self.translator.store.close()
+        self.directory.cleanup()
+
+    def test_get_batches(self):
+        """
+        Make sure the batches are bounded by texts and characters, and keep the order.
+        """
+
+        texts = [f'text {index}' for index in range(TEXTS_AMOUNT)]
+        batches = get_batches(texts)
+        self.assertEqual(sum(batches, []), list(range(TEXTS_AMOUNT)))
+        self.assertTrue(all(len(batch) <= Constants.TRANSLATION_BATCH_MAX_TEXTS for batch in batches))
+
+        batches = get_batches(['short', LONG_TEXT, 'short'])
+        self.assertEqual(batches, [[0], [1], [2]])
+
+    def test_translate_many(self):
+        """
+        Make sure the translations are in the order of the texts, and a failed batch doesn't fail the others.
+        """
+
+        texts = [f'text {index}' for index in range(TEXTS_AMOUNT)]
+        self.assertEqual(self.translator.translate_many(texts), [text.upper() for text in texts])
+        self.assertEqual(len(self.batches), len(get_batches(texts)))
+
+        translated_texts = self.translator.translate_many(['fail', LONG_TEXT])
+        self.assertEqual(translated_texts, [None, LONG_TEXT.upper()])
+
+        results = []
+        self.assertEqual(self.translator.translate('hello', results), 'HELLO')
+        self.assertEqual(results, [{'source_text': 'hello', 'translated_text': 'HELLO'}])
+
+    def test_translation_store(self):
+        """
+        Make sure stored translations are not sent to the translation APIs, and failed ones are not stored.
+        """
+
+        self.translator.translate_many(['hello'])
+        self.translator.translate_many(['fail'])
+        self.translator.store.flush()
+        self.batches.clear()
+
+        self.assertEqual(self.translator.translate_many(['hello', 'world', 'fail']), ['HELLO', None, None])
+        self.assertEqual(self.batches, [['world', 'fail']])
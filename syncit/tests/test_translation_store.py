@@ -0,0 +1,72 @@
+import unittest
+import os
+import tempfile
+from syncit.translation_store import TranslationStore
+
+# Setup Constants
+MAX_SIZE = 3
+SOURCE_LANGUAGE = 'en'
+TARGET_LANGUAGE = 'es'
+
+# test_get_many Constants
+TRANSLATIONS = {'bedtime soon': 'hora de dormir pronto', 'quick elsa': 'rapido elsa'}
+NOT_NORMALIZED_TEXT = ' Bedtime  soon'
+
+
+class TestTranslationStore(unittest.TestCase):
+    """
+    Test for the TranslationStore class.
+
+    Attributes:
+        directory (TemporaryDirectory): Directory of the database.
+        path (str): Path of the database.
+        store (TranslationStore): Small store.
+    """
+
+    def setUp(self):
+        """
+        Create a store in a temporary directory.
+        """
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'translations.sqlite3')
+        self.store = TranslationStore(self.path, MAX_SIZE)
+
+    def tearDown(self):
+        """
+        Delete the database.
+        """
+
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_get_many(self):
+        """
+        Make sure stored translations are found by their normalized text, only for the same languages,
+        and kept after the store is opened again.
+        """
+
+        self.store.set_many(SOURCE_LANGUAGE, TARGET_LANGUAGE, TRANSLATIONS)
+        self.store.flush()
+
+        texts = list(TRANSLATIONS) + [NOT_NORMALIZED_TEXT, 'not translated']
+        expected_translations = dict(TRANSLATIONS, **{NOT_NORMALIZED_TEXT: TRANSLATIONS['bedtime soon']})
+        self.assertEqual(self.store.get_many(SOURCE_LANGUAGE, TARGET_LANGUAGE, texts), expected_translations)
+        self.assertEqual(self.store.get_many(TARGET_LANGUAGE, SOURCE_LANGUAGE, texts), {})
+
+        store = TranslationStore(self.path, MAX_SIZE)
+        self.assertEqual(store.get_many(SOURCE_LANGUAGE, TARGET_LANGUAGE, texts), expected_translations)
+        store.close()
+
+    def test_size_eviction(self):
+        """
+        Make sure the oldest translations are evicted beyond the maximum size.
+        """
+
+        for index in range(MAX_SIZE + 2):
+            self.store.set_many(SOURCE_LANGUAGE, TARGET_LANGUAGE, {f'text {index}': f'texto {index}'})
+            self.store.flush()
+
+        texts = [f'text {index}' for index in range(MAX_SIZE + 2)]
+        translations = self.store.get_many(SOURCE_LANGUAGE, TARGET_LANGUAGE, texts)
+        self.assertEqual(list(translations), texts[-MAX_SIZE:])
@@ -0,0 +1,97 @@
+import unittest
+import os
+import hashlib
+import requests
+import numpy as np
+from unittest.mock import patch
+from syncit.constants import Constants
+from syncit.stt_server import app
+from syncit.recognizers import LambdaRecognizer
+from syncit.wire_formats import WIRE_FORMATS, WIRE_CODECS, encode_request
+
+# Setup Constants
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FIELDS = {'language': 'en-US', 'hot_words': '["elsa"]'}
+SERVER_URL = 'http://localhost/'
+
+# test_round_trip Constants
+DURATION = 2
+TONE_FREQUENCY = 440
+
+
+def spot_keywords(frame_data, sample_rate, sample_width, language, hot_words, word_timestamps=False):
+    """
+    Simulated spot_keywords, answers with what the server decoded.
+    """
+
+    return f'{hashlib.md5(frame_data).hexdigest()} {sample_rate} {sample_width} {language} {",".join(hot_words)}'
+
+
+class TestWireFormats(unittest.TestCase):
+    """
+    Test for the wire formats, sent through requests to the stand-in speech to text server.
+
+    Attributes:
+        client (FlaskClient): Client of the stand-in server.
+        frame_data (bytes): A tone.
+    """
+
+    def setUp(self):
+        """
+        Create a client of the stand-in server and a tone.
+        """
+
+        self.client = app.test_client()
+        times = np.arange(DURATION * SAMPLE_RATE) / SAMPLE_RATE
+        self.frame_data = (np.sin(2 * np.pi * TONE_FREQUENCY * times) * 8000).astype(np.int16).tobytes()
+
+    def post(self, request: dict):
+        """
+        Sends a request (keyword arguments of requests.post) to the stand-in server.
+
+        Returns:
+            Response: The response.
+        """
+
+        prepared = requests.Request('POST', SERVER_URL, **request).prepare()
+        return self.client.post(prepared.path_url, data=prepared.body, headers=dict(prepared.headers))
+
+    def test_round_trip(self):
+        """
+        Make sure the server decodes the same audio and params from every wire format, and flac is smaller.
+        """
+
+        expected = spot_keywords(self.frame_data, SAMPLE_RATE, SAMPLE_WIDTH, FIELDS['language'], ['elsa'])
+        sizes = {}
+        with patch('syncit.stt_server.spot_keywords', spot_keywords):
+            for wire_format in WIRE_FORMATS:
+                for codec in WIRE_CODECS:
+                    request = encode_request(wire_format, codec, self.frame_data, SAMPLE_RATE, SAMPLE_WIDTH, FIELDS)
+                    sizes[(wire_format, codec)] = len(requests.Request('POST', SERVER_URL, **request).prepare().body)
+                    response = self.post(request)
+                    self.assertEqual((response.status_code, response.get_data(as_text=True)), (200, expected),
+                                     f'{wire_format} {codec}')
+
+        self.assertGreater(sizes[('base64', 'raw')], len(self.frame_data) * 4 / 3)
+        self.assertLess(sizes[('octet-stream', 'raw')], len(self.frame_data) + 1)
+        self.assertLess(sizes[('octet-stream', 'flac')], len(self.frame_data) / 2)
+
+    def test_unsupported(self):
+        """
+        Make sure the server answers unknown audio with 415, and the recognizer falls back to base64.
+        """
+
+        response = self.client.post(f'/?sample_rate={SAMPLE_RATE}&sample_width={SAMPLE_WIDTH}', data=b'ID3',
+                                    headers={'Content-Type': 'audio/mpeg'})
+        self.assertEqual(response.status_code, 415)
+
+        responses = [type('Response', (), {'status_code': 415, 'text': ''}), type('Response', (), {'status_code': 200, 'text': 'elsa'})]
+        with patch.dict(os.environ, {'CONVERT_SPEECH_TO_TEXT_SERVER_URL': SERVER_URL, 'SPEECH_TO_TEXT_WIRE_FORMAT': 'octet-stream',
+                                     'SPEECH_TO_TEXT_WIRE_CODEC': 'flac'}):
+            recognizer = LambdaRecognizer()
+            with patch.object(recognizer.session, 'post', side_effect=responses) as post:
+                self.assertEqual(recognizer.recognize(self.frame_data, SAMPLE_RATE, SAMPLE_WIDTH, FIELDS['language'], ['elsa'],
+                                                      lambda: False), 'elsa')
+        self.assertIn('frame_data_base64', post.call_args.kwargs['data'])
+        self.assertEqual(recognizer.wire_format, 'base64')
@@ -3,30 +3,31 @@ from google.oauth2.service_account import Credentials as GoogleCredentials
 from dotenv import load_dotenv
 import requests
 import logging
+import threading
 import urllib
 import json
 import os
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from googletrans import Translator as UnstableTranslator
 from logger_setup import setup_logging
 from syncit.constants import Constants
+from syncit.translation_store import get_translation_store
 
 load_dotenv()
 setup_logging()
 logger = logging.getLogger(__name__)
 
-auth_data = json.loads(base64.b64decode(
-    os.getenv('GOOGLE_TRANSLATE_API_CREDENTIALS')).decode('utf-8'))
-creds = GoogleCredentials.from_service_account_info(auth_data)
-translate_client = translate.Client(credentials=creds)
-
 
 class CustomTranslator():
     """
     Class for translation purposes.
 
     Attributes:
-        authenticated_translation (bool): Whether to use authenticated or free API.
+        source_language (str): Source language.
+        target_language (str): Target language.
+        stable_translation (bool): Whether to use the official API (after the free API failed).
+        store (TranslationStore): Translations kept on disk (None if disabled).
     """
 
     def __init__(self, source_language: str, target_language: str):
@@ -41,6 +42,7 @@ class CustomTranslator():
         self.source_language = source_language
         self.target_language = target_language
         self.stable_translation = False
+        self.store = get_translation_store()
 
     def translate(self, string: str, results: list):
         """
@@ -56,25 +58,157 @@ class CustomTranslator():
                 target_text (str): The target text.
         """
 
-        # Free Ajax Request (Unstable)
+        translated_text = self.translate_many([string])[0]
+        if(translated_text is not None):
+            results.append({'source_text': string, 'translated_text': translated_text})
+        return translated_text
+
+    def translate_many(self, texts: list):
+        """
+        Translates texts in batches (bounded by Constants.TRANSLATION_BATCH_MAX_TEXTS and
+        Constants.TRANSLATION_BATCH_MAX_CHARACTERS), a few batches at a time.
+
+        Params:
+            texts (list): The strings to translate.
+
+        Returns:
+            list: The translated strings, in the order of texts (None if the translation failed).
+        """
+
+        stored_translations = {}
+        if(self.store is not None):
+            stored_translations = self.store.get_many(self.source_language, self.target_language, texts)
+        translated_texts = [stored_translations.get(text) for text in texts]
+
+        # Only the texts not in the store are sent to the translation APIs
+        missing_texts = [text for text in texts if text not in stored_translations]
+        batches = get_batches(missing_texts)
+        logger.debug(f'Translating {len(missing_texts)} texts in {len(batches)} batches ({len(stored_translations)} stored).')
+
+        futures = [(batch, get_executor().submit(self.translate_batch, [missing_texts[index] for index in batch]))
+                   for batch in batches]
+        new_translations = {}
+        for batch, future in futures:
+            try:
+                for index, translated_text in zip(batch, future.result()):
+                    new_translations[missing_texts[index]] = translated_text
+            except Exception as err:
+                logger.error(f'Unable to translate batch of {len(batch)} texts. Error: {err}')
+
+        if(self.store is not None and len(new_translations) > 0):
+            self.store.set_many(self.source_language, self.target_language, new_translations)
+
+        return [new_translations.get(text, translated_text) for text, translated_text in zip(texts, translated_texts)]
+
+    def translate_batch(self, texts: list):
+        """
+        Translates one batch with one request.
+
+        Params:
+            texts (list): The strings to translate (without line breaks).
+
+        Returns:
+            list: The translated strings, in the order of texts.
+        """
+
+        # Free Ajax Request (Unstable). The texts are sent as lines of one text.
         if(self.stable_translation is False):
             try:
-                translator = UnstableTranslator()
-                translated_text = translator.translate(
-                    string, src=self.source_language, dest=self.target_language).text
-                results.append(
-                    {'source_text': string, 'translated_text': translated_text})
-                return translated_text
+                translated_text = get_unstable_translator().translate(
+                    '\n'.join(texts), src=self.source_language, dest=self.target_language).text
+                translated_texts = translated_text.split('\n')
+                if(len(translated_texts) != len(texts)):
+                    raise Exception(f'Sent {len(texts)} lines, recieved {len(translated_texts)}.')
+                return translated_texts
             except Exception as err:
                 logger.warning(
                     f'Unable to translate using unstable translation. Error: {err}')
-                self.translation_method = False
-                return self.translate(string, results)
+                self.stable_translation = True
 
         # Official API (Stable)
         logger.debug(f'Translating using API.')
-        response = translate_client.translate(
-            string, target_language=self.target_language, source_language=self.source_language)
-        results.append(
-            {'source_text': string, 'translated_text': response['translatedText']})
-        return response['translatedText']
+        response = get_translate_client().translate(
+            texts, target_language=self.target_language, source_language=self.source_language)
+        return [item['translatedText'] for item in response]
+
+
+def get_batches(texts: list):
+    """
+    Splits the texts into batches for the translation.
+
+    Params:
+        texts (list): The strings to translate.
+
+    Returns:
+        list of lists: The indexes of the texts in each batch.
+    """
+
+    batches = []
+    batch = []
+    characters = 0
+    for index, text in enumerate(texts):
+        if(len(batch) > 0 and (len(batch) == Constants.TRANSLATION_BATCH_MAX_TEXTS or
+                               characters + len(text) > Constants.TRANSLATION_BATCH_MAX_CHARACTERS)):
+            batches.append(batch)
+            batch = []
+            characters = 0
+        batch.append(index)
+        characters += len(text) + 1  # + the line break
+
+    if(len(batch) > 0):
+        batches.append(batch)
+    return batches
+
+
+_translate_client = None
+_unstable_translator = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_translate_client():
+    """
+    Gets the official API client (created on first use, from GOOGLE_TRANSLATE_API_CREDENTIALS).
+
+    Returns:
+        translate.Client: The client.
+    """
+
+    global _translate_client
+    with _lock:
+        if(_translate_client is None):
+            auth_data = json.loads(base64.b64decode(
+                os.getenv('GOOGLE_TRANSLATE_API_CREDENTIALS')).decode('utf-8'))
+            creds = GoogleCredentials.from_service_account_info(auth_data)
+            _translate_client = translate.Client(credentials=creds)
+        return _translate_client
+
+
+def get_unstable_translator():
+    """
+    Gets the free API client (created on first use).
+
+    Returns:
+        UnstableTranslator: The client.
+    """
+
+    global _unstable_translator
+    with _lock:
+        if(_unstable_translator is None):
+            _unstable_translator = UnstableTranslator()
+        return _unstable_translator
+
+
+def get_executor():
+    """
+    Gets the pool the translation batches run in (created on first use).
+
+    Returns:
+        ThreadPoolExecutor: The pool.
+    """
+
+    global _executor
+    with _lock:
+        if(_executor is None):
+            _executor = ThreadPoolExecutor(max_workers=Constants.TRANSLATION_MAX_CONCURRENT_BATCHES)
+        return _executor
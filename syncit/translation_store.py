@@ -0,0 +1,208 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from syncit.constants import Constants
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# SQLite limits the variables in one statement (999 in old versions)
+LOOKUP_CHUNK_SIZE = 500
+
+
+def normalize_text(text: str):
+    """
+    Normalizes a text for the store key (lower case, single spaces).
+
+    Params:
+        text (str): The text.
+
+    Returns:
+        str: The normalized text.
+    """
+
+    return ' '.join(text.lower().split())
+
+
+class TranslationStore():
+    """
+    Translations kept on disk (SQLite), shared by the processes and kept after restarts.
+    Lookups are in bulk, inserts are written by a background thread, and the oldest
+    translations are evicted beyond max_size.
+
+    Attributes:
+        path (str): Path of the database file.
+        max_size (int): Maximum translations in the store.
+        connection (sqlite3.Connection): Connection to the database.
+        pending (queue.Queue): Translations waiting to be written.
+        writer (threading.Thread): The background thread that writes the pending translations.
+        lock (threading.Lock): Lock of the connection.
+    """
+
+    def __init__(self, path: str, max_size: int = Constants.TRANSLATION_STORE_MAX_SIZE):
+        """
+        Constructor of TranslationStore.
+
+        Params:
+            path (str): Path of the database file (created if needed).
+            max_size (int): Maximum translations in the store.
+        """
+
+        self.path = path
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=Constants.TRANSLATION_STORE_TIMEOUT, check_same_thread=False)
+        with self.lock, self.connection:
+            # Readers don't block the writer of another process
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('''CREATE TABLE IF NOT EXISTS translations (
+                source_language TEXT NOT NULL,
+                target_language TEXT NOT NULL,
+                text TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (source_language, target_language, text))''')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS translations_created ON translations (created)')
+
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_pending, daemon=True)
+        self.writer.start()
+
+    def get_many(self, source_language: str, target_language: str, texts: list):
+        """
+        Gets the stored translations of the texts.
+
+        Params:
+            source_language (str): Source language.
+            target_language (str): Target language.
+            texts (list): The texts.
+
+        Returns:
+            dict: Text -> translation, only for the texts in the store.
+        """
+
+        keys = {}
+        for text in texts:
+            keys.setdefault(normalize_text(text), []).append(text)
+        normalized_texts = list(keys)
+
+        translations = {}
+        with self.lock:
+            for index in range(0, len(normalized_texts), LOOKUP_CHUNK_SIZE):
+                chunk = normalized_texts[index:index + LOOKUP_CHUNK_SIZE]
+                rows = self.connection.execute(
+                    f'''SELECT text, translation FROM translations WHERE source_language = ? AND target_language = ?
+                        AND text IN ({', '.join('?' * len(chunk))})''', [source_language, target_language] + chunk)
+                for normalized_text, translation in rows:
+                    for text in keys[normalized_text]:
+                        translations[text] = translation
+
+        return translations
+
+    def set_many(self, source_language: str, target_language: str, translations: dict):
+        """
+        Stores translations (written in the background).
+
+        Params:
+            source_language (str): Source language.
+            target_language (str): Target language.
+            translations (dict): Text -> translation.
+        """
+
+        now = time.time()
+        for text, translation in translations.items():
+            self.pending.put((source_language, target_language, normalize_text(text), translation, now))
+
+    def flush(self):
+        """
+        Waits until the pending translations are written.
+        """
+
+        self.pending.join()
+
+    def close(self):
+        """
+        Writes the pending translations, stops the background thread and closes the connection.
+        """
+
+        self.pending.put(None)
+        self.writer.join()
+        with self.lock:
+            self.connection.close()
+
+    def write_pending(self):
+        """
+        Writes the pending translations in transactions (runs in the background thread), and evicts
+        the oldest translations beyond max_size. Stops at None (see close).
+        """
+
+        closed = False
+        while(closed is False):
+            rows = []
+            item = self.pending.get()
+            while(True):
+                if(item is None):
+                    closed = True
+                else:
+                    rows.append(item)
+                if(closed or len(rows) == Constants.TRANSLATION_STORE_WRITE_BATCH_SIZE):
+                    break
+                try:
+                    item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+
+            try:
+                if(len(rows) > 0):
+                    self.write_rows(rows)
+            except sqlite3.Error as err:
+                logger.error(f'Unable to write {len(rows)} translations to the store. Error: {err}')
+            finally:
+                for _ in range(len(rows) + closed):
+                    self.pending.task_done()
+
+    def write_rows(self, rows: list):
+        """
+        Writes translations in one transaction, and evicts the oldest translations beyond max_size.
+
+        Params:
+            rows (list of tuples): (source_language, target_language, normalized text, translation, created).
+        """
+
+        with self.lock, self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)', rows)
+            (size,) = self.connection.execute('SELECT COUNT(*) FROM translations').fetchone()
+            if(size > self.max_size):
+                self.connection.execute('''DELETE FROM translations WHERE rowid IN
+                    (SELECT rowid FROM translations ORDER BY created LIMIT ?)''', (size - self.max_size,))
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_translation_store():
+    """
+    Gets the translation store of this process, at the TRANSLATION_STORE_PATH environment variable
+    (Constants.TRANSLATION_STORE_PATH by default). An empty path disables the store.
+
+    Returns:
+        TranslationStore: The store (None if disabled or unavailable).
+    """
+
+    global _store
+    with _lock:
+        if(_store is None):
+            path = os.getenv('TRANSLATION_STORE_PATH', Constants.TRANSLATION_STORE_PATH)
+            if(path == ''):
+                return None
+            try:
+                _store = TranslationStore(path)
+            except sqlite3.Error as err:
+                logger.error(f'Unable to open the translation store at {path}. Error: {err}')
+                return None
+        return _store
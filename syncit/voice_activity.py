@@ -0,0 +1,31 @@
+import numpy as np
+from syncit.constants import Constants
+
+
+def get_voice_activity(pcm: np.ndarray, sample_rate: int, frame_time: float = Constants.VOICE_ACTIVITY_FRAME_TIME):
+    """
+    Gets the voice activity envelope of the audio, how likely each frame is to have speech (0 to 1).
+    Based on the energy of the frame above the noise floor of the audio.
+
+    Params:
+        pcm (np.ndarray): Mono int16 samples.
+        sample_rate (int): Sample rate of the audio.
+        frame_time (float): Length of a frame in seconds.
+
+    Returns:
+        np.ndarray: The envelope, one value per frame.
+    """
+
+    frame_length = int(sample_rate * frame_time)
+    frames_amount = len(pcm) // frame_length
+    if(frames_amount == 0):
+        return np.zeros(0)
+
+    frames = pcm[:frames_amount * frame_length].reshape(frames_amount, frame_length).astype(np.float32)
+    # The first difference is a cheap high pass filter, removes hum and most of the music bass
+    frames = np.diff(frames, axis=1)
+    energy = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1)
+
+    noise_floor = np.percentile(energy, Constants.VOICE_ACTIVITY_NOISE_PERCENTILE)
+    activity = (energy - noise_floor - Constants.VOICE_ACTIVITY_MARGIN_DB) / Constants.VOICE_ACTIVITY_RANGE_DB
+    return np.clip(activity, 0, 1)
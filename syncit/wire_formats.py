@@ -0,0 +1,132 @@
+import io
+import json
+import base64
+import wave
+import subprocess
+import logging
+from logger_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# How the audio is sent to the speech to text server:
+#   base64: form field frame_data_base64 (the original format, about 33% larger than the audio).
+#   multipart: file field audio, the other params as form fields.
+#   octet-stream: the audio is the body, the other params are in the query string.
+WIRE_FORMATS = ('base64', 'multipart', 'octet-stream')
+# raw: the PCM as is. flac: lossless compression (multipart and octet-stream only).
+WIRE_CODECS = ('raw', 'flac')
+
+CONTENT_TYPES = {'raw': 'application/octet-stream', 'flac': 'audio/flac'}
+
+
+class UnsupportedWireFormat(Exception):
+    """
+    The request is not in a known wire format.
+    """
+
+
+def encode_flac(frame_data, sample_rate: int, sample_width: int):
+    """
+    Compresses raw PCM to FLAC (with the flac converter bundled with SpeechRecognition).
+
+    Params:
+        frame_data (bytes-like): Raw mono PCM data.
+        sample_rate (int): Sample rate of the audio.
+        sample_width (int): Sample width (in bytes) of the audio.
+
+    Returns:
+        bytes: The FLAC file.
+    """
+
+    import speech_recognition as sr
+
+    return sr.AudioData(bytes(frame_data), sample_rate, sample_width).get_flac_data()
+
+
+def decode_flac(flac_data: bytes):
+    """
+    Decompresses a FLAC file to raw PCM.
+
+    Params:
+        flac_data (bytes): The FLAC file.
+
+    Returns:
+        tuple: The raw PCM data (bytes), the sample rate and the sample width.
+    """
+
+    import speech_recognition as sr
+
+    process = subprocess.run([sr.get_flac_converter(), '--decode', '--stdout', '--silent', '-'],
+                             input=flac_data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if(process.returncode != 0):
+        raise UnsupportedWireFormat(f'Unable to decode FLAC. Error: {process.stderr.decode(errors="replace")}')
+
+    with wave.open(io.BytesIO(process.stdout), 'rb') as wave_file:
+        return (wave_file.readframes(wave_file.getnframes()), wave_file.getframerate(), wave_file.getsampwidth())
+
+
+def encode_request(wire_format: str, codec: str, frame_data, sample_rate: int, sample_width: int, fields: dict):
+    """
+    Encodes a speech to text request.
+
+    Params:
+        wire_format (str): One of WIRE_FORMATS.
+        codec (str): One of WIRE_CODECS (base64 is always raw).
+        frame_data (bytes-like): Raw mono PCM data.
+        sample_rate (int): Sample rate of the audio.
+        sample_width (int): Sample width (in bytes) of the audio.
+        fields (dict): The other params (language, hot_words, ...).
+
+    Returns:
+        dict: Keyword arguments for requests.post (data, files, params, headers).
+    """
+
+    fields = dict(fields, sample_rate=sample_rate, sample_width=sample_width)
+    if(wire_format == 'base64'):
+        return {'data': dict(fields, frame_data_base64=base64.b64encode(frame_data))}
+
+    audio = encode_flac(frame_data, sample_rate, sample_width) if codec == 'flac' else bytes(frame_data)
+    if(wire_format == 'multipart'):
+        return {'data': fields, 'files': {'audio': (f'audio.{codec}', audio, CONTENT_TYPES[codec])}}
+    if(wire_format == 'octet-stream'):
+        return {'data': audio, 'params': fields, 'headers': {'Content-Type': CONTENT_TYPES[codec]}}
+    raise UnsupportedWireFormat(f'Unknown wire format {wire_format}. Options: {WIRE_FORMATS}.')
+
+
+def decode_request(request):
+    """
+    Decodes a speech to text request in any of the wire formats (for the server side).
+
+    Params:
+        request (flask.Request): The request.
+
+    Returns:
+        tuple: The raw PCM data (bytes), the sample rate, the sample width and the other params (dict).
+    """
+
+    if(request.mimetype in ('application/x-www-form-urlencoded', 'multipart/form-data')):
+        fields = request.form.to_dict()
+        if('frame_data_base64' in fields):
+            audio = base64.b64decode(fields.pop('frame_data_base64'))
+            content_type = CONTENT_TYPES['raw']
+        elif('audio' in request.files):
+            audio = request.files['audio'].read()
+            content_type = request.files['audio'].mimetype
+        else:
+            raise UnsupportedWireFormat('No audio in the form.')
+    else:
+        fields = request.args.to_dict()
+        audio = request.get_data()
+        content_type = request.mimetype
+
+    sample_rate = int(fields.pop('sample_rate'))
+    sample_width = int(fields.pop('sample_width'))
+    if(content_type == CONTENT_TYPES['flac']):
+        (audio, sample_rate, sample_width) = decode_flac(audio)
+    elif(content_type != CONTENT_TYPES['raw']):
+        raise UnsupportedWireFormat(f'Unknown audio content type {content_type}.')
+
+    if('hot_words' in fields):
+        fields['hot_words'] = json.loads(fields['hot_words'])
+    return (audio, sample_rate, sample_width, fields)